@@ -43,12 +43,19 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'accounts.middleware.AccountIdentityMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
 ROOT_URLCONF = 'WildDocs.urls'
 
+# Remember each signed-in user's role (student/admin) in their session
+ACCOUNT_IDENTITY_SESSION_CACHE = os.getenv('ACCOUNT_IDENTITY_SESSION_CACHE', 'True').lower() in ('1', 'true', 'yes')
+
+# Serve the student dashboard and request lists with the async views (for ASGI deployments)
+ASYNC_STUDENT_VIEWS = os.getenv('ASYNC_STUDENT_VIEWS', 'False').lower() in ('1', 'true', 'yes')
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -61,6 +68,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'dashboard.fragments.fragment_context',
             ],
         },
     },
@@ -70,20 +78,73 @@ WSGI_APPLICATION = 'WildDocs.wsgi.application'
 
 
 # Database configuration using Supabase Session Pooler
+DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///db.sqlite3')
 DATABASES = {
-    "default": dj_database_url.config(
-        default="sqlite:///db.sqlite3",
+    "default": dj_database_url.parse(
+        DATABASE_URL,
         conn_max_age=600,  # persistent connections
-        ssl_require=True   # enforce SSL
+        ssl_require=not DATABASE_URL.startswith('sqlite')  # enforce SSL (SQLite has no sslmode)
     )
 }
 
 
+# Cache configuration
+# Uses a per-process memory cache unless REDIS_URL is set. With several worker
+# processes, set REDIS_URL so cached counts are shared between them.
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# Notification feed long-polling: longest hold and database re-check interval (seconds)
+NOTIFICATIONS_LONG_POLL_TIMEOUT = float(os.getenv('NOTIFICATIONS_LONG_POLL_TIMEOUT', '25'))
+NOTIFICATIONS_POLL_INTERVAL = float(os.getenv('NOTIFICATIONS_POLL_INTERVAL', '2'))
+
+# Admin request queue event stream (Server-Sent Events). The default backend
+# only reaches browsers connected to the same process; with several worker
+# processes use 'request.events.PostgresBroker' (LISTEN/NOTIFY).
+REQUEST_EVENTS_BACKEND = os.getenv('REQUEST_EVENTS_BACKEND', 'request.events.InProcessBroker')
+REQUEST_EVENTS_STREAM_TIMEOUT = float(os.getenv('REQUEST_EVENTS_STREAM_TIMEOUT', '300'))
+REQUEST_EVENTS_HEARTBEAT = float(os.getenv('REQUEST_EVENTS_HEARTBEAT', '15'))
+REQUEST_EVENTS_RETRY_MS = int(os.getenv('REQUEST_EVENTS_RETRY_MS', '3000'))
+
+# Rendered template fragments (static page bodies, sidebars); bump the version to drop them all
+TEMPLATE_FRAGMENT_VERSION = os.getenv('TEMPLATE_FRAGMENT_VERSION', '1')
+TEMPLATE_FRAGMENT_CACHE_TIMEOUT = int(os.getenv('TEMPLATE_FRAGMENT_CACHE_TIMEOUT', '86400'))
+
+# Seconds the admin dashboard's global request counts may be served from cache
+REQUEST_COUNTS_CACHE_TIMEOUT = int(os.getenv('REQUEST_COUNTS_CACHE_TIMEOUT', '300'))
+
+# Chunked, resumable attachment uploads: largest file, suggested chunk size
+# (bytes), and hours an unfinished upload is kept before it is purged
+ATTACHMENT_UPLOAD_MAX_SIZE = int(os.getenv('ATTACHMENT_UPLOAD_MAX_SIZE', str(25 * 1024 * 1024)))
+ATTACHMENT_UPLOAD_CHUNK_SIZE = int(os.getenv('ATTACHMENT_UPLOAD_CHUNK_SIZE', str(1024 * 1024)))
+ATTACHMENT_UPLOAD_EXPIRY_HOURS = int(os.getenv('ATTACHMENT_UPLOAD_EXPIRY_HOURS', '24'))
+
+
 # Supabase Configuration
 SUPABASE_URL = os.getenv('SUPABASE_URL')
 SUPABASE_KEY = os.getenv('SUPABASE_KEY')
 SUPABASE_SERVICE_KEY = os.getenv('SUPABASE_SERVICE_KEY')
 
+# Supabase Admin API HTTP client (pooled keep-alive session)
+SUPABASE_HTTP_TIMEOUT = float(os.getenv('SUPABASE_HTTP_TIMEOUT', '10'))
+SUPABASE_HTTP_POOL_SIZE = int(os.getenv('SUPABASE_HTTP_POOL_SIZE', '10'))
+SUPABASE_HTTP_RETRIES = int(os.getenv('SUPABASE_HTTP_RETRIES', '3'))
+SUPABASE_HTTP_BACKOFF = float(os.getenv('SUPABASE_HTTP_BACKOFF', '0.5'))
+# Seconds a Supabase user found by email is remembered locally
+SUPABASE_EMAIL_CACHE_TTL = int(os.getenv('SUPABASE_EMAIL_CACHE_TTL', '300'))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -135,6 +196,13 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Protected media downloads (accounts/downloads.py) are streamed by Django
+# unless handed to the front-end server: 'x-accel-redirect' (nginx, with an
+# internal location at MEDIA_ACCEL_REDIRECT_PREFIX aliased to MEDIA_ROOT)
+# or 'x-sendfile' (Apache mod_xsendfile, lighttpd)
+MEDIA_SENDFILE_BACKEND = os.getenv('MEDIA_SENDFILE_BACKEND', '')
+MEDIA_ACCEL_REDIRECT_PREFIX = os.getenv('MEDIA_ACCEL_REDIRECT_PREFIX', '/protected-media/')
+
 LOGIN_URL = '/accounts/login/'
 LOGIN_REDIRECT_URL = '/dashboard/'
 LOGOUT_REDIRECT_URL = '/accounts/login/'
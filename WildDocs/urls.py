@@ -2,7 +2,7 @@
 from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
-from django.conf.urls.static import static
+from accounts.views import media_file
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -10,8 +10,7 @@ urlpatterns = [
     path('accounts/', include('accounts.urls')),
     path('dashboard/', include('dashboard.urls')),
     path('requests/', include('request.urls')),
-]
 
-# Serve media files in development
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    # Media is permission-checked and streamed in every mode (accounts/downloads.py)
+    path(f"{settings.MEDIA_URL.strip('/')}/<path:path>", media_file, name='media_file'),
+]
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import StudentAccount, AdminAccount
+from .models import StudentAccount, AdminAccount, ImageJob
 
 
 @admin.register(StudentAccount)
@@ -72,4 +72,14 @@ class AdminAccountAdmin(admin.ModelAdmin):
 
     def get_email(self, obj):
         return obj.user.email
-    get_email.short_description = 'Email'
\ No newline at end of file
+    get_email.short_description = 'Email'
+
+
+@admin.register(ImageJob)
+class ImageJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'source', 'status', 'attempts', 'next_attempt_at', 'completed_at')
+    list_filter = ('kind', 'status', 'created_at')
+    search_fields = ('source', 'digest', 'student__student_number')
+    raw_id_fields = ('student', 'attachment')
+    readonly_fields = ('created_at', 'completed_at', 'last_error')
+    ordering = ('-created_at',)
@@ -0,0 +1,168 @@
+"""
+Streaming file responses for protected media.
+
+serve_media_file() answers a download of a file under MEDIA_ROOT without
+reading it into memory. Depending on MEDIA_SENDFILE_BACKEND it either:
+
+- streams the file with FileResponse, honouring If-None-Match /
+  If-Modified-Since (304), If-Match / If-Unmodified-Since (412) and a
+  single-range Range header (206, or 416 when out of bounds), or
+- hands the file to the front-end server with X-Accel-Redirect (nginx) or
+  X-Sendfile (Apache, lighttpd), which then sends the bytes, ranges
+  included, so the app server never copies them.
+
+Views check permissions first; this module only deals with the file.
+"""
+
+import mimetypes
+import os
+from pathlib import Path
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+
+# Bytes per read when streaming a file or a range of it
+STREAM_BLOCK_SIZE = 64 * 1024
+
+
+def media_path(name):
+    """Local path of a MEDIA_ROOT-relative name; Http404 outside MEDIA_ROOT or missing"""
+    media_root = Path(settings.MEDIA_ROOT).resolve()
+    path = (media_root / name).resolve()
+    if not path.is_relative_to(media_root) or not path.is_file():
+        raise Http404('File not found')
+    return path
+
+
+def file_etag(stat):
+    """Validator for a file version: changes whenever its size or mtime does"""
+    return quote_etag(f"{stat.st_size:x}-{stat.st_mtime_ns:x}")
+
+
+def parse_range(header, size):
+    """
+    The (start, end) byte positions, end inclusive, of a single-range
+    Range header. None means serve the whole file (no header, several
+    ranges or a unit other than bytes); ValueError means unsatisfiable.
+    """
+    if not header or not header.startswith('bytes=') or ',' in header:
+        return None
+    start, sep, end = header[len('bytes='):].strip().partition('-')
+    if not sep:
+        return None
+    try:
+        if not start:
+            # Suffix range: the last <end> bytes
+            length = int(end)
+            if length <= 0:
+                raise ValueError('Empty suffix range')
+            return max(size - length, 0), size - 1
+        start = int(start)
+        end = int(end) if end else size - 1
+    except ValueError:
+        return None
+    if start >= size or end < start:
+        raise ValueError('Range not satisfiable')
+    return start, min(end, size - 1)
+
+
+class RangeFile:
+    """File-like view of bytes start..end (inclusive) of an open file"""
+
+    def __init__(self, f, start, end):
+        self._file = f
+        self._file.seek(start)
+        self._remaining = end - start + 1
+
+    def read(self, size=-1):
+        if size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._file.read(size)
+        self._remaining -= len(data)
+        return data
+
+    def close(self):
+        self._file.close()
+
+
+def _if_range_matches(request, etag, last_modified):
+    """Whether a Range header applies under If-Range (absent means it does)"""
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == int(last_modified)
+
+
+def _content_disposition(filename, as_attachment):
+    disposition = 'attachment' if as_attachment else 'inline'
+    return f"{disposition}; filename*=UTF-8''{quote(filename)}"
+
+
+def serve_media_file(request, name, as_attachment=False, filename=None, immutable=False):
+    """
+    Respond with the MEDIA_ROOT file name. immutable marks content-addressed
+    files that never change under the same name, so browsers keep them for
+    a year without revalidating; other files are revalidated every time.
+    """
+    path = media_path(name)
+    stat = path.stat()
+    etag = file_etag(stat)
+    last_modified = stat.st_mtime
+    filename = filename or path.name
+    content_type = mimetypes.guess_type(path.name)[0] or 'application/octet-stream'
+
+    def finish(response):
+        response.headers.setdefault('ETag', etag)
+        response.headers.setdefault('Last-Modified', http_date(last_modified))
+        if immutable:
+            patch_cache_control(response, private=True, max_age=31536000, immutable=True)
+        else:
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    conditional = get_conditional_response(request, etag=etag, last_modified=int(last_modified))
+    if conditional is not None:
+        return finish(conditional)
+
+    backend = settings.MEDIA_SENDFILE_BACKEND
+    if backend:
+        response = HttpResponse(content_type=content_type)
+        response['Content-Disposition'] = _content_disposition(filename, as_attachment)
+        relative = path.relative_to(Path(settings.MEDIA_ROOT).resolve()).as_posix()
+        if backend == 'x-accel-redirect':
+            response['X-Accel-Redirect'] = quote(f"{settings.MEDIA_ACCEL_REDIRECT_PREFIX.rstrip('/')}/{relative}")
+        elif backend == 'x-sendfile':
+            response['X-Sendfile'] = str(path)
+        else:
+            raise ValueError(f"Unknown MEDIA_SENDFILE_BACKEND {backend!r}")
+        return finish(response)
+
+    size = stat.st_size
+    byte_range = None
+    if request.method == 'GET' and _if_range_matches(request, etag, last_modified):
+        try:
+            byte_range = parse_range(request.headers.get('Range'), size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f"bytes */{size}"
+            return finish(response)
+
+    f = open(path, 'rb')
+    if byte_range is None:
+        # FileResponse hands the open file to wsgi.file_wrapper (sendfile where available)
+        response = FileResponse(f, content_type=content_type, as_attachment=as_attachment, filename=filename)
+        response.block_size = STREAM_BLOCK_SIZE
+    else:
+        start, end = byte_range
+        response = FileResponse(RangeFile(f, start, end), status=206, content_type=content_type)
+        response.block_size = STREAM_BLOCK_SIZE
+        response['Content-Length'] = str(end - start + 1)
+        response['Content-Range'] = f"bytes {start}-{end}/{size}"
+        response['Content-Disposition'] = _content_disposition(filename, as_attachment)
+    response['Accept-Ranges'] = 'bytes'
+    return finish(response)
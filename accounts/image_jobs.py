@@ -0,0 +1,177 @@
+"""
+Database-backed queue for image processing.
+
+Views persist the original upload and call enqueue_profile_picture() or
+enqueue_attachment() so the request returns without decoding anything. The
+process_image_jobs management command claims due jobs in batches, runs the
+CPU-bound work in a process pool and points the record at the processed
+file, retrying failures with exponential backoff.
+"""
+
+import logging
+from concurrent.futures import Future
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .images import (
+    InvalidImage,
+    fallback_url,
+    picture_dir,
+    release_profile_picture,
+    render_profile_picture,
+    sanitize_attachment,
+)
+from .models import Attachment, ImageJob, StudentAccount
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 16
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_BACKOFF_SECONDS = 30
+# How long a claimed batch is hidden from other workers while it is processed
+CLAIM_LEASE_SECONDS = 300
+
+
+def enqueue_profile_picture(student, digest, original_url):
+    """Queue rendering of a profile picture saved by save_profile_picture"""
+    return ImageJob.objects.create(
+        kind='profile_picture',
+        student=student,
+        digest=digest,
+        source=original_url[len(settings.MEDIA_URL):],
+    )
+
+
+def enqueue_attachment(attachment):
+    """Queue metadata stripping and downscaling of an image attachment"""
+    return ImageJob.objects.create(kind='attachment', attachment=attachment, source=attachment.file.name)
+
+
+def claim_due_jobs(batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Claim up to batch_size due jobs. Claimed rows are leased by pushing
+    next_attempt_at forward, so parallel workers skip them and a crashed
+    worker's batch becomes due again once the lease runs out.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        jobs = list(
+            ImageJob.objects.select_for_update(skip_locked=True)
+            .filter(status='Pending', next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        ImageJob.objects.filter(id__in=[job.id for job in jobs]).update(
+            next_attempt_at=now + timedelta(seconds=CLAIM_LEASE_SECONDS)
+        )
+    return jobs
+
+
+def is_superseded(job):
+    """Whether the record a job was queued for has moved on from its original"""
+    if job.kind == 'profile_picture':
+        return not StudentAccount.objects.filter(
+            pk=job.student_id, profile_picture=f"{settings.MEDIA_URL}{job.source}"
+        ).exists()
+    return not Attachment.objects.filter(pk=job.attachment_id, file=job.source).exists()
+
+
+def job_task(job):
+    """The process pool function and arguments that process a job"""
+    source_path = str(Path(settings.MEDIA_ROOT) / job.source)
+    if job.kind == 'profile_picture':
+        return render_profile_picture, (source_path, str(picture_dir(job.digest)))
+    return sanitize_attachment, (source_path,)
+
+
+def apply_result(job, result):
+    """Point the job's record at the processed file and drop the original"""
+    media_root = Path(settings.MEDIA_ROOT)
+    if job.kind == 'profile_picture':
+        original_url = f"{settings.MEDIA_URL}{job.source}"
+        with transaction.atomic():
+            # Skip students who uploaded another picture in the meantime
+            student = StudentAccount.objects.select_for_update().filter(
+                pk=job.student_id, profile_picture=original_url
+            ).first()
+            if student is not None:
+                student.profile_picture_hash = job.digest
+                student.profile_picture = fallback_url(job.digest)
+                student.save(update_fields=['profile_picture_hash', 'profile_picture'])
+        release_profile_picture('', original_url)
+        return
+
+    if result is None:
+        # Not an image; the attachment is kept as uploaded
+        return
+    path, size = result
+    name = Path(path).relative_to(media_root).as_posix()
+    updated = Attachment.objects.filter(pk=job.attachment_id, file=job.source).update(file=name, file_size=size)
+    if updated:
+        (media_root / job.source).unlink(missing_ok=True)
+    else:
+        Path(path).unlink(missing_ok=True)
+
+
+def _run_inline(func, args):
+    """Run a task in this process, wrapped like a pool's Future"""
+    future = Future()
+    try:
+        future.set_result(func(*args))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+
+def process_image_jobs(executor=None, batch_size=DEFAULT_BATCH_SIZE,
+                       max_attempts=DEFAULT_MAX_ATTEMPTS, backoff_seconds=DEFAULT_BACKOFF_SECONDS):
+    """
+    Process one batch of due jobs. The image work of the whole batch is
+    submitted to executor (a process pool) at once and runs in parallel;
+    without one it runs inline. Results are applied in this process. Failed
+    jobs are retried after backoff_seconds * 2 ** (attempts - 1) and marked
+    Failed after max_attempts, or at once for files that are not valid
+    images. Returns a dict of done/skipped/retried/failed counts.
+    """
+    jobs = claim_due_jobs(batch_size)
+    stats = {'done': 0, 'skipped': 0, 'retried': 0, 'failed': 0}
+    if not jobs:
+        return stats
+
+    submitted = []
+    finished_ids = []
+    for job in jobs:
+        if is_superseded(job):
+            if job.kind == 'profile_picture':
+                # Nothing will be rendered from this original now
+                release_profile_picture('', f"{settings.MEDIA_URL}{job.source}")
+            finished_ids.append(job.id)
+            stats['skipped'] += 1
+            continue
+        func, args = job_task(job)
+        future = executor.submit(func, *args) if executor is not None else _run_inline(func, args)
+        submitted.append((job, future))
+
+    for job, future in submitted:
+        try:
+            apply_result(job, future.result())
+        except Exception as e:
+            job.attempts += 1
+            job.last_error = str(e)
+            if isinstance(e, InvalidImage) or job.attempts >= max_attempts:
+                job.status = 'Failed'
+                stats['failed'] += 1
+                logger.error(f"Giving up on image job #{job.id} ({job.source}): {e}")
+            else:
+                job.next_attempt_at = timezone.now() + timedelta(seconds=backoff_seconds * 2 ** (job.attempts - 1))
+                stats['retried'] += 1
+            job.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at'])
+        else:
+            finished_ids.append(job.id)
+            stats['done'] += 1
+
+    if finished_ids:
+        ImageJob.objects.filter(id__in=finished_ids).update(status='Done', completed_at=timezone.now(), last_error='')
+    return stats
@@ -0,0 +1,317 @@
+"""
+Profile picture pipeline.
+
+Uploads are hashed while they are read, and the SHA-256 of the original
+names the directory holding its renditions, so a picture uploaded before
+(by anyone) is reused without decoding it again:
+
+    MEDIA_ROOT/profile_pictures/ab/abcdef.../sm.webp, md.webp, lg.webp, lg.jpg
+
+A new picture is decoded once, cropped square, and written as one WebP per
+slot size plus a JPEG fallback of the largest. Directories no longer used
+by any student are removed when a student replaces their picture, and by
+the gc_profile_pictures command for anything left behind.
+
+Views only persist the original (save_profile_picture); decoding happens in
+the process_image_jobs worker (accounts/image_jobs.py). The functions the
+worker runs in its process pool take absolute paths and touch no models.
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from django.conf import settings
+from PIL import Image, ImageOps
+
+PROFILE_PICTURE_DIR = 'profile_pictures'
+# Uploads waiting for the worker: profile_pictures/originals/<sha256>.<ext>
+ORIGINALS_DIR = 'originals'
+
+# Square edge in pixels per template slot: twice the CSS size for HiDPI screens
+PROFILE_PICTURE_SIZES = {
+    'sm': 128,   # dashboard avatar (60px)
+    'md': 320,   # profile page avatar and edit preview (100-150px)
+    'lg': 640,   # full view
+}
+FALLBACK_SIZE = 'lg'
+
+MAX_UPLOAD_BYTES = 10 * 1024 * 1024
+ALLOWED_FORMATS = {'JPEG', 'PNG', 'GIF', 'WEBP'}
+# Refuse decompression bombs well before Pillow's own limit
+MAX_IMAGE_PIXELS = 40_000_000
+
+WEBP_QUALITY = 80
+JPEG_QUALITY = 85
+
+# Longest edge kept for image attachments: an A4 scan at 300 dpi
+MAX_ATTACHMENT_EDGE = 3508
+
+FORMAT_EXTENSIONS = {'JPEG': '.jpg', 'PNG': '.png', 'GIF': '.gif', 'WEBP': '.webp'}
+
+# Renditions touched this recently are never collected, so an upload that
+# reuses a directory cannot lose it before its profile save commits
+GC_GRACE_SECONDS = 600
+
+
+class InvalidImage(ValueError):
+    """The upload is not an image the pipeline accepts"""
+
+
+def picture_dir(digest):
+    """Directory holding the renditions of a picture"""
+    return Path(settings.MEDIA_ROOT) / PROFILE_PICTURE_DIR / digest[:2] / digest
+
+
+def rendition_names():
+    """File names of every rendition of a picture"""
+    names = [f"{size}.webp" for size in PROFILE_PICTURE_SIZES]
+    names.append(f"{FALLBACK_SIZE}.jpg")
+    return names
+
+
+def picture_url(digest, size='md', ext='webp'):
+    """URL of one rendition of a picture"""
+    return f"{settings.MEDIA_URL}{PROFILE_PICTURE_DIR}/{digest[:2]}/{digest}/{size}.{ext}"
+
+
+def fallback_url(digest):
+    """URL of the JPEG rendition, for clients and emails without WebP"""
+    return picture_url(digest, FALLBACK_SIZE, 'jpg')
+
+
+def is_rendered(digest):
+    """Whether every rendition of a picture exists"""
+    directory = picture_dir(digest)
+    return all((directory / name).exists() for name in rendition_names())
+
+
+def open_image(source):
+    """Open and sanity-check an image without decoding its pixels"""
+    try:
+        image = Image.open(source)
+    except (OSError, Image.DecompressionBombError) as e:
+        raise InvalidImage('The file is not a readable image.') from e
+    if image.format not in ALLOWED_FORMATS:
+        raise InvalidImage('Invalid file format. Please use JPG, PNG, GIF or WebP.')
+    if image.width * image.height > MAX_IMAGE_PIXELS:
+        raise InvalidImage('Image dimensions are too large.')
+    return image
+
+
+def _write_atomically(image, path, **save_options):
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            image.save(f, **save_options)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def render_renditions(source, digest, directory=None):
+    """
+    Decode an image once and write its renditions. EXIF orientation is
+    applied and all metadata is dropped. source is a path or file object;
+    directory defaults to picture_dir(digest).
+    """
+    image = open_image(source)
+    largest = max(PROFILE_PICTURE_SIZES.values())
+    # Let the JPEG decoder scale down by a power of two while decoding
+    image.draft('RGB', (largest, largest))
+    try:
+        image = ImageOps.exif_transpose(image)
+        has_alpha = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+    except (OSError, ValueError) as e:
+        raise InvalidImage('The image could not be decoded.') from e
+
+    directory = Path(directory) if directory else picture_dir(digest)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    # Largest first; each smaller size is resized from the previous one
+    current = image
+    for size, edge in sorted(PROFILE_PICTURE_SIZES.items(), key=lambda item: -item[1]):
+        current = ImageOps.fit(current, (edge, edge), method=Image.Resampling.LANCZOS)
+        _write_atomically(current, directory / f"{size}.webp", format='WEBP', quality=WEBP_QUALITY, method=4)
+        if size == FALLBACK_SIZE:
+            fallback = current
+            if fallback.mode == 'RGBA':
+                # JPEG has no alpha; flatten onto white
+                background = Image.new('RGB', fallback.size, 'white')
+                background.paste(fallback, mask=fallback.getchannel('A'))
+                fallback = background
+            _write_atomically(fallback, directory / f"{size}.jpg", format='JPEG', quality=JPEG_QUALITY,
+                              optimize=True, progressive=True)
+    return digest
+
+
+def save_profile_picture(upload):
+    """
+    Validate an uploaded profile picture and persist the original, hashing
+    it while it is written. Returns (digest, original_url); original_url is
+    None when renditions of the same picture exist and nothing is left to
+    process. Raises InvalidImage for unusable files.
+    """
+    if upload.size > MAX_UPLOAD_BYTES:
+        raise InvalidImage('Image file too large. Maximum size is 10MB.')
+
+    originals = Path(settings.MEDIA_ROOT) / PROFILE_PICTURE_DIR / ORIGINALS_DIR
+    originals.mkdir(parents=True, exist_ok=True)
+    sha256 = hashlib.sha256()
+    fd, tmp_path = tempfile.mkstemp(dir=originals, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in upload.chunks():
+                sha256.update(chunk)
+                f.write(chunk)
+        digest = sha256.hexdigest()
+        if is_rendered(digest):
+            os.unlink(tmp_path)
+            # Mark the reuse so garbage collection leaves the directory alone
+            os.utime(picture_dir(digest))
+            return digest, None
+
+        # Reads the header only; the pixels are decoded by the worker
+        with open_image(tmp_path) as image:
+            extension = FORMAT_EXTENSIONS[image.format]
+        name = f"{digest}{extension}"
+        os.replace(tmp_path, originals / name)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return digest, f"{settings.MEDIA_URL}{PROFILE_PICTURE_DIR}/{ORIGINALS_DIR}/{name}"
+
+
+def render_profile_picture(source_path, directory):
+    """
+    Process pool entry point: write the renditions of a persisted original.
+    Returns the rendition directory.
+    """
+    if not all((Path(directory) / name).exists() for name in rendition_names()):
+        render_renditions(source_path, Path(directory).name, directory)
+    return str(directory)
+
+
+def sanitize_attachment(source_path):
+    """
+    Process pool entry point: re-encode an image attachment next to the
+    original with orientation applied, metadata stripped and the longest
+    edge capped at MAX_ATTACHMENT_EDGE. Photos become JPEG, images with
+    transparency PNG. Returns (path, size) of the new file, or None for
+    files that are not images (PDFs are kept as uploaded).
+    """
+    try:
+        image = Image.open(source_path)
+    except (OSError, Image.DecompressionBombError):
+        return None
+    with image:
+        if image.format not in ALLOWED_FORMATS:
+            return None
+        if image.width * image.height > MAX_IMAGE_PIXELS:
+            raise InvalidImage('Image dimensions are too large.')
+        image.draft('RGB', (MAX_ATTACHMENT_EDGE, MAX_ATTACHMENT_EDGE))
+        try:
+            image = ImageOps.exif_transpose(image)
+            has_alpha = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+            image = image.convert('RGBA' if has_alpha else 'RGB')
+        except (OSError, ValueError) as e:
+            raise InvalidImage('The image could not be decoded.') from e
+
+    image.thumbnail((MAX_ATTACHMENT_EDGE, MAX_ATTACHMENT_EDGE), Image.Resampling.LANCZOS)
+    source = Path(source_path)
+    if has_alpha:
+        path = source.with_name(f"{source.stem}.clean.png")
+        _write_atomically(image, path, format='PNG', optimize=True)
+    else:
+        path = source.with_name(f"{source.stem}.clean.jpg")
+        _write_atomically(image, path, format='JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+    return str(path), path.stat().st_size
+
+
+def _media_path_for_url(url):
+    """Local path of a MEDIA_URL-relative URL inside MEDIA_ROOT, or None"""
+    if not url or not url.startswith(settings.MEDIA_URL):
+        return None
+    media_root = Path(settings.MEDIA_ROOT).resolve()
+    path = (media_root / url[len(settings.MEDIA_URL):]).resolve()
+    return path if path.is_relative_to(media_root) else None
+
+
+def _recently_touched(path, grace_seconds):
+    try:
+        return time.time() - path.stat().st_mtime < grace_seconds
+    except FileNotFoundError:
+        return False
+
+
+def release_profile_picture(digest, url, grace_seconds=GC_GRACE_SECONDS):
+    """
+    Delete a student's previous picture once nothing refers to it any more.
+    digest is the superseded picture's hash (renditions), url its stored
+    URL, which for pictures from before the pipeline is the raw upload.
+    """
+    from .models import StudentAccount
+
+    if digest and not StudentAccount.objects.filter(profile_picture_hash=digest).exists():
+        directory = picture_dir(digest)
+        if directory.exists() and not _recently_touched(directory, grace_seconds):
+            shutil.rmtree(directory, ignore_errors=True)
+
+    legacy_path = _media_path_for_url(url)
+    if (not digest and legacy_path is not None and legacy_path.is_file()
+            and not StudentAccount.objects.filter(profile_picture=url).exists()):
+        legacy_path.unlink(missing_ok=True)
+
+
+def collect_garbage(grace_seconds=GC_GRACE_SECONDS, dry_run=False):
+    """
+    Remove rendition directories and legacy raw uploads under
+    MEDIA_ROOT/profile_pictures that no student refers to. Returns the list
+    of removed paths.
+    """
+    from .models import StudentAccount
+
+    root = Path(settings.MEDIA_ROOT) / PROFILE_PICTURE_DIR
+    if not root.exists():
+        return []
+
+    referenced_digests = set(
+        StudentAccount.objects.exclude(profile_picture_hash='').values_list('profile_picture_hash', flat=True)
+    )
+    referenced_paths = {
+        path for path in (
+            _media_path_for_url(url)
+            for url in StudentAccount.objects.exclude(profile_picture__isnull=True)
+            .exclude(profile_picture='').values_list('profile_picture', flat=True)
+        ) if path is not None
+    }
+
+    removed = []
+    for parent in root.iterdir():
+        if not parent.is_dir():
+            continue
+        for entry in parent.iterdir():
+            if _recently_touched(entry, grace_seconds):
+                continue
+            if entry.is_dir() and len(parent.name) == 2 and entry.name.startswith(parent.name):
+                # Rendition directory: <ab>/<abcdef...>
+                if entry.name in referenced_digests:
+                    continue
+                if not dry_run:
+                    shutil.rmtree(entry, ignore_errors=True)
+                removed.append(entry)
+            elif entry.is_file() and entry.resolve() not in referenced_paths:
+                # Raw upload from before the pipeline: <student_number>/<uuid>.<ext>
+                if not dry_run:
+                    entry.unlink(missing_ok=True)
+                removed.append(entry)
+        # originals/ is kept: uploads create files in it without a lock
+        if not dry_run and parent.name != ORIGINALS_DIR and not any(parent.iterdir()):
+            parent.rmdir()
+    return removed
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from accounts.images import GC_GRACE_SECONDS, collect_garbage
+
+
+class Command(BaseCommand):
+    help = 'Delete profile picture renditions and raw uploads that no student refers to any more'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace',
+            type=int,
+            default=GC_GRACE_SECONDS,
+            help=f'Skip files changed within this many seconds (default: {GC_GRACE_SECONDS})',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='List what would be deleted without deleting it',
+        )
+
+    def handle(self, *args, **options):
+        removed = collect_garbage(grace_seconds=options['grace'], dry_run=options['dry_run'])
+        for path in removed:
+            self.stdout.write(str(path))
+
+        verb = 'Would delete' if options['dry_run'] else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(f"{verb} {len(removed)} unused profile picture(s)."))
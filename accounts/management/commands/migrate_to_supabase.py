@@ -1,29 +1,181 @@
-from django.core.management.base import BaseCommand
+import csv
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
 from django.contrib.auth.models import User
-from services.supabase_client import create_user_admin
+from django.utils.crypto import get_random_string
+from services.supabase_client import check_user_exists, create_user_admin, get_client
+
+REPORT_FIELDS = ['user_id', 'username', 'email', 'outcome', 'detail']
+DEFAULT_REPORT = 'supabase_migration_report.csv'
+# Dry runs report separately so they never truncate a real run's report
+DEFAULT_DRY_RUN_REPORT = 'supabase_migration_dry_run_report.csv'
+
+
+class RateLimiter:
+    """Thread-safe limiter spacing calls evenly at up to `rate` per second"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0
+        self.next_slot = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            slot = max(self.next_slot, now)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def load_checkpoint(path):
+    """
+    Get the last fully processed user id and the outcome totals so far from
+    a checkpoint file, or (0, None) when there is nothing to resume.
+    """
+    try:
+        with open(path) as f:
+            checkpoint = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return 0, None
+    return checkpoint.get('last_user_id', 0), checkpoint.get('totals')
+
+
+def save_checkpoint(path, last_user_id, totals):
+    """Atomically record progress so an interrupted run can resume"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({'last_user_id': last_user_id, 'totals': totals}, f)
+    os.replace(tmp_path, path)
+
 
 class Command(BaseCommand):
     help = 'Migrate all Django users to Supabase Auth (creates Supabase users for each Django user if not present)'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8, help='Concurrent Supabase requests (default: 8)')
+        parser.add_argument('--rate', type=float, default=20, help='Maximum Supabase requests per second, 0 for no limit (default: 20)')
+        parser.add_argument('--chunk-size', type=int, default=200, help='Users read and checkpointed per batch (default: 200)')
+        parser.add_argument('--checkpoint', default='supabase_migration_checkpoint.json', help='Checkpoint file used to resume an interrupted run')
+        parser.add_argument('--report', help=f'CSV report of created/skipped/failed users (default: {DEFAULT_REPORT}, or {DEFAULT_DRY_RUN_REPORT} with --dry-run)')
+        parser.add_argument('--restart', action='store_true', help='Ignore any existing checkpoint and start from the first user')
+        parser.add_argument('--dry-run', action='store_true', help='Only check which users already exist; create nothing')
+
     def handle(self, *args, **options):
-        users = User.objects.all()
-        created = 0
-        skipped = 0
-        for user in users:
-            email = user.email
-            password = User.objects.make_random_password()
-            user_metadata = {
-                "student_number": user.username,
-                "first_name": user.first_name,
-                "last_name": user.last_name,
-            }
-            resp, err = create_user_admin(email, password, user_metadata)
-            if err == "User already exists":
-                self.stdout.write(self.style.WARNING(f"Skipped (already exists): {email}"))
-                skipped += 1
-            elif err:
-                self.stdout.write(self.style.ERROR(f"Error for {email}: {err}"))
-            else:
-                self.stdout.write(self.style.SUCCESS(f"Created Supabase user: {email}"))
-                created += 1
-        self.stdout.write(self.style.SUCCESS(f"Done. Created: {created}, Skipped: {skipped}, Total: {users.count()}"))
+        dry_run = options['dry_run']
+        checkpoint_path = options['checkpoint']
+        chunk_size = max(1, options['chunk_size'])
+        report_path = options['report'] or (DEFAULT_DRY_RUN_REPORT if dry_run else DEFAULT_REPORT)
+        if dry_run and options['report'] and os.path.exists(checkpoint_path) and os.path.exists(report_path):
+            raise CommandError(
+                f"{report_path} may hold the results of the interrupted run in {checkpoint_path}; "
+                f"pass another --report for the dry run."
+            )
+
+        # A dry run never advances the real checkpoint
+        start_after, saved_totals = (0, None) if options['restart'] else load_checkpoint(checkpoint_path)
+        if start_after:
+            self.stdout.write(f"Resuming after user id {start_after} (use --restart to start over).")
+
+        users = User.objects.filter(id__gt=start_after).order_by('id').only(
+            'id', 'username', 'email', 'first_name', 'last_name'
+        )
+        total = users.count()
+        self.stdout.write(f"{total} user(s) to process{' (dry run)' if dry_run else ''}.")
+
+        limiter = RateLimiter(options['rate'])
+        get_client()  # Create the shared client before worker threads race to create their own
+        totals = {'created': 0, 'skipped': 0, 'failed': 0}
+        # A resumed run carries on the interrupted run's totals; a dry run counts only itself
+        if start_after and saved_totals and not dry_run:
+            totals.update({outcome: saved_totals.get(outcome, 0) for outcome in totals})
+        processed = 0
+        started = time.monotonic()
+
+        report_mode = 'a' if start_after and not dry_run else 'w'
+        with open(report_path, report_mode, newline='') as report_file, \
+                ThreadPoolExecutor(max_workers=max(1, options['workers'])) as pool:
+            writer = csv.DictWriter(report_file, fieldnames=REPORT_FIELDS)
+            if report_mode == 'w':
+                writer.writeheader()
+
+            chunk = []
+            for user in users.iterator(chunk_size=chunk_size):
+                chunk.append(user)
+                if len(chunk) == chunk_size:
+                    processed += self.process_chunk(pool, chunk, limiter, dry_run, writer, totals)
+                    self.finish_chunk(chunk, checkpoint_path, dry_run, totals, report_file, processed, total, started)
+                    chunk = []
+            if chunk:
+                processed += self.process_chunk(pool, chunk, limiter, dry_run, writer, totals)
+                self.finish_chunk(chunk, checkpoint_path, dry_run, totals, report_file, processed, total, started)
+
+        if not dry_run and os.path.exists(checkpoint_path):
+            # The run completed, so the next one starts from scratch
+            os.remove(checkpoint_path)
+
+        elapsed = time.monotonic() - started
+        label = 'Would create' if dry_run else 'Created'
+        self.stdout.write(self.style.SUCCESS(
+            f"Done. {label}: {totals['created']}, Skipped: {totals['skipped']}, "
+            f"Failed: {totals['failed']}, Total: {sum(totals.values())} in {elapsed:.1f}s. "
+            f"Report: {report_path}"
+        ))
+
+    def process_chunk(self, pool, chunk, limiter, dry_run, writer, totals):
+        """Migrate one chunk concurrently and record every outcome"""
+        for user, (outcome, detail) in zip(chunk, pool.map(lambda u: self.migrate_user(u, limiter, dry_run), chunk)):
+            totals[outcome] += 1
+            writer.writerow({
+                'user_id': user.id,
+                'username': user.username,
+                'email': user.email,
+                'outcome': outcome,
+                'detail': detail,
+            })
+            if outcome == 'failed':
+                self.stdout.write(self.style.ERROR(f"Error for {user.email or user.username}: {detail}"))
+        return len(chunk)
+
+    def finish_chunk(self, chunk, checkpoint_path, dry_run, totals, report_file, processed, total, started):
+        """Flush the report, checkpoint and print progress after a chunk"""
+        report_file.flush()
+        if not dry_run:
+            save_checkpoint(checkpoint_path, chunk[-1].id, totals)
+        elapsed = time.monotonic() - started
+        rate = processed / elapsed if elapsed > 0 else 0
+        self.stdout.write(
+            f"{processed}/{total} processed ({rate:.1f} users/s) - "
+            f"created {totals['created']}, skipped {totals['skipped']}, failed {totals['failed']}"
+        )
+
+    def migrate_user(self, user, limiter, dry_run):
+        """Create one Supabase user; runs on a worker thread"""
+        if not user.email:
+            return 'skipped', 'no email'
+
+        limiter.wait()
+        if dry_run:
+            exists, result = check_user_exists(user.email)
+            if isinstance(result, str):
+                return 'failed', result
+            return ('skipped', 'already exists') if exists else ('created', '')
+
+        user_metadata = {
+            "student_number": user.username,
+            "first_name": user.first_name,
+            "last_name": user.last_name,
+        }
+        resp, err = create_user_admin(user.email, get_random_string(32), user_metadata)
+        if err == "User already exists":
+            return 'skipped', 'already exists'
+        if err:
+            return 'failed', err
+        return 'created', resp.get('id', '')
@@ -0,0 +1,64 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from accounts.image_jobs import (
+    DEFAULT_BACKOFF_SECONDS,
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_MAX_ATTEMPTS,
+    process_image_jobs,
+)
+
+
+class Command(BaseCommand):
+    help = 'Resize, convert and strip metadata from queued image uploads in a pool of worker processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=os.cpu_count() or 1, help='Worker processes decoding images; 0 processes inline (default: one per CPU)')
+        parser.add_argument('--batch-size', type=int, default=None, help=f'Jobs claimed per batch (default: {DEFAULT_BATCH_SIZE} or twice --processes, whichever is larger)')
+        parser.add_argument('--max-attempts', type=int, default=DEFAULT_MAX_ATTEMPTS, help=f'Attempts before a job is marked Failed (default: {DEFAULT_MAX_ATTEMPTS})')
+        parser.add_argument('--backoff', type=int, default=DEFAULT_BACKOFF_SECONDS, help=f'Base retry delay in seconds, doubled per attempt (default: {DEFAULT_BACKOFF_SECONDS})')
+        parser.add_argument('--loop', action='store_true', help='Keep polling for new jobs instead of exiting once the queue is drained')
+        parser.add_argument('--interval', type=float, default=2.0, help='Seconds to sleep between polls in --loop mode (default: 2)')
+
+    def handle(self, *args, **options):
+        processes = options['processes']
+        batch_size = options['batch_size'] or max(DEFAULT_BATCH_SIZE, processes * 2)
+        totals = {'done': 0, 'skipped': 0, 'retried': 0, 'failed': 0}
+
+        executor = None
+        if processes > 0:
+            # Children only decode and write files; keep DB sockets out of them
+            connections.close_all()
+            executor = ProcessPoolExecutor(max_workers=processes)
+        try:
+            while True:
+                stats = process_image_jobs(
+                    executor=executor,
+                    batch_size=batch_size,
+                    max_attempts=options['max_attempts'],
+                    backoff_seconds=options['backoff'],
+                )
+                for key, value in stats.items():
+                    totals[key] += value
+                if any(stats.values()):
+                    self.stdout.write(
+                        f"Batch: done {stats['done']}, skipped {stats['skipped']}, "
+                        f"retrying {stats['retried']}, failed {stats['failed']}"
+                    )
+                    continue
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Done. Processed: {totals['done']}, Skipped: {totals['skipped']}, "
+            f"Retrying: {totals['retried']}, Failed: {totals['failed']}"
+        ))
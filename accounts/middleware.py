@@ -0,0 +1,134 @@
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.utils.decorators import sync_and_async_middleware
+
+from .models import StudentAccount
+
+# Session key holding the cached {'user_id', 'role'} of the signed-in user
+IDENTITY_SESSION_KEY = '_account_identity'
+
+
+class AccountIdentity:
+    """
+    The signed-in user's role and student/admin account, resolved at most
+    once per request.
+
+    Loading uses a single query on User with both accounts joined in
+    (select_related), so student.user and admin.user never query again.
+    With ACCOUNT_IDENTITY_SESSION_CACHE on, the role alone is kept in the
+    session, so role checks such as login redirects cost no query at all.
+    """
+
+    ADMIN = 'admin'
+    STUDENT = 'student'
+
+    def __init__(self, request):
+        self._request = request
+        self._user_id = None
+        self._loaded = False
+        self._role = None
+        self._student = None
+        self._admin = None
+
+    def _current_user_id(self):
+        user = self._request.user
+        return user.pk if user.is_authenticated else None
+
+    def _ensure_current(self):
+        # A login or logout during the request switches users
+        user_id = self._current_user_id()
+        if user_id != self._user_id:
+            self._user_id = user_id
+            self._loaded = False
+            self._role = None
+
+    def _load(self):
+        self._ensure_current()
+        if self._loaded:
+            return
+        self._loaded = True
+        self._student = self._admin = None
+        if self._user_id is None:
+            return
+
+        user = User.objects.select_related('studentaccount', 'adminaccount').get(pk=self._user_id)
+        self._admin = getattr(user, 'adminaccount', None)
+        self._student = getattr(user, 'studentaccount', None)
+        if self._admin is not None:
+            self._role = self.ADMIN
+        elif self._student is not None:
+            self._role = self.STUDENT
+        else:
+            self._role = None
+        self._store_role()
+
+    def _store_role(self):
+        if getattr(settings, 'ACCOUNT_IDENTITY_SESSION_CACHE', True) and hasattr(self._request, 'session'):
+            cached = {'user_id': self._user_id, 'role': self._role}
+            if self._request.session.get(IDENTITY_SESSION_KEY) != cached:
+                self._request.session[IDENTITY_SESSION_KEY] = cached
+
+    def _cached_role(self):
+        if not getattr(settings, 'ACCOUNT_IDENTITY_SESSION_CACHE', True) or not hasattr(self._request, 'session'):
+            return None
+        cached = self._request.session.get(IDENTITY_SESSION_KEY)
+        if cached and cached.get('user_id') == self._user_id:
+            return cached
+        return None
+
+    async def aload(self):
+        """Resolve the identity from async code; returns self"""
+        await sync_to_async(self._load)()
+        return self
+
+    @property
+    def role(self):
+        """'admin', 'student' or None"""
+        self._ensure_current()
+        if not self._loaded:
+            cached = self._cached_role()
+            if cached is not None:
+                return cached['role']
+            self._load()
+        return self._role
+
+    @property
+    def is_admin(self):
+        return self.role == self.ADMIN
+
+    @property
+    def is_student(self):
+        return self.role == self.STUDENT
+
+    @property
+    def student(self):
+        """The user's StudentAccount (with user loaded), or None"""
+        self._load()
+        return self._student
+
+    @property
+    def admin(self):
+        """The user's AdminAccount (with user loaded), or None"""
+        self._load()
+        return self._admin
+
+    def get_student(self):
+        """Get the user's StudentAccount or raise StudentAccount.DoesNotExist"""
+        if self.student is None:
+            raise StudentAccount.DoesNotExist('No student account for this user')
+        return self._student
+
+
+@sync_and_async_middleware
+def AccountIdentityMiddleware(get_response):
+    """Attach request.identity (an AccountIdentity) to every request"""
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            request.identity = AccountIdentity(request)
+            return await get_response(request)
+    else:
+        def middleware(request):
+            request.identity = AccountIdentity(request)
+            return get_response(request)
+    return middleware
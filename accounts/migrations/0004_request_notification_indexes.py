@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-17 15:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_alter_studentaccount_profile_picture'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['student', 'id'], name='notification_unread_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='request',
+            index=models.Index(fields=['student', 'status', '-date_requested'], name='request_student_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='request',
+            index=models.Index(fields=['status', 'date_requested'], name='request_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='request',
+            index=models.Index(fields=['-date_requested', '-id'], name='request_date_id_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-17 16:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_request_notification_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentaccount',
+            name='profile_picture_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
@@ -2,9 +2,12 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import RegexValidator
 from django.core.files.storage import default_storage
+from django.utils import timezone
 import uuid
 import os
 
+from .images import picture_url
+
 # --- Validator for standardized student IDs ---
 id_validator = RegexValidator(
     regex=r'^\d{2}-\d{4}-\d{3}$',
@@ -31,6 +34,8 @@ class StudentAccount(models.Model):
     email = models.EmailField(max_length=100, default="")
     contact_number = models.CharField(max_length=20, blank=True, null=True)
     profile_picture = models.URLField(max_length=500, blank=True, null=True)  # Store Supabase URL
+    # SHA-256 naming the picture's thumbnail renditions (see accounts/images.py)
+    profile_picture_hash = models.CharField(max_length=64, blank=True, default='')
     course = models.CharField(max_length=100, default="Undeclared")
     program = models.CharField(max_length=100, default="Other")
     year_level = models.PositiveIntegerField(default=1)
@@ -38,6 +43,13 @@ class StudentAccount(models.Model):
     def __str__(self):
         return f"{self.user.first_name} {self.last_name}"
 
+    def get_profile_picture_url(self, size='md'):
+        """URL of the profile picture sized for a template slot, or ''"""
+        if self.profile_picture_hash:
+            return picture_url(self.profile_picture_hash, size)
+        # Pictures uploaded before the thumbnail pipeline only have the original
+        return self.profile_picture or ''
+
 
 # --- Admin account (school staff) ---
 class AdminAccount(models.Model):
@@ -73,6 +85,16 @@ class Request(models.Model):
     status = models.CharField(max_length=50, default='Pending')
     notes = models.TextField(blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            # Student pages: filter by student and status, newest first
+            models.Index(fields=['student', 'status', '-date_requested'], name='request_student_status_idx'),
+            # Overdue checks and admin status filters
+            models.Index(fields=['status', 'date_requested'], name='request_status_date_idx'),
+            # Admin request list keyset pagination
+            models.Index(fields=['-date_requested', '-id'], name='request_date_id_idx'),
+        ]
+
     def __str__(self):
         return f"Request #{self.id} by {self.student}"
 
@@ -98,6 +120,45 @@ class Attachment(models.Model):
         return f"Attachment {self.id} for Request {self.request.id}"
 
 
+# --- Image processing waiting for the process_image_jobs worker ---
+class ImageJob(models.Model):
+    """
+    Resizing, format conversion and metadata stripping for an uploaded
+    image, done off the request thread. The view persists the original and
+    queues a job; the worker swaps the processed file in when it is done.
+    """
+    KIND_CHOICES = [
+        ('profile_picture', 'Profile picture'),
+        ('attachment', 'Attachment'),
+    ]
+    STATUS_CHOICES = [
+        ('Pending', 'Pending'),
+        ('Done', 'Done'),
+        ('Failed', 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    student = models.ForeignKey(StudentAccount, on_delete=models.CASCADE, null=True, blank=True)
+    attachment = models.ForeignKey(Attachment, on_delete=models.CASCADE, null=True, blank=True)
+    # MEDIA_ROOT-relative path of the persisted original
+    source = models.CharField(max_length=500)
+    digest = models.CharField(max_length=64, blank=True, default='')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='imagejob_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} job #{self.id} ({self.status})"
+
+
 # --- Notifications sent to students ---
 class Notification(models.Model):
     student = models.ForeignKey(StudentAccount, on_delete=models.CASCADE)
@@ -106,5 +167,15 @@ class Notification(models.Model):
     date_sent = models.DateTimeField(auto_now_add=True)
     is_read = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            # Unread notifications are always read per student, newest first
+            models.Index(
+                fields=['student', 'id'],
+                condition=models.Q(is_read=False),
+                name='notification_unread_idx'
+            ),
+        ]
+
     def __str__(self):
         return f"Notification for {self.student}"
\ No newline at end of file
@@ -0,0 +1,11 @@
+from django import template
+
+register = template.Library()
+
+
+@register.filter
+def profile_picture_url(student, size='md'):
+    """Profile picture URL for a slot: {{ student|profile_picture_url:'sm' }}"""
+    if not student:
+        return ''
+    return student.get_profile_picture_url(size)
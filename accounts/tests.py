@@ -1,3 +1,715 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from urllib.parse import parse_qs, urlsplit
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser, User
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+
+from accounts import images
+from accounts.downloads import serve_media_file
+from accounts.image_jobs import apply_result, enqueue_attachment, enqueue_profile_picture, job_task, process_image_jobs
+from accounts.management.commands.migrate_to_supabase import save_checkpoint
+from accounts.middleware import AccountIdentity
+from accounts.models import AdminAccount, Attachment, DocumentType, Notification, Request, StudentAccount
+from request.models import RequestManager
+from services import supabase_client
+from services.supabase_client import SupabaseAdminClient
+
+
+class StudentFixtureMixin:
+    """Create the students and document types most tests start from"""
+
+    @classmethod
+    def create_student(cls, student_number='23-0000-001', **fields):
+        """A student whose login (student.user) is their student number with password 'password123'"""
+        user = User.objects.create_user(
+            username=student_number, password='password123', first_name=fields.get('first_name', '')
+        )
+        return StudentAccount.objects.create(user=user, student_number=student_number, **fields)
+
+    @classmethod
+    def create_document(cls, name='Transcript of Records', description='TOR'):
+        return DocumentType.objects.create(name=name, description=description, fee=100)
+
+
+class RequestIndexQueryPlanTests(StudentFixtureMixin, TestCase):
+    """The main request and notification queries should use the composite indexes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = cls.create_student()
+        document = cls.create_document()
+        for index in range(20):
+            req = Request.objects.create(
+                student=cls.student,
+                document=document,
+                purpose='Scholarship application',
+                status=['Pending', 'Approved', 'Completed'][index % 3],
+            )
+            Notification.objects.create(student=cls.student, request=req, message='Status update')
+
+    def setUp(self):
+        if connection.vendor == 'postgresql':
+            # Tiny test tables would otherwise always be sequentially scanned
+            with connection.cursor() as cursor:
+                cursor.execute('SET enable_seqscan = off')
+        elif connection.vendor != 'sqlite':
+            self.skipTest('Query plan assertions cover PostgreSQL and SQLite only')
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan)
+
+    def test_student_status_list_uses_student_status_index(self):
+        queryset = RequestManager.get_pending_requests_for_student(self.student)
+        self.assertUsesIndex(queryset, 'request_student_status_idx')
+
+    def test_overdue_query_uses_status_date_index(self):
+        queryset = RequestManager.get_overdue_approved_requests(days_threshold=14)
+        self.assertUsesIndex(queryset, 'request_status_date_idx')
+
+    def test_admin_request_list_uses_date_id_index(self):
+        threshold = timezone.now() - timedelta(days=1)
+        queryset = Request.objects.filter(date_requested__lt=threshold).order_by('-date_requested', '-id')[:51]
+        self.assertUsesIndex(queryset, 'request_date_id_idx')
+
+    def test_unread_notifications_use_partial_index(self):
+        queryset = Notification.objects.filter(student=self.student, is_read=False).order_by('-id')
+        self.assertUsesIndex(queryset, 'notification_unread_idx')
+
+
+class StandInAuthHandler(BaseHTTPRequestHandler):
+    """Minimal stand-in for the Supabase Auth Admin API"""
+
+    protocol_version = 'HTTP/1.1'  # keep-alive
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        try:
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up waiting (read timeout tests); nobody is left to answer
+            self.close_connection = True
+
+    def do_GET(self):
+        server = self.server
+        server.connections.add(self.client_address)
+        server.auth_headers.append(self.headers.get('Authorization'))
+        if server.failures_left:
+            server.failures_left -= 1
+            self.send_json(503, {'msg': 'unavailable'})
+            return
+        query = {key: values[0] for key, values in parse_qs(urlsplit(self.path).query).items()}
+        server.list_queries.append(query)
+        users = server.users
+        if server.honor_filter and query.get('filter'):
+            users = [user for user in users if query['filter'].lower() in user['email'].lower()]
+        page, per_page = int(query.get('page', 1)), int(query.get('per_page', 50))
+        self.send_json(200, {'users': users[(page - 1) * per_page:page * per_page]})
+
+    def do_POST(self):
+        server = self.server
+        server.connections.add(self.client_address)
+        length = int(self.headers.get('Content-Length', 0))
+        payload = json.loads(self.rfile.read(length))
+        server.posts.append(payload['email'])
+        if server.post_delay:
+            time.sleep(server.post_delay)
+        if server.failures_left:
+            server.failures_left -= 1
+            self.send_json(503, {'msg': 'unavailable'})
+            return
+        self.send_json(200, {'id': 'new-id', 'email': payload['email']})
+
+    def do_DELETE(self):
+        self.server.connections.add(self.client_address)
+        self.send_json(200, {})
+
+
+class StandInAuthServerMixin:
+    """Runs a StandInAuthHandler server and a client pointed at it"""
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StandInAuthHandler)
+        self.server.connections = set()
+        self.server.auth_headers = []
+        self.server.failures_left = 0
+        self.server.users = [{'id': 'abc', 'email': 'juan@example.com'}]
+        self.server.honor_filter = True
+        self.server.list_queries = []
+        self.server.posts = []
+        self.server.post_delay = 0
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        self.client = SupabaseAdminClient(
+            base_url=f"http://127.0.0.1:{self.server.server_port}",
+            service_key='service-key',
+            timeout=5,
+            max_retries=2,
+            backoff_factor=0,
+        )
+
+    def tearDown(self):
+        self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class SupabaseAdminClientTests(StandInAuthServerMixin, SimpleTestCase):
+    """The admin client reuses pooled connections and retries transient errors"""
+
+    def test_calls_reuse_one_connection(self):
+        self.assertEqual(self.client.check_user_exists('Juan@example.com')[0], True)
+        self.assertEqual(self.client.create_user_admin('new@example.com', 'secret123')[0]['id'], 'new-id')
+        self.assertEqual(self.client.delete_user_admin('new-id'), (True, None))
+        self.assertEqual(len(self.server.connections), 1)
+        self.assertEqual(self.server.auth_headers, ['Bearer service-key'])
+
+    def test_transient_errors_are_retried(self):
+        self.server.failures_left = 2
+        exists, user = self.client.check_user_exists('juan@example.com')
+        self.assertTrue(exists)
+        self.assertEqual(user['id'], 'abc')
+
+    def test_gives_up_after_max_retries(self):
+        self.server.failures_left = 5
+        exists, error = self.client.check_user_exists('juan@example.com')
+        self.assertFalse(exists)
+        self.assertIn('503', error)
+
+    def test_create_is_not_resent_after_server_error(self):
+        self.server.failures_left = 1
+        user, error = self.client.create_user_admin('new@example.com', 'secret123')
+        self.assertIsNone(user)
+        self.assertEqual(error, 'unavailable')
+        self.assertEqual(self.server.posts, ['new@example.com'])
+
+    def test_create_is_not_resent_after_read_timeout(self):
+        self.server.post_delay = 0.5
+        user, error = self.client.create_user_admin('new@example.com', 'secret123', timeout=0.1)
+        self.assertIsNone(user)
+        self.assertIn('timed out', error.lower())
+        time.sleep(0.6)
+        self.assertEqual(self.server.posts, ['new@example.com'])
+
+
+class SupabaseUserLookupTests(StandInAuthServerMixin, SimpleTestCase):
+    """check_user_exists asks for one email instead of downloading every user"""
+
+    def setUp(self):
+        super().setUp()
+        self.server.users = [
+            {'id': f'user-{index}', 'email': f'student{index}@example.com'} for index in range(250)
+        ] + [{'id': 'abc', 'email': 'juan@example.com'}, {'id': 'def', 'email': 'xjuan@example.com'}]
+
+    def test_lookup_uses_filter_and_exact_match(self):
+        exists, user = self.client.check_user_exists('juan@example.com')
+        self.assertTrue(exists)
+        self.assertEqual(user['id'], 'abc')
+        self.assertEqual(len(self.server.list_queries), 1)
+        self.assertEqual(self.server.list_queries[0]['filter'], 'juan@example.com')
+
+    def test_substring_matches_are_not_reported(self):
+        self.assertEqual(self.client.check_user_exists('uan@example.com'), (False, None))
+
+    def test_pages_until_found_when_filter_is_ignored(self):
+        self.server.honor_filter = False
+        with mock.patch.object(supabase_client, 'USERS_PER_PAGE', 100):
+            exists, user = self.client.check_user_exists('juan@example.com')
+        self.assertTrue(exists)
+        self.assertEqual(user['id'], 'abc')
+        self.assertEqual([query['page'] for query in self.server.list_queries], ['1', '2', '3'])
+
+    def test_missing_user_stops_at_short_page(self):
+        self.server.honor_filter = False
+        with mock.patch.object(supabase_client, 'USERS_PER_PAGE', 100):
+            self.assertEqual(self.client.check_user_exists('nobody@example.com'), (False, None))
+        self.assertEqual(len(self.server.list_queries), 3)
+
+    def test_known_emails_are_answered_locally(self):
+        self.client.check_user_exists('juan@example.com')
+        self.client.create_user_admin('new@example.com', 'secret123')
+        self.server.list_queries.clear()
+
+        self.assertTrue(self.client.check_user_exists('JUAN@example.com')[0])
+        self.assertTrue(self.client.check_user_exists('new@example.com')[0])
+        self.assertEqual(self.server.list_queries, [])
+
+    def test_deleted_users_are_forgotten(self):
+        self.client.create_user_admin('new@example.com', 'secret123')
+        self.client.delete_user_admin('new-id')
+        self.assertEqual(self.client.check_user_exists('new@example.com'), (False, None))
+        self.assertEqual(len(self.server.list_queries), 1)
+
+    def test_cache_entries_expire(self):
+        self.client.known_emails.ttl = 0
+        self.client.check_user_exists('juan@example.com')
+        self.client.check_user_exists('juan@example.com')
+        self.assertEqual(len(self.server.list_queries), 2)
+
+
+class MigrateToSupabaseCommandTests(TestCase):
+    """The migration runs concurrently, reports every user and can resume"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            User.objects.create_user(username=f'23-0000-{index:03d}', email=f'student{index}@example.com')
+            for index in range(7)
+        ]
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.checkpoint = os.path.join(tmp_dir.name, 'checkpoint.json')
+        self.report = os.path.join(tmp_dir.name, 'report.csv')
+        self.created_emails = []
+
+    def fake_create(self, email, password, user_metadata=None):
+        if email == 'student1@example.com':
+            return None, 'User already exists'
+        if email == 'student2@example.com':
+            return None, 'HTTP 500: boom'
+        self.created_emails.append(email)
+        return {'id': f'uid-{email}'}, None
+
+    def run_command(self, *args):
+        with mock.patch('accounts.management.commands.migrate_to_supabase.create_user_admin', self.fake_create), \
+                mock.patch('accounts.management.commands.migrate_to_supabase.get_client'):
+            self.output = io.StringIO()
+            call_command(
+                'migrate_to_supabase', '--workers=4', '--rate=0', '--chunk-size=3',
+                f'--checkpoint={self.checkpoint}', f'--report={self.report}', *args,
+                stdout=self.output,
+            )
+        with open(self.report, newline='') as f:
+            return list(csv.DictReader(f))
+
+    def test_every_user_is_reported(self):
+        rows = self.run_command()
+        outcomes = {row['email']: row['outcome'] for row in rows}
+        self.assertEqual(len(rows), 7)
+        self.assertEqual(outcomes['student0@example.com'], 'created')
+        self.assertEqual(outcomes['student1@example.com'], 'skipped')
+        self.assertEqual(outcomes['student2@example.com'], 'failed')
+        self.assertEqual(len(self.created_emails), 5)
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+    def test_resumes_after_checkpoint(self):
+        save_checkpoint(self.checkpoint, self.users[2].id, {'created': 1, 'skipped': 1, 'failed': 1})
+        with open(self.report, 'w', newline='') as f:
+            csv.writer(f).writerow(['user_id', 'username', 'email', 'outcome', 'detail'])
+        rows = self.run_command()
+        self.assertEqual([row['email'] for row in rows], [f'student{index}@example.com' for index in range(3, 7)])
+        self.assertEqual(len(self.created_emails), 4)
+        # The interrupted run's outcomes are counted in the final totals
+        self.assertIn('Created: 5, Skipped: 1, Failed: 1, Total: 7', self.output.getvalue())
+
+    def test_dry_run_creates_nothing(self):
+        with mock.patch(
+            'accounts.management.commands.migrate_to_supabase.check_user_exists',
+            side_effect=lambda email: (email == 'student1@example.com', None),
+        ):
+            rows = self.run_command('--dry-run')
+        self.assertEqual(self.created_emails, [])
+        self.assertEqual(sum(row['outcome'] == 'skipped' for row in rows), 1)
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+
+    def test_dry_run_keeps_an_interrupted_runs_report(self):
+        save_checkpoint(self.checkpoint, self.users[2].id, {'created': 3, 'skipped': 0, 'failed': 0})
+        with open(self.report, 'w', newline='') as f:
+            csv.writer(f).writerow(['user_id', 'username', 'email', 'outcome', 'detail'])
+            csv.writer(f).writerow([self.users[0].id, '23-0000-000', 'student0@example.com', 'created', 'uid'])
+
+        with self.assertRaises(CommandError):
+            self.run_command('--dry-run')
+        with open(self.report, newline='') as f:
+            self.assertEqual(len(list(csv.DictReader(f))), 1)
+
+class AccountIdentityTests(TestCase):
+    """request.identity resolves the role and account once per request"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student_user = User.objects.create_user(username='23-0000-001', first_name='Juan')
+        cls.student = StudentAccount.objects.create(
+            user=cls.student_user, student_number='23-0000-001', last_name='Dela Cruz'
+        )
+        cls.admin_user = User.objects.create_user(username='registrar', email='registrar@example.com')
+        cls.admin = AdminAccount.objects.create(user=cls.admin_user, full_name='Registrar', role='Registrar')
+
+    def make_request(self, user, session=None):
+        request = RequestFactory().get('/')
+        request.user = user
+        request.session = session if session is not None else SessionStore()
+        request.identity = AccountIdentity(request)
+        return request
+
+    def test_student_is_resolved_in_one_query(self):
+        request = self.make_request(self.student_user)
+        with self.assertNumQueries(1):
+            self.assertTrue(request.identity.is_student)
+            self.assertFalse(request.identity.is_admin)
+            self.assertEqual(request.identity.student, self.student)
+            self.assertIsNone(request.identity.admin)
+            self.assertEqual(str(request.identity.get_student()), 'Juan Dela Cruz')
+
+    def test_admin_has_no_student(self):
+        request = self.make_request(self.admin_user)
+        self.assertTrue(request.identity.is_admin)
+        self.assertEqual(request.identity.admin, self.admin)
+        with self.assertRaises(StudentAccount.DoesNotExist):
+            request.identity.get_student()
+
+    def test_anonymous_user_needs_no_query(self):
+        request = self.make_request(AnonymousUser())
+        with self.assertNumQueries(0):
+            self.assertIsNone(request.identity.role)
+            self.assertIsNone(request.identity.student)
+
+    def test_role_is_cached_in_session(self):
+        session = SessionStore()
+        self.make_request(self.admin_user, session).identity.role
+        with self.assertNumQueries(0):
+            self.assertTrue(self.make_request(self.admin_user, session).identity.is_admin)
+        # Another user on the same session is resolved again
+        with self.assertNumQueries(1):
+            self.assertTrue(self.make_request(self.student_user, session).identity.is_student)
+
+    @override_settings(ACCOUNT_IDENTITY_SESSION_CACHE=False)
+    def test_session_cache_can_be_disabled(self):
+        session = SessionStore()
+        self.make_request(self.admin_user, session).identity.role
+        self.assertNotIn('_account_identity', session)
+
+    def test_login_during_request_switches_identity(self):
+        request = self.make_request(AnonymousUser())
+        self.assertIsNone(request.identity.role)
+        request.user = self.student_user
+        self.assertEqual(request.identity.student, self.student)
+
+
+def make_image_upload(color='red', size=(900, 600), image_format='PNG', name='photo.png', exif=None):
+    """An in-memory image upload"""
+    buffer = io.BytesIO()
+    options = {'exif': exif} if exif is not None else {}
+    Image.new('RGB', size, color).save(buffer, format=image_format, **options)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type=f'image/{image_format.lower()}')
+
+
+def process_profile_picture(student, upload):
+    """Save an upload as the profile view does and run its job as the worker would"""
+    digest, original_url = images.save_profile_picture(upload)
+    if original_url is not None:
+        StudentAccount.objects.filter(pk=student.pk).update(profile_picture=original_url)
+        job = enqueue_profile_picture(student, digest, original_url)
+        func, args = job_task(job)
+        apply_result(job, func(*args))
+    return digest
+
+
+class ProfilePicturePipelineTests(StudentFixtureMixin, TestCase):
+    """Uploads become content-addressed thumbnails that are collected once unused"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = cls.create_student()
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=tmp_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def age(self, path):
+        """Push a path's mtime past the garbage collection grace period"""
+        old = time.time() - images.GC_GRACE_SECONDS - 60
+        os.utime(path, (old, old))
+
+    def test_renditions_are_square_and_stripped(self):
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Rotated 90 degrees
+        exif[0x010F] = 'Camera Maker'
+        digest = process_profile_picture(
+            self.student, make_image_upload(image_format='JPEG', name='photo.jpg', exif=exif.tobytes())
+        )
+
+        self.assertTrue(images.is_rendered(digest))
+        for size, edge in images.PROFILE_PICTURE_SIZES.items():
+            with Image.open(images.picture_dir(digest) / f'{size}.webp') as rendition:
+                self.assertEqual(rendition.format, 'WEBP')
+                self.assertEqual(rendition.size, (edge, edge))
+                self.assertFalse(rendition.getexif())
+        with Image.open(images.picture_dir(digest) / 'lg.jpg') as fallback:
+            self.assertEqual(fallback.format, 'JPEG')
+            self.assertFalse(fallback.getexif())
+
+    def test_repeated_uploads_are_not_decoded_again(self):
+        digest = process_profile_picture(self.student, make_image_upload())
+        originals = images.picture_dir(digest).parent.parent / images.ORIGINALS_DIR
+        self.assertEqual(os.listdir(originals), [])
+
+        # Nothing is persisted or queued for a picture that is already rendered
+        self.assertEqual(images.save_profile_picture(make_image_upload()), (digest, None))
+        self.assertEqual(os.listdir(originals), [])
+        digest_blue, original_url = images.save_profile_picture(make_image_upload(color='blue'))
+        self.assertNotEqual(digest_blue, digest)
+        self.assertTrue(original_url.endswith(f'{digest_blue}.png'))
+
+    def test_invalid_uploads_are_refused(self):
+        with self.assertRaises(images.InvalidImage):
+            images.save_profile_picture(SimpleUploadedFile('photo.png', b'not an image'))
+        with mock.patch.object(images, 'MAX_UPLOAD_BYTES', 10):
+            with self.assertRaises(images.InvalidImage):
+                images.save_profile_picture(make_image_upload())
+        originals = os.path.join(settings.MEDIA_ROOT, images.PROFILE_PICTURE_DIR, images.ORIGINALS_DIR)
+        self.assertEqual(os.listdir(originals), [])
+
+    def test_release_keeps_pictures_still_in_use(self):
+        digest = process_profile_picture(self.student, make_image_upload())
+        self.age(images.picture_dir(digest))
+        StudentAccount.objects.filter(pk=self.student.pk).update(profile_picture_hash=digest)
+
+        images.release_profile_picture(digest, images.fallback_url(digest))
+        self.assertTrue(images.picture_dir(digest).exists())
+
+        StudentAccount.objects.filter(pk=self.student.pk).update(profile_picture_hash='')
+        images.release_profile_picture(digest, images.fallback_url(digest))
+        self.assertFalse(images.picture_dir(digest).exists())
+
+    def test_gc_command_removes_orphans(self):
+        kept = process_profile_picture(self.student, make_image_upload())
+        orphan = process_profile_picture(self.student, make_image_upload(color='blue'))
+        recent = process_profile_picture(self.student, make_image_upload(color='green'))
+        legacy_dir = os.path.join(settings.MEDIA_ROOT, 'profile_pictures', '23-0000-001')
+        os.makedirs(legacy_dir)
+        legacy_file = os.path.join(legacy_dir, 'old.png')
+        with open(legacy_file, 'wb') as f:
+            f.write(b'raw upload')
+        for path in [images.picture_dir(kept), images.picture_dir(orphan), legacy_file]:
+            self.age(path)
+        StudentAccount.objects.filter(pk=self.student.pk).update(
+            profile_picture_hash=kept, profile_picture=images.fallback_url(kept)
+        )
+
+        stdout = io.StringIO()
+        call_command('gc_profile_pictures', stdout=stdout)
+        self.assertIn('Deleted 2 unused profile picture(s).', stdout.getvalue())
+        self.assertTrue(images.is_rendered(kept))
+        self.assertTrue(images.is_rendered(recent))
+        self.assertFalse(images.picture_dir(orphan).exists())
+        self.assertFalse(os.path.exists(legacy_dir))
+
+
+class ImageJobTests(StudentFixtureMixin, TestCase):
+    """Image work is queued by views and applied by the process_image_jobs worker"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = cls.create_student()
+        cls.request = Request.objects.create(student=cls.student, document=cls.create_document(), purpose='Scholarship')
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=tmp_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def queue_picture(self, color='red'):
+        digest, original_url = images.save_profile_picture(make_image_upload(color=color))
+        StudentAccount.objects.filter(pk=self.student.pk).update(profile_picture=original_url, profile_picture_hash='')
+        return enqueue_profile_picture(self.student, digest, original_url)
+
+    def test_profile_picture_job_swaps_in_thumbnails(self):
+        job = self.queue_picture()
+        with self.captureOnCommitCallbacks(execute=True):
+            stats = process_image_jobs()
+        self.assertEqual(stats['done'], 1)
+
+        job.refresh_from_db()
+        self.student.refresh_from_db()
+        self.assertEqual(job.status, 'Done')
+        self.assertEqual(self.student.profile_picture_hash, job.digest)
+        self.assertEqual(self.student.profile_picture, images.fallback_url(job.digest))
+        self.assertTrue(images.is_rendered(job.digest))
+        self.assertFalse(os.path.exists(os.path.join(settings.MEDIA_ROOT, job.source)))
+
+    def test_superseded_job_is_skipped(self):
+        job = self.queue_picture()
+        self.queue_picture(color='blue')
+        with mock.patch.object(images, 'render_renditions', wraps=images.render_renditions) as render:
+            stats = process_image_jobs()
+        self.assertEqual(stats['skipped'], 1)
+        self.assertEqual(render.call_count, 1)
+        self.assertFalse(images.picture_dir(job.digest).exists())
+
+    def test_pool_processes_a_batch(self):
+        jobs = [self.queue_picture(color) for color in ['red', 'green']]
+        StudentAccount.objects.filter(pk=self.student.pk).update(profile_picture=f"/media/{jobs[0].source}")
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            stats = process_image_jobs(executor=executor)
+        self.assertEqual(stats, {'done': 1, 'skipped': 1, 'retried': 0, 'failed': 0})
+        self.assertTrue(images.is_rendered(jobs[0].digest))
+
+    def test_invalid_image_fails_without_retry(self):
+        job = self.queue_picture()
+        with open(os.path.join(settings.MEDIA_ROOT, job.source), 'wb') as f:
+            f.write(b'not an image')
+        self.assertEqual(process_image_jobs()['failed'], 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'Failed')
+        self.assertEqual(job.attempts, 1)
+
+    def test_attachment_job_strips_metadata(self):
+        exif = Image.Exif()
+        exif[0x010F] = 'Camera Maker'
+        upload = make_image_upload(size=(5000, 2000), image_format='JPEG', name='id.jpg', exif=exif.tobytes())
+        attachment = Attachment.objects.create(request=self.request, file=upload, file_size=upload.size)
+        enqueue_attachment(attachment)
+        original_path = attachment.file.path
+
+        self.assertEqual(process_image_jobs()['done'], 1)
+        attachment.refresh_from_db()
+        self.assertTrue(attachment.file.name.endswith('.clean.jpg'))
+        self.assertFalse(os.path.exists(original_path))
+        self.assertEqual(attachment.file_size, os.path.getsize(attachment.file.path))
+        with Image.open(attachment.file.path) as image:
+            self.assertEqual(max(image.size), images.MAX_ATTACHMENT_EDGE)
+            self.assertFalse(image.getexif())
+
+    def test_pdf_attachment_is_kept(self):
+        attachment = Attachment.objects.create(
+            request=self.request, file=SimpleUploadedFile('affidavit.pdf', b'%PDF-1.4 scan'), file_size=13
+        )
+        enqueue_attachment(attachment)
+        self.assertEqual(process_image_jobs()['done'], 1)
+        attachment.refresh_from_db()
+        self.assertTrue(attachment.file.name.endswith('.pdf'))
+
+
+class MediaDownloadTests(StudentFixtureMixin, TestCase):
+    """Protected media is streamed with Range and conditional request support"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = cls.create_student()
+        cls.user = cls.student.user
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=tmp_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.factory = RequestFactory()
+        self.content = bytes(range(256)) * 4
+        os.makedirs(os.path.join(tmp_dir.name, 'attachments'))
+        with open(os.path.join(tmp_dir.name, 'attachments', 'scan.pdf'), 'wb') as f:
+            f.write(self.content)
+
+    def serve(self, **headers):
+        return serve_media_file(self.factory.get('/', headers=headers), 'attachments/scan.pdf')
+
+    def test_full_and_ranged_responses(self):
+        response = self.serve()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+
+        response = self.serve(Range='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(self.content)}')
+        self.assertEqual(b''.join(response.streaming_content), self.content[10:20])
+
+        response = self.serve(Range='bytes=-5')
+        self.assertEqual(b''.join(response.streaming_content), self.content[-5:])
+
+        response = self.serve(Range=f'bytes={len(self.content)}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.content)}')
+
+        # A stale If-Range gets the whole file instead of a range of new bytes
+        response = self.serve(Range='bytes=10-19', **{'If-Range': '"stale"'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_conditional_requests(self):
+        etag = self.serve()['ETag']
+        self.assertEqual(self.serve(**{'If-None-Match': etag}).status_code, 304)
+        response = self.serve(Range='bytes=0-0', **{'If-Range': etag})
+        self.assertEqual(response.status_code, 206)
+
+    @override_settings(MEDIA_SENDFILE_BACKEND='x-accel-redirect', MEDIA_ACCEL_REDIRECT_PREFIX='/protected-media/')
+    def test_accel_redirect_hands_off_the_file(self):
+        response = self.serve()
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/attachments/scan.pdf')
+        self.assertEqual(response.content, b'')
+
+    def test_profile_pictures_are_served_to_their_owner(self):
+        digest = process_profile_picture(self.student, make_image_upload())
+        StudentAccount.objects.filter(pk=self.student.pk).update(profile_picture_hash='')
+        url = images.picture_url(digest, 'sm')
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+        StudentAccount.objects.filter(pk=self.student.pk).update(profile_picture_hash=digest)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(self.client.get('/media/profile_pictures/../attachments/scan.pdf').status_code, 404)
+
+    def test_media_urls_check_ownership(self):
+        document = self.create_document()
+        req = Request.objects.create(student=self.student, document=document, purpose='Employment')
+        Attachment.objects.create(request=req, file='attachments/scan.pdf', file_size=len(self.content))
+        os.makedirs(os.path.join(settings.MEDIA_ROOT, 'request_pdfs', str(req.id)))
+        with open(os.path.join(settings.MEDIA_ROOT, 'request_pdfs', str(req.id), 'slip.pdf'), 'wb') as f:
+            f.write(b'%PDF-1.4')
+        with open(os.path.join(settings.MEDIA_ROOT, 'attachments', 'orphan.pdf'), 'wb') as f:
+            f.write(b'%PDF-1.4')
+        urls = ['/media/attachments/scan.pdf', f'/media/request_pdfs/{req.id}/slip.pdf']
+
+        for url in urls:
+            self.assertEqual(self.client.get(url).status_code, 302)
+
+        self.client.force_login(self.create_student('23-0000-002').user)
+        for url in urls:
+            self.assertEqual(self.client.get(url).status_code, 404)
+
+        self.client.force_login(self.user)
+        for url in urls:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        # Files no record refers to are never served
+        self.assertEqual(self.client.get('/media/attachments/orphan.pdf').status_code, 404)
+
+        staff = User.objects.create_user(username='registrar', password='password123')
+        AdminAccount.objects.create(user=staff, full_name='Registrar', role='Registrar')
+        self.client.force_login(staff)
+        for url in urls:
+            self.assertEqual(self.client.get(url).status_code, 200)
@@ -6,18 +6,26 @@ from django.utils import timezone
 import re  # Added missing import
 from services.supabase_client import create_user_admin, delete_user_admin, check_user_exists
 
-from .models import StudentAccount, AdminAccount
+from .models import StudentAccount, AdminAccount, Attachment, Request
 from .forms import StudentProfileForm
 from services.supabase_client import create_user_admin, delete_user_admin
 from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_safe
+from django.contrib.auth.decorators import login_required
+from django.conf import settings
+from django.http import Http404
+from .downloads import serve_media_file
+from .images import PROFILE_PICTURE_DIR
+from request.pdfs import PDF_DIR
+from request.uploads import ATTACHMENT_DIR
 
 @never_cache
 def login(request):
     # --- Already logged in ---
     if request.user.is_authenticated:
-        if hasattr(request.user, 'adminaccount'):
+        if request.identity.is_admin:
             return redirect('admin_dashboard')
-        elif hasattr(request.user, 'studentaccount'):
+        elif request.identity.is_student:
             return redirect('dashboard')
         return redirect('dashboard')
 
@@ -48,16 +56,17 @@ def login(request):
             auth_login(request, user)
 
             # --- If Admin ---
-            if hasattr(user, 'adminaccount'):
-                admin_acc = user.adminaccount
+            identity = request.identity
+            if identity.is_admin:
+                admin_acc = identity.admin
                 admin_acc.last_login_at = timezone.now()
                 admin_acc.save()
                 messages.success(request, f"Welcome back, {admin_acc.full_name}!")
                 return redirect('admin_dashboard')
 
             # --- If Student ---
-            elif hasattr(user, 'studentaccount'):
-                student_acc = user.studentaccount
+            elif identity.is_student:
+                student_acc = identity.student
 
                 # Auto-update program field if needed
                 if student_acc.program == "Other" and student_acc.course:
@@ -216,4 +225,48 @@ def register(request):
 def logout(request):
     auth_logout(request)
     request.session.flush()
-    return redirect('login')
\ No newline at end of file
+    return redirect('login')
+
+
+def _profile_picture_file(request, path):
+    """
+    Serve a file under MEDIA_ROOT/profile_pictures to its owner or an admin.
+    Every name there is unique to its content, so responses are immutable.
+    """
+    identity = request.identity
+    if identity.admin is None:
+        student = identity.student
+        digest = path.split('/')[1] if path.count('/') == 2 else None
+        owns_rendition = student is not None and digest and digest == student.profile_picture_hash
+        owns_original = student is not None and student.profile_picture == f"{settings.MEDIA_URL}{PROFILE_PICTURE_DIR}/{path}"
+        if not (owns_rendition or owns_original):
+            raise Http404('File not found')
+    return serve_media_file(request, f"{PROFILE_PICTURE_DIR}/{path}", immutable=True)
+
+
+@login_required
+@require_safe
+def media_file(request, path):
+    """
+    Serve a file under MEDIA_URL. Every media file belongs to a student, so
+    it is only served to that student or an admin; files that belong to no
+    record, such as partial uploads, are not served at all.
+    """
+    directory, _, rest = path.partition('/')
+    if directory == PROFILE_PICTURE_DIR:
+        return _profile_picture_file(request, rest)
+
+    owner_id = None
+    if directory == ATTACHMENT_DIR:
+        owner_id = Attachment.objects.filter(file=path).values_list('request__student_id', flat=True).first()
+    elif directory == PDF_DIR:
+        request_id = rest.partition('/')[0]
+        if request_id.isdigit():
+            owner_id = Request.objects.filter(pk=request_id).values_list('student_id', flat=True).first()
+    if owner_id is None:
+        raise Http404('File not found')
+
+    identity = request.identity
+    if identity.admin is None and (identity.student is None or identity.student.pk != owner_id):
+        raise Http404('File not found')
+    return serve_media_file(request, path)
@@ -0,0 +1,211 @@
+"""
+Async (ASGI-native) versions of the student dashboard hot path.
+
+Selected in dashboard/urls.py when settings.ASYNC_STUDENT_VIEWS is on. The
+pages and templates match the synchronous views in dashboard/views.py. The
+async ORM still runs each query on the single sync_to_async thread, so the
+queries of a page are awaited one after another; the gain is that the event
+loop is free to serve other requests while they run.
+"""
+
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.decorators import login_required
+from django.shortcuts import render, redirect
+from django.utils import timezone
+
+from accounts.models import Request
+from request.models import RequestManager
+from .conditional import student_page
+from .views import (
+    STUDENT_REQUESTS_PAGE_SIZE,
+    bucket_requests_by_status,
+    get_request_limit,
+    ranked_requests_by_status,
+    handle_document_request,
+    handle_profile_update,
+)
+
+
+# ===== HELPER FUNCTIONS =====
+
+async def aresolve_identity(request):
+    """
+    Resolve request.user and request.identity up front, so templates and
+    views can read them without a synchronous query.
+    """
+    request.user = await request.auser()
+    return await request.identity.aload()
+
+
+async def alist(queryset):
+    """Evaluate a queryset with async iteration"""
+    return [obj async for obj in queryset]
+
+
+def get_student_data(identity):
+    """Get student data from a resolved identity"""
+    student = identity.student
+    if student is not None:
+        return {
+            'student': student,
+            'student_name': str(student),
+            'student_id_number': student.student_number
+        }
+    else:
+        return {
+            'student': None,
+            'student_name': "Unknown",
+            'student_id_number': "N/A"
+        }
+
+
+async def aget_dashboard_stats(student):
+    """Get dashboard statistics for a student"""
+    if not student:
+        return {
+            'pending_count': 0,
+            'approved_count': 0,
+            'completed_count': 0,
+            'recent_requests': [],
+            'approved_requests': [],
+            'overdue_requests': []
+        }
+
+    student_requests = Request.objects.filter(student=student).select_related('document').order_by('-date_requested')
+    threshold_date = timezone.now() - timedelta(days=14)
+
+    counts = await RequestManager.aget_student_counts(student)
+    recent_requests = await alist(student_requests[:3])
+    approved_requests = await alist(student_requests.filter(status='Approved')[:2])
+    overdue_requests = await alist(student_requests.filter(status='Approved', date_requested__lt=threshold_date)[:2])
+
+    return {
+        'pending_count': counts['pending'],
+        'approved_count': counts['approved'],
+        'completed_count': counts['completed'],
+        'recent_requests': recent_requests,
+        'approved_requests': approved_requests,
+        'overdue_requests': overdue_requests
+    }
+
+
+# ===== VIEW FUNCTIONS =====
+
+@login_required
+@student_page('dashboard.html', 'base.html')
+async def dashboard(request):
+    """Main dashboard view for students"""
+    identity = await aresolve_identity(request)
+
+    # Redirect admin users
+    if identity.is_admin:
+        return redirect('admin_dashboard')
+
+    # Get student data
+    student_data = get_student_data(identity)
+    student = student_data['student']
+
+    # Form submissions reuse the synchronous handlers
+    if request.method == 'POST':
+        if request.POST.get('action') == 'update_profile':
+            return await sync_to_async(handle_profile_update)(request, student)
+        return await sync_to_async(handle_document_request)(request, student)
+
+    stats = await aget_dashboard_stats(student)
+
+    context = {
+        'student': student,
+        'student_name': student_data['student_name'],
+        'student_id_number': student_data['student_id_number'],
+        **stats
+    }
+
+    return render(request, 'dashboard.html', context)
+
+
+@login_required
+@student_page('requested_documents.html', 'base.html')
+async def requested_documents(request):
+    """View for requested documents"""
+    identity = await aresolve_identity(request)
+    student_data = get_student_data(identity)
+    student = student_data['student']
+    limit = get_request_limit(request)
+
+    if student:
+        all_requests = await alist(
+            Request.objects.filter(student=student).select_related('document').order_by('-date_requested')[:limit]
+        )
+        buckets = bucket_requests_by_status(await alist(ranked_requests_by_status(student, limit)))
+        counts = await RequestManager.aget_student_counts(student)
+    else:
+        all_requests = []
+        buckets = bucket_requests_by_status([])
+        counts = dict.fromkeys(['total', 'pending', 'approved', 'completed'], 0)
+    total_count = counts['total']
+
+    context = {
+        'student': student,
+        'student_name': student_data['student_name'],
+        'student_id_number': student_data['student_id_number'],
+        'all_requests': all_requests,
+        'pending_requests': buckets['Pending'],
+        'approved_requests': buckets['Approved'],
+        'completed_requests': buckets['Completed'],
+        'pending_count': counts['pending'],
+        'approved_count': counts['approved'],
+        'completed_count': counts['completed'],
+        'total_count': total_count,
+        'next_limit': limit + STUDENT_REQUESTS_PAGE_SIZE if total_count > len(all_requests) else None,
+    }
+
+    return render(request, 'requested_documents.html', context)
+
+
+@login_required
+@student_page('history.html', 'base.html')
+async def history(request):
+    """Request history view"""
+    identity = await aresolve_identity(request)
+    student_data = get_student_data(identity)
+    student = student_data['student']
+    limit = get_request_limit(request)
+
+    if student:
+        completed_requests = await alist(
+            Request.objects.filter(student=student, status='Completed')
+            .select_related('document').order_by('-date_requested')[:limit]
+        )
+        counts = await RequestManager.aget_student_counts(student)
+        total_count = counts['completed']
+    else:
+        completed_requests, total_count = [], 0
+
+    context = {
+        'student': student,
+        'student_name': student_data['student_name'],
+        'student_id_number': student_data['student_id_number'],
+        'completed_requests': completed_requests,
+        'total_count': total_count,
+        'next_limit': limit + STUDENT_REQUESTS_PAGE_SIZE if total_count > len(completed_requests) else None,
+    }
+
+    return render(request, 'history.html', context)
+
+
+@login_required
+async def dashboard_redirect(request):
+    """
+    Redirect /dashboard/ if a staff is logged in.
+    Students can stay on /dashboard/.
+    """
+    identity = await aresolve_identity(request)
+    if identity.is_admin:
+        return redirect('admin_dashboard')
+    elif identity.is_student:
+        # Student stays in dashboard
+        return await dashboard(request)
+    else:
+        return redirect('login')
@@ -0,0 +1,70 @@
+"""
+Conditional GET for the student request pages.
+
+A student's pages only change when one of their requests or their profile
+does, which bumps StudentRequestCounters.updated_at (see request/signals.py).
+The ETag combines that timestamp with the page's template version and the
+current date (overdue reminders depend on it), so a reload of an unchanged
+page is answered with a 304 after two primary-key lookups and no query on
+the request tables.
+"""
+
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+
+from request.models import StudentRequestCounters
+from .fragments import get_template_version, has_pending_messages
+
+
+def get_student_page_etag(request, template_names):
+    """ETag for a student page, or None when the page cannot be validated"""
+    if request.method not in ('GET', 'HEAD') or has_pending_messages(request):
+        return None
+    student = request.identity.student
+    if student is None:
+        return None
+    updated_at = StudentRequestCounters.objects.filter(student=student).values_list('updated_at', flat=True).first()
+    if updated_at is None:
+        return None
+    template_version = get_template_version(*template_names)[0]
+    return quote_etag(
+        f"{template_version}-{student.pk}-{updated_at.timestamp():.6f}-{timezone.localdate().isoformat()}"
+    )
+
+
+def student_page(*template_names):
+    """
+    Decorator for student pages: answers If-None-Match with a 304 when the
+    student's data and the page templates are unchanged, tags responses with
+    the ETag and marks them private and always-revalidate. Works on sync and
+    async views.
+    """
+    def finish(request, response, etag):
+        if etag and request.method in ('GET', 'HEAD') and response.status_code in (200, 304):
+            response.headers.setdefault('ETag', etag)
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def wrapper(request, *args, **kwargs):
+                etag = await sync_to_async(get_student_page_etag)(request, template_names)
+                response = get_conditional_response(request, etag=etag) if etag else None
+                if response is None:
+                    response = await view_func(request, *args, **kwargs)
+                return finish(request, response, etag)
+        else:
+            @wraps(view_func)
+            def wrapper(request, *args, **kwargs):
+                etag = get_student_page_etag(request, template_names)
+                response = get_conditional_response(request, etag=etag) if etag else None
+                if response is None:
+                    response = view_func(request, *args, **kwargs)
+                return finish(request, response, etag)
+        return wrapper
+    return decorator
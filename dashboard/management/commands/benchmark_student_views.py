@@ -0,0 +1,158 @@
+"""
+Load benchmark for the student dashboard hot path.
+
+Start the same project twice, once behind a WSGI server and once behind an
+ASGI server with the async views switched on, for example:
+
+    gunicorn WildDocs.wsgi -w 4 --threads 8 -b 127.0.0.1:8001
+    ASYNC_STUDENT_VIEWS=true uvicorn WildDocs.asgi:application --workers 4 --port 8002
+
+then compare them at 200 concurrent users:
+
+    python manage.py benchmark_student_views --username 23-0000-001 \
+        --target wsgi=http://127.0.0.1:8001 --target asgi=http://127.0.0.1:8002
+
+Only the standard library is used to generate load.
+"""
+
+import http.client
+import itertools
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from importlib import import_module
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+DEFAULT_PATHS = [
+    '/dashboard/',
+    '/dashboard/requested_documents/',
+    '/dashboard/history/',
+    '/requests/pending/',
+]
+
+
+def make_session_cookie(username):
+    """Create a logged-in session for a user and return it as a Cookie header"""
+    try:
+        user = User.objects.get(username=username)
+    except User.DoesNotExist:
+        raise CommandError(f"User '{username}' does not exist")
+    session = import_module(settings.SESSION_ENGINE).SessionStore()
+    session[SESSION_KEY] = str(user.pk)
+    session[BACKEND_SESSION_KEY] = 'django.contrib.auth.backends.ModelBackend'
+    session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    session.save()
+    return f"{settings.SESSION_COOKIE_NAME}={session.session_key}"
+
+
+def run_load(base_url, paths, cookie, concurrency, total_requests, timeout):
+    """Issue total_requests GETs over `concurrency` keep-alive connections"""
+    parts = urlsplit(base_url)
+    connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+    prefix = parts.path.rstrip('/')
+    counter = itertools.count()
+    lock = threading.Lock()
+    latencies = []
+    errors = []
+
+    def worker():
+        connection = connection_class(parts.netloc, timeout=timeout)
+        try:
+            while True:
+                index = next(counter)
+                if index >= total_requests:
+                    return
+                started = time.perf_counter()
+                try:
+                    connection.request('GET', prefix + paths[index % len(paths)], headers={'Cookie': cookie})
+                    response = connection.getresponse()
+                    response.read()
+                    ok = response.status == 200
+                    error = None if ok else f"HTTP {response.status}"
+                except (OSError, http.client.HTTPException) as e:
+                    error = str(e) or e.__class__.__name__
+                    connection.close()
+                elapsed = time.perf_counter() - started
+                with lock:
+                    if error:
+                        errors.append(error)
+                    else:
+                        latencies.append(elapsed)
+        finally:
+            connection.close()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(worker)
+    wall_time = time.perf_counter() - started
+    return latencies, errors, wall_time
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark student dashboard pages on running WSGI/ASGI servers (stdlib load generator)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', action='append', required=True, metavar='LABEL=URL',
+                            help='Server to benchmark, e.g. wsgi=http://127.0.0.1:8001 (repeatable)')
+        parser.add_argument('--username', required=True, help='Student account the simulated users log in as')
+        parser.add_argument('--path', action='append', dest='paths', help='Page to request (repeatable; default: student hot path)')
+        parser.add_argument('--concurrency', type=int, default=200, help='Concurrent simulated users (default: 200)')
+        parser.add_argument('--requests', type=int, default=4000, help='Requests per target (default: 4000)')
+        parser.add_argument('--warmup', type=int, default=200, help='Untimed requests per target before measuring (default: 200)')
+        parser.add_argument('--timeout', type=float, default=30, help='Per-request timeout in seconds (default: 30)')
+
+    def handle(self, *args, **options):
+        targets = []
+        for target in options['target']:
+            label, sep, url = target.partition('=')
+            if not sep or not url.startswith(('http://', 'https://')):
+                raise CommandError(f"Invalid --target '{target}', expected LABEL=http://host:port")
+            targets.append((label, url))
+
+        paths = options['paths'] or DEFAULT_PATHS
+        cookie = make_session_cookie(options['username'])
+        concurrency = max(1, options['concurrency'])
+
+        results = []
+        for label, url in targets:
+            if options['warmup']:
+                run_load(url, paths, cookie, min(concurrency, options['warmup']), options['warmup'], options['timeout'])
+            latencies, errors, wall_time = run_load(
+                url, paths, cookie, concurrency, options['requests'], options['timeout']
+            )
+            latencies.sort()
+            throughput = len(latencies) / wall_time if wall_time > 0 else 0
+            results.append((label, throughput))
+
+            self.stdout.write(self.style.SUCCESS(f"{label} ({url})"))
+            self.stdout.write(
+                f"  {len(latencies)} ok, {len(errors)} failed in {wall_time:.2f}s "
+                f"at {concurrency} concurrent users: {throughput:.1f} req/s"
+            )
+            if latencies:
+                self.stdout.write(
+                    f"  latency ms: mean {statistics.mean(latencies) * 1000:.1f}, "
+                    f"p50 {percentile(latencies, 0.50) * 1000:.1f}, "
+                    f"p95 {percentile(latencies, 0.95) * 1000:.1f}, "
+                    f"p99 {percentile(latencies, 0.99) * 1000:.1f}"
+                )
+            if errors:
+                self.stdout.write(self.style.WARNING(f"  first error: {errors[0]}"))
+
+        if len(results) > 1 and results[0][1] > 0:
+            baseline_label, baseline = results[0]
+            for label, throughput in results[1:]:
+                self.stdout.write(f"{label} vs {baseline_label}: {throughput / baseline:.2f}x throughput")
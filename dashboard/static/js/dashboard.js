@@ -80,14 +80,47 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
     
-    // Auto-refresh notifications (optional)
-    function refreshNotifications() {
-        // This would typically fetch new notifications from the server
-        console.log('Refreshing notifications...');
+    // Live notifications: long-poll the JSON feed for unread notifications
+    const NOTIFICATIONS_URL = '/dashboard/notifications/';
+    const NOTIFICATIONS_WAIT = 25;          // seconds the server may hold a poll
+    const NOTIFICATIONS_MIN_INTERVAL = 5000; // ms between polls if the server answers early
+    const NOTIFICATIONS_RETRY_DELAY = 30000; // ms to back off after an error
+    let lastNotificationId = null;
+
+    function refreshNotifications(wait) {
+        const startedAt = Date.now();
+        // Without since the feed returns the newest unread notifications
+        const since = lastNotificationId === null ? '' : lastNotificationId;
+        const url = `${NOTIFICATIONS_URL}?since=${since}&wait=${wait}`;
+
+        return fetch(url, { credentials: 'same-origin', headers: { 'Accept': 'application/json' } })
+            .then(response => {
+                if (!response.ok) {
+                    throw new Error(`Notification feed returned ${response.status}`);
+                }
+                return response.json();
+            })
+            .then(data => {
+                // The first poll only records where the feed starts
+                if (lastNotificationId !== null) {
+                    data.notifications.forEach(notification => showToast(escapeHtml(notification.message), 'info'));
+                }
+                lastNotificationId = data.last_id;
+                return Math.max(0, NOTIFICATIONS_MIN_INTERVAL - (Date.now() - startedAt));
+            });
+    }
+
+    function pollNotifications() {
+        refreshNotifications(NOTIFICATIONS_WAIT)
+            .then(delay => setTimeout(pollNotifications, delay))
+            .catch(() => setTimeout(pollNotifications, NOTIFICATIONS_RETRY_DELAY));
+    }
+
+    if (document.querySelector('.dashboard-content')) {
+        refreshNotifications(0)
+            .then(() => pollNotifications())
+            .catch(() => setTimeout(pollNotifications, NOTIFICATIONS_RETRY_DELAY));
     }
-    
-    // Refresh notifications every 5 minutes
-    setInterval(refreshNotifications, 300000);
     
     // Handle notification clicks
     const notificationIcon = document.querySelector('.notification-icon');
@@ -179,6 +212,12 @@ function formatDate(date) {
     }).format(new Date(philippinesDate));
 }
 
+function escapeHtml(text) {
+    const div = document.createElement('div');
+    div.textContent = text;
+    return div.innerHTML;
+}
+
 function showToast(message, type = 'info') {
     // Create toast notification
     const toast = document.createElement('div');
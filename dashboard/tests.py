@@ -1,3 +1,619 @@
-from django.test import TestCase
+import base64
+import io
+import os
+import tempfile
+import time
+from datetime import timedelta
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import path, reverse
+from django.utils import timezone
+from PIL import Image
+
+from accounts import images
+from accounts.image_jobs import process_image_jobs
+from accounts.models import AdminAccount, DocumentType, Notification, Request, StudentAccount
+from dashboard import async_views
+from dashboard.fragments import get_fragment_version
+from dashboard.views import decode_request_cursor, encode_request_cursor, get_admin_requests_page
+from request import events
+from request.views import async_views as request_async_views
+from WildDocs.urls import urlpatterns as project_urlpatterns
+
+
+class StudentFixtureMixin:
+    """Create the students and document types most tests start from"""
+
+    @classmethod
+    def create_student(cls, student_number='23-0000-001', **fields):
+        """A student whose login (student.user) is their student number with password 'password123'"""
+        user = User.objects.create_user(
+            username=student_number, password='password123', first_name=fields.get('first_name', '')
+        )
+        return StudentAccount.objects.create(user=user, student_number=student_number, **fields)
+
+    @classmethod
+    def create_document(cls, name='Transcript of Records', description='TOR'):
+        return DocumentType.objects.create(name=name, description=description, fee=100)
+
+
+class QueryCountTestMixin:
+    """Assert that a page's query count does not grow with the number of rows"""
+
+    def add_requests(self, count):
+        for index in range(count):
+            Request.objects.create(
+                student=self.student,
+                document=self.documents[index % len(self.documents)],
+                purpose='Scholarship application',
+                status=['Pending', 'Approved', 'Completed'][index % 3],
+            )
+        # Age the rows so overdue reminders are rendered as well
+        Request.objects.update(date_requested=timezone.now() - timedelta(days=30))
+
+    def count_queries(self, url):
+        # Measure cold caches so both runs do the same work
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def assertConstantQueries(self, url):
+        self.add_requests(3)
+        expected = self.count_queries(url)
+        self.add_requests(12)
+        cache.clear()
+        with self.assertNumQueries(expected):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+
+class StudentViewQueryCountTests(StudentFixtureMixin, QueryCountTestMixin, TestCase):
+    """Student dashboard pages load in a bounded number of queries"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = cls.create_student(first_name='Juan', last_name='Dela Cruz')
+        cls.user = cls.student.user
+        cls.documents = [
+            cls.create_document(name, name)
+            for name in ['Transcript of Records', 'Certificate of Enrollment', 'Diploma Copy']
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        # The first request stores the user's role in the session; keep that write out of the counts
+        self.client.get(reverse('home'))
+
+    def test_dashboard(self):
+        self.assertConstantQueries(reverse('dashboard'))
+
+    def test_requested_documents(self):
+        self.assertConstantQueries(reverse('requested_documents'))
+
+    def test_history(self):
+        self.assertConstantQueries(reverse('history'))
+
+    def test_requested_documents_respects_limit(self):
+        self.add_requests(9)
+        response = self.client.get(reverse('requested_documents'), {'limit': 4})
+        self.assertEqual(len(response.context['all_requests']), 4)
+        self.assertEqual(response.context['total_count'], 9)
+        self.assertEqual(response.context['next_limit'], 54)
+
+    def test_requested_documents_limits_each_status(self):
+        self.add_requests(15)
+        response = self.client.get(reverse('requested_documents'), {'limit': 4})
+        for status in ['Pending', 'Approved', 'Completed']:
+            bucket = response.context[f'{status.lower()}_requests']
+            self.assertEqual(len(bucket), 4)
+            self.assertTrue(all(req.status == status for req in bucket))
+            # Badge counts cover every row, not just the rendered ones
+            self.assertEqual(response.context[f'{status.lower()}_count'], 5)
+
+    def test_student_profile(self):
+        self.assertConstantQueries(reverse('student_profile'))
+
+    def test_about_us(self):
+        self.assertConstantQueries(reverse('about_us'))
+
+    def test_faqs(self):
+        self.assertConstantQueries(reverse('faqs'))
+
+
+class AsyncStudentURLConf:
+    """Project URLs with the student hot path routed to the async views"""
+
+    urlpatterns = [
+        path('dashboard/', async_views.dashboard_redirect),
+        path('dashboard/requested_documents/', async_views.requested_documents),
+        path('dashboard/history/', async_views.history),
+        path('requests/pending/', request_async_views.requests_pending),
+        path('requests/approved/', request_async_views.requests_approved),
+        path('requests/completed/', request_async_views.requests_completed),
+    ] + project_urlpatterns
+
+
+@override_settings(ROOT_URLCONF=AsyncStudentURLConf)
+class AsyncStudentViewTests(StudentFixtureMixin, QueryCountTestMixin, TestCase):
+    """The async views render the same pages without synchronous ORM access"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = cls.create_student(first_name='Juan', last_name='Dela Cruz')
+        cls.user = cls.student.user
+        cls.documents = [
+            cls.create_document(name, name)
+            for name in ['Transcript of Records', 'Certificate of Enrollment', 'Diploma Copy']
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        # The first request stores the user's role in the session; keep that write out of the counts
+        self.client.get(reverse('home'))
+
+    def test_dashboard(self):
+        self.assertConstantQueries(reverse('dashboard'))
+        response = self.client.get(reverse('dashboard'))
+        self.assertIs(response.resolver_match.func, async_views.dashboard_redirect)
+        self.assertEqual(response.context['pending_count'], 5)
+        self.assertEqual(len(response.context['recent_requests']), 3)
+
+    def test_requested_documents(self):
+        self.assertConstantQueries(reverse('requested_documents'))
+        response = self.client.get(reverse('requested_documents'), {'limit': 4})
+        self.assertEqual(len(response.context['all_requests']), 4)
+        self.assertEqual(response.context['total_count'], 15)
+        self.assertEqual(len(response.context['completed_requests']), 4)
+        self.assertEqual(response.context['completed_count'], 5)
+
+    def test_history(self):
+        self.assertConstantQueries(reverse('history'))
+        response = self.client.get(reverse('history'))
+        self.assertEqual(response.context['total_count'], 5)
+
+    def test_request_lists(self):
+        self.add_requests(6)
+        for name, status in [('pending', 'Pending'), ('approved', 'Approved'), ('completed', 'Completed')]:
+            response = self.client.get(reverse(f'Request:{name}'))
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.context['status'], status)
+            self.assertEqual(len(response.context['requests']), 2)
+            self.assertEqual(response.context['total_count'], 2)
+
+    def test_admin_is_redirected(self):
+        AdminAccount.objects.create(user=User.objects.create_user(username='registrar', password='password123'))
+        self.client.force_login(User.objects.get(username='registrar'))
+        response = self.client.get(reverse('dashboard'))
+        self.assertRedirects(response, reverse('admin_dashboard'), fetch_redirect_response=False)
+
+
+class AdminViewQueryCountTests(StudentFixtureMixin, QueryCountTestMixin, TestCase):
+    """Admin pages load in a bounded number of queries"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = cls.create_student(first_name='Juan', last_name='Dela Cruz')
+        cls.user = User.objects.create_user(username='registrar', email='registrar@example.com', password='password123')
+        AdminAccount.objects.create(user=cls.user, full_name='Registrar Staff', role='Registrar')
+        cls.documents = [
+            cls.create_document(name, name)
+            for name in ['Transcript of Records', 'Certificate of Enrollment', 'Diploma Copy']
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        # The first request stores the user's role in the session; keep that write out of the counts
+        self.client.get(reverse('home'))
+
+    def test_admin_dashboard(self):
+        self.assertConstantQueries(reverse('admin_dashboard'))
+
+    def test_admin_document_requests(self):
+        self.assertConstantQueries(reverse('admin_document_requests'))
+
+    def test_admin_document_requests_data(self):
+        self.assertConstantQueries(reverse('admin_document_requests_data'))
+
+
+class AdminRequestPaginationTests(StudentFixtureMixin, TestCase):
+    """The admin request table pages by (date_requested, id) without skipping or repeating rows"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = cls.create_student()
+        cls.user = User.objects.create_user(username='registrar', password='password123')
+        AdminAccount.objects.create(user=cls.user, full_name='Registrar Staff', role='Registrar')
+        cls.transcript = cls.create_document()
+        cls.diploma = cls.create_document('Diploma Copy', 'Diploma')
+        for index in range(7):
+            Request.objects.create(
+                student=cls.student,
+                document=cls.transcript if index % 3 else cls.diploma,
+                purpose='Employment',
+                status='Approved' if index % 2 else 'Pending',
+            )
+        # Every row shares one timestamp, so only the id tiebreak orders them
+        cls.same_time = timezone.now() - timedelta(days=1)
+        Request.objects.update(date_requested=cls.same_time)
+        cls.newer = Request.objects.create(student=cls.student, document=cls.transcript, purpose='Employment')
+
+    def walk(self, params, page_size):
+        """Follow next cursors from the first page; returns the ids of each page"""
+        pages = []
+        cursor = None
+        while True:
+            _, rows, cursor = get_admin_requests_page({**params, 'cursor': cursor or ''}, page_size=page_size)
+            pages.append([req.id for req in rows])
+            if cursor is None:
+                return pages
+
+    def expected_ids(self, queryset):
+        return list(queryset.order_by('-date_requested', '-id').values_list('id', flat=True))
+
+    def test_ties_follow_the_id_tiebreak(self):
+        pages = self.walk({}, page_size=3)
+        self.assertEqual([len(page) for page in pages], [3, 3, 2])
+        ids = [request_id for page in pages for request_id in page]
+        self.assertEqual(ids, self.expected_ids(Request.objects.all()))
+        self.assertEqual(ids[0], self.newer.id)
+
+    def test_filters_apply_across_pages(self):
+        for params, queryset in [
+            ({'status': 'Pending'}, Request.objects.filter(status='Pending')),
+            ({'status': 'Pending', 'document_type': self.transcript.pk},
+             Request.objects.filter(status='Pending', document=self.transcript)),
+        ]:
+            ids = [request_id for page in self.walk(params, page_size=2) for request_id in page]
+            self.assertEqual(ids, self.expected_ids(queryset))
+
+    def test_next_cursor_only_when_another_row_exists(self):
+        total = Request.objects.count()
+        self.assertIsNone(get_admin_requests_page({}, page_size=total)[2])
+        self.assertIsNotNone(get_admin_requests_page({}, page_size=total - 1)[2])
+
+        last_full_page = Request.objects.order_by('-date_requested', '-id')[total - 2]
+        _, rows, cursor = get_admin_requests_page({'cursor': encode_request_cursor(last_full_page)}, page_size=1)
+        self.assertEqual(len(rows), 1)
+        self.assertIsNone(cursor)
+
+    def test_cursor_round_trip(self):
+        req = Request.objects.get(pk=self.newer.pk)
+        self.assertEqual(decode_request_cursor(encode_request_cursor(req)), (req.date_requested, req.id))
+
+    def test_invalid_cursors(self):
+        tampered = base64.urlsafe_b64encode(f"{self.same_time.isoformat()}|abc".encode()).decode()
+        invalid = ['not-a-cursor', tampered, base64.urlsafe_b64encode(b'2025-13-45T00:00:00|1').decode(), '\u00e9']
+        for cursor in invalid:
+            self.assertIsNone(decode_request_cursor(cursor))
+
+        self.client.force_login(self.user)
+        first_page = self.expected_ids(Request.objects.all())
+        for cursor in invalid:
+            response = self.client.get(reverse('admin_document_requests'), {'cursor': cursor})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual([req.id for req in response.context['all_requests']], first_page)
+
+            response = self.client.get(reverse('admin_document_requests_data'), {'cursor': cursor})
+            self.assertEqual(response.status_code, 400)
+            self.assertFalse(response.json()['success'])
+
+
+class InformationalPageCachingTests(StudentFixtureMixin, TestCase):
+    """About us and FAQs come from the fragment cache and revalidate with a 304"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = cls.create_student().user
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+        self.client.get(reverse('home'))
+
+    def test_body_is_cached_by_template_version(self):
+        response = self.client.get(reverse('about_us'))
+        self.assertContains(response, 'About WildDocs')
+        key = make_template_fragment_key('about_us_body', [get_fragment_version()[0]])
+        self.assertIn('About WildDocs', cache.get(key))
+
+    def test_no_student_lookup(self):
+        self.client.get(reverse('faqs'))
+        # Session and user only
+        with self.assertNumQueries(2):
+            self.client.get(reverse('faqs'))
+
+    def test_revalidation_returns_not_modified(self):
+        for name in ['about_us', 'faqs']:
+            response = self.client.get(reverse(name))
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('private', response['Cache-Control'])
+            self.assertIn('no-cache', response['Cache-Control'])
+            self.assertTrue(response.has_header('Last-Modified'))
+
+            response = self.client.get(reverse(name), HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(response.status_code, 304)
+
+    def test_etag_differs_per_user(self):
+        etag = self.client.get(reverse('about_us'))['ETag']
+        other = User.objects.create_user(username='23-0000-002', password='password123')
+        self.client.force_login(other)
+        response = self.client.get(reverse('about_us'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_pending_messages_are_not_hidden_by_a_304(self):
+        etag = self.client.get(reverse('about_us'))['ETag']
+        # Students are bounced from the admin pages with a flash message
+        self.client.get(reverse('admin_dashboard'))
+        response = self.client.get(reverse('about_us'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Access denied')
+
+
+class StudentPageConditionalGetTests(StudentFixtureMixin, TestCase):
+    """Unchanged student pages are revalidated with a 304 without reading requests"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = cls.create_student()
+        cls.user = cls.student.user
+        cls.document = cls.create_document()
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.client.get(reverse('home'))
+        self.request = Request.objects.create(student=self.student, document=self.document, purpose='Scholarship')
+
+    def revalidate(self, url, etag):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_pages_return_not_modified(self):
+        urls = [reverse(name) for name in ['dashboard', 'requested_documents', 'history']]
+        urls += [reverse(f'Request:{name}') for name in ['pending', 'approved', 'completed']]
+        for url in urls:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('private', response['Cache-Control'])
+            with CaptureQueriesContext(connection) as context:
+                response = self.revalidate(url, response['ETag'])
+            self.assertEqual(response.status_code, 304, url)
+            self.assertFalse(
+                any('accounts_request' in query['sql'] for query in context.captured_queries), url
+            )
+
+    def assertChangeInvalidates(self, change):
+        url = reverse('requested_documents')
+        etag = self.client.get(url)['ETag']
+        change()
+        self.assertEqual(self.revalidate(url, etag).status_code, 200)
+
+    def test_new_request_invalidates(self):
+        self.assertChangeInvalidates(lambda: Request.objects.create(
+            student=self.student, document=self.document, purpose='Employment'
+        ))
+
+    def test_status_change_invalidates(self):
+        def approve():
+            self.request.status = 'Approved'
+            self.request.save()
+        self.assertChangeInvalidates(approve)
+
+    def test_other_request_edit_invalidates(self):
+        def edit():
+            self.request.copies = 3
+            self.request.save()
+        self.assertChangeInvalidates(edit)
+
+    def test_profile_update_invalidates(self):
+        def update_profile():
+            self.student.course = 'BS Computer Science'
+            self.student.save()
+        self.assertChangeInvalidates(update_profile)
+
+    @override_settings(ROOT_URLCONF=AsyncStudentURLConf)
+    def test_async_views_return_not_modified(self):
+        url = reverse('history')
+        response = self.client.get(url)
+        self.assertEqual(self.revalidate(url, response['ETag']).status_code, 304)
+
+
+class NotificationsFeedTests(StudentFixtureMixin, TestCase):
+    """The notifications feed returns unread rows after an id, optionally long-polling"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = cls.create_student()
+        cls.user = cls.student.user
+        other = cls.create_student('23-0000-002')
+        document = cls.create_document()
+        cls.request = Request.objects.create(student=cls.student, document=document, purpose='Scholarship')
+        cls.notifications = [
+            Notification.objects.create(student=cls.student, request=cls.request, message=f'Update {index}')
+            for index in range(3)
+        ]
+        Notification.objects.filter(pk=cls.notifications[0].pk).update(is_read=True)
+        other_request = Request.objects.create(student=other, document=document, purpose='Employment')
+        Notification.objects.create(student=other, request=other_request, message='Not yours')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_without_since_returns_newest_unread(self):
+        data = self.client.get(reverse('notifications_feed')).json()
+        self.assertEqual([n['message'] for n in data['notifications']], ['Update 1', 'Update 2'])
+        self.assertEqual(data['last_id'], self.notifications[2].id)
+
+    def test_since_returns_only_newer_unread(self):
+        response = self.client.get(reverse('notifications_feed'), {'since': self.notifications[1].id})
+        data = response.json()
+        self.assertEqual([n['id'] for n in data['notifications']], [self.notifications[2].id])
+        self.assertIn('no-cache', response['Cache-Control'])
+
+    @override_settings(NOTIFICATIONS_LONG_POLL_TIMEOUT=0.3, NOTIFICATIONS_POLL_INTERVAL=0.1)
+    def test_long_poll_times_out_empty(self):
+        data = self.client.get(
+            reverse('notifications_feed'), {'since': self.notifications[2].id, 'wait': 60}
+        ).json()
+        self.assertEqual(data['notifications'], [])
+        self.assertEqual(data['last_id'], self.notifications[2].id)
+
+    def test_invalid_parameters(self):
+        response = self.client.get(reverse('notifications_feed'), {'since': 'abc'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_non_students_are_refused(self):
+        self.client.force_login(User.objects.create_user(username='registrar'))
+        self.assertEqual(self.client.get(reverse('notifications_feed')).status_code, 403)
+
+
+@override_settings(REQUEST_EVENTS_STREAM_TIMEOUT=0.2, REQUEST_EVENTS_HEARTBEAT=0.1)
+class AdminRequestEventStreamTests(TestCase):
+    """The admin queue event stream is staff-only and speaks text/event-stream"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='registrar', password='password123')
+        AdminAccount.objects.create(user=cls.user, full_name='Registrar Staff', role='Registrar')
+
+    def setUp(self):
+        events._broker = None
+        self.addCleanup(setattr, events, '_broker', None)
+        self.client.force_login(self.user)
+
+    def test_stream_replays_missed_events(self):
+        broker = events.get_broker()
+        broker.publish({'type': 'created', 'request': {'id': 1}})
+        broker.publish({'type': 'status', 'request': {'id': 1, 'status': 'Approved'}})
+
+        response = self.client.get(reverse('admin_document_requests_events'), HTTP_LAST_EVENT_ID='1')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(response['X-Accel-Buffering'], 'no')
+        body = b''.join(response.streaming_content).decode()
+        self.assertTrue(body.startswith('retry: '))
+        self.assertIn('id: 2\nevent: status\n', body)
+        self.assertNotIn('event: created', body)
+        self.assertIn(': keep-alive', body)
+        self.assertFalse(broker.has_listeners())
+
+    def test_non_admins_are_refused(self):
+        self.client.force_login(User.objects.create_user(username='23-0000-001'))
+        self.assertEqual(self.client.get(reverse('admin_document_requests_events')).status_code, 403)
+
+
+class AdminBulkStatusTests(StudentFixtureMixin, TestCase):
+    """The bulk status endpoint is staff-only and reports what changed"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='registrar', password='password123')
+        AdminAccount.objects.create(user=cls.user, full_name='Registrar Staff', role='Registrar')
+        student = cls.create_student()
+        document = cls.create_document()
+        cls.requests = [
+            Request.objects.create(student=student, document=document, purpose='Scholarship', status=status)
+            for status in ['Pending', 'Pending', 'Approved']
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_bulk_approve(self):
+        response = self.client.post(reverse('admin_bulk_update_status'), {
+            'status': 'Approved',
+            'request_ids': [req.pk for req in self.requests],
+        })
+        data = response.json()
+        self.assertTrue(data['success'])
+        self.assertEqual(data['updated_ids'], [self.requests[0].pk, self.requests[1].pk])
+        self.assertEqual(data['skipped'], 1)
+        self.assertEqual(Request.objects.filter(status='Approved').count(), 3)
+
+    def test_invalid_submissions(self):
+        url = reverse('admin_bulk_update_status')
+        self.assertEqual(self.client.post(url, {'status': 'Approved'}).status_code, 400)
+        self.assertEqual(self.client.post(url, {'status': 'Lost', 'request_ids': [1]}).status_code, 400)
+        self.assertEqual(self.client.post(url, {'status': 'Approved', 'request_ids': ['x']}).status_code, 400)
+        self.assertEqual(self.client.get(url).status_code, 405)
+
+    def test_non_admins_are_refused(self):
+        self.client.force_login(User.objects.create_user(username='23-0000-002'))
+        response = self.client.post(reverse('admin_bulk_update_status'), {
+            'status': 'Approved', 'request_ids': [self.requests[0].pk],
+        })
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(Request.objects.get(pk=self.requests[0].pk).status, 'Pending')
+
+
+class ProfilePictureUploadTests(StudentFixtureMixin, TestCase):
+    """Profile updates store thumbnails and release the picture they replace"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = cls.create_student()
+        cls.user = cls.student.user
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=tmp_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.client.force_login(self.user)
+
+    def upload(self, color):
+        buffer = io.BytesIO()
+        Image.new('RGB', (400, 300), color).save(buffer, format='PNG')
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse('student_profile'), {
+                'action': 'update_profile',
+                'profile_picture': SimpleUploadedFile('photo.png', buffer.getvalue(), content_type='image/png'),
+            }).json()
+
+    def test_upload_replaces_previous_picture(self):
+        data = self.upload('red')
+        self.assertTrue(data['success'])
+        self.assertTrue(data['student']['profile_picture_processing'])
+        self.student.refresh_from_db()
+        self.assertEqual(self.student.profile_picture_hash, '')
+        original = self.student.profile_picture
+        self.assertTrue(original.startswith('/media/profile_pictures/originals/'))
+
+        self.assertEqual(process_image_jobs()['done'], 1)
+        self.student.refresh_from_db()
+        first = self.student.profile_picture_hash
+        self.assertTrue(images.is_rendered(first))
+        self.assertFalse(os.path.exists(os.path.join(settings.MEDIA_ROOT, original[len('/media/'):])))
+
+        # The same picture again reuses the thumbnails without a job
+        data = self.upload('red')
+        self.assertFalse(data['student']['profile_picture_processing'])
+        self.assertEqual(data['student']['profile_picture_urls']['sm'], images.picture_url(first, 'sm'))
+        self.assertEqual(self.student.profile_picture, images.fallback_url(first))
+
+        old = time.time() - images.GC_GRACE_SECONDS - 60
+        os.utime(images.picture_dir(first), (old, old))
+        self.upload('blue')
+        process_image_jobs()
+        self.student.refresh_from_db()
+        self.assertNotEqual(self.student.profile_picture_hash, first)
+        self.assertFalse(images.picture_dir(first).exists())
+
+        response = self.client.get(reverse('dashboard'))
+        self.assertContains(response, images.picture_url(self.student.profile_picture_hash, 'sm'))
+
+    def test_invalid_image_is_refused(self):
+        response = self.client.post(reverse('student_profile'), {
+            'action': 'update_profile',
+            'profile_picture': SimpleUploadedFile('photo.png', b'not an image'),
+        })
+        self.assertFalse(response.json()['success'])
+        self.student.refresh_from_db()
+        self.assertEqual(self.student.profile_picture_hash, '')
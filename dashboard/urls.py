@@ -1,19 +1,27 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+# Student hot-path pages can be served by the ASGI-native views
+student_views = async_views if settings.ASYNC_STUDENT_VIEWS else views
 
 urlpatterns = [
     # Base student dashboard route
-    path('', views.dashboard_redirect, name='dashboard'),
+    path('', student_views.dashboard_redirect, name='dashboard'),
 
     # Student routes
     path('student_profile/', views.student_profile, name='student_profile'),
-    path('requested_documents/', views.requested_documents, name='requested_documents'),
-    path('history/', views.history, name='history'),
+    path('requested_documents/', student_views.requested_documents, name='requested_documents'),
+    path('history/', student_views.history, name='history'),
     path('about_us/', views.about_us, name='about_us'),
     path('faqs/', views.faqs, name='faqs'),
+    path('notifications/', views.notifications_feed, name='notifications_feed'),
 
     # Admin routes
     path('admin_dashboard/', views.admin_dashboard, name='admin_dashboard'),
     path('admin-document-requests/', views.admin_document_requests, name='admin_document_requests'),
+    path('admin-document-requests/data/', views.admin_document_requests_data, name='admin_document_requests_data'),
+    path('admin-document-requests/bulk-status/', views.admin_bulk_update_status, name='admin_bulk_update_status'),
+    path('admin-document-requests/events/', views.admin_document_requests_events, name='admin_document_requests_events'),
 ]
 
@@ -1,31 +1,48 @@
 from django.shortcuts import render, redirect
 from django.contrib import messages
-from django.http import JsonResponse
-from accounts.models import StudentAccount, Request, DocumentType, AdminAccount
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from accounts.models import Request, DocumentType, Notification
 from django.contrib.auth.decorators import login_required
 from django.conf import settings
 from accounts.forms import StudentProfileForm
+from accounts.image_jobs import enqueue_profile_picture
+from accounts.images import PROFILE_PICTURE_SIZES, InvalidImage, fallback_url, release_profile_picture, save_profile_picture
+from dashboard.conditional import student_page
+from dashboard.fragments import informational_page_etag, informational_page_last_modified
+from request.analytics import get_admin_analytics
+from request.cache import get_global_status_counts
+from request.events import RESYNC_EVENT, format_sse, get_broker, serialize_admin_request
+from request.models import REQUEST_STATUSES, RequestManager
 import json
-import uuid
-import os
-from django.views.decorators.cache import never_cache
+from django.views.decorators.cache import cache_control, never_cache
+from django.views.decorators.http import condition, require_POST
 from django.utils import timezone
-from datetime import timedelta
+from django.utils.dateparse import parse_datetime
+from django.db import transaction
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
+from request.forms import BulkStatusForm, RequestFilterForm
+from request.utils import bulk_transition_requests
+from datetime import datetime, time, timedelta
+import asyncio
+from time import monotonic
+import base64
 
 
 
 # ===== HELPER FUNCTIONS =====
 
-def get_student_data(user):
+def get_student_data(request):
     """Get student data or return None if not found"""
-    try:
-        student = StudentAccount.objects.get(user=user)
+    student = request.identity.student
+    if student is not None:
         return {
             'student': student,
             'student_name': str(student),
             'student_id_number': student.student_number
         }
-    except StudentAccount.DoesNotExist:
+    else:
         return {
             'student': None,
             'student_name': "Unknown",
@@ -41,36 +58,24 @@ def handle_profile_update(request, student):
         
         # Handle profile picture upload
         profile_picture_url = student.profile_picture  # Keep existing URL
+        profile_picture_hash = student.profile_picture_hash
+        pending_picture = None
         
         if 'profile_picture' in request.FILES:
-            profile_picture = request.FILES['profile_picture']
-
-            # Validate file size (max 10MB)
-            if profile_picture.size > 10 * 1024 * 1024:
-                return JsonResponse({'success': False, 'error': 'Image file too large. Maximum size is 10MB.'})
-
-            # Validate extension
-            file_extension = os.path.splitext(profile_picture.name)[1].lower()
-            if file_extension not in ['.jpg', '.jpeg', '.png', '.gif']:
-                return JsonResponse({'success': False, 'error': 'Invalid file format. Please use JPG, PNG, or GIF.'})
-
-            # Save file locally to MEDIA_ROOT/profile_pictures/<student_number>/
-            media_dir = os.path.join(settings.MEDIA_ROOT, 'profile_pictures', str(student.student_number))
-            os.makedirs(media_dir, exist_ok=True)
-
-            unique_filename = f"{uuid.uuid4()}{file_extension}"
-            local_path = os.path.join(media_dir, unique_filename)
-
+            # Persist the original only; thumbnails are rendered by process_image_jobs
             try:
-                with open(local_path, 'wb') as f:
-                    for chunk in profile_picture.chunks():
-                        f.write(chunk)
-
-                # Build a URL path for serving via MEDIA_URL
-                profile_picture_url = os.path.join(settings.MEDIA_URL, 'profile_pictures', str(student.student_number), unique_filename).replace('\\', '/')
-
-            except Exception as e:
+                profile_picture_hash, original_url = save_profile_picture(request.FILES['profile_picture'])
+            except InvalidImage as e:
+                return JsonResponse({'success': False, 'error': str(e)})
+            except OSError as e:
                 return JsonResponse({'success': False, 'error': f'Failed to save uploaded image locally: {e}'})
+            if original_url is None:
+                # Same picture as an earlier upload: its thumbnails already exist
+                profile_picture_url = fallback_url(profile_picture_hash)
+            else:
+                # Serve the original until the worker swaps the thumbnails in
+                pending_picture = (profile_picture_hash, original_url)
+                profile_picture_url, profile_picture_hash = original_url, ''
         
         # Update other fields
         student.first_name = request.POST.get('first_name', student.first_name)
@@ -79,7 +84,9 @@ def handle_profile_update(request, student):
         student.course = request.POST.get('course', student.course)
         student.year_level = request.POST.get('year_level', student.year_level)
         student.contact_number = request.POST.get('contact_number', student.contact_number)
+        superseded = (student.profile_picture_hash, student.profile_picture)
         student.profile_picture = profile_picture_url
+        student.profile_picture_hash = profile_picture_hash
         
         # Auto-determine program based on course
         if student.course:
@@ -97,6 +104,10 @@ def handle_profile_update(request, student):
                 student.program = 'College of Criminal Justice'
         
         student.save()
+        if pending_picture is not None:
+            enqueue_profile_picture(student, *pending_picture)
+        if superseded != (student.profile_picture_hash, student.profile_picture):
+            transaction.on_commit(lambda: release_profile_picture(*superseded))
         
         response_data = {
             'success': True,
@@ -109,7 +120,11 @@ def handle_profile_update(request, student):
                 'year_level': student.year_level,
                 'email': student.email,
                 'contact_number': student.contact_number,
-                'profile_picture_url': student.profile_picture
+                'profile_picture_url': student.profile_picture,
+                'profile_picture_urls': {
+                    size: student.get_profile_picture_url(size) for size in PROFILE_PICTURE_SIZES
+                },
+                'profile_picture_processing': pending_picture is not None,
             }
         }
         
@@ -164,7 +179,7 @@ def handle_document_request(request, student):
         )
         
         # Return serialized info so the frontend can update without a full reload
-        pending_count = Request.objects.filter(student=student, status='Pending').count()
+        pending_count = RequestManager.get_student_counts(student)['pending']
         request_data = {
             'id': new_request.id,
             'document_name': new_request.document.name,
@@ -196,15 +211,14 @@ def get_dashboard_stats(student):
             'overdue_requests': []
         }
     
-    pending_count = Request.objects.filter(student=student, status='Pending').count()
-    approved_count = Request.objects.filter(student=student, status='Approved').count()
-    completed_count = Request.objects.filter(student=student, status='Completed').count()
+    # Per-status counters from the student's denormalized counters row
+    counts = RequestManager.get_student_counts(student)
     
     # Get recent requests for display
-    recent_requests = Request.objects.filter(student=student).order_by('-date_requested')[:3]
+    recent_requests = Request.objects.filter(student=student).select_related('document').order_by('-date_requested')[:3]
     
     # Get approved requests for reminders
-    approved_requests = Request.objects.filter(student=student, status='Approved').order_by('-date_requested')[:2]
+    approved_requests = Request.objects.filter(student=student, status='Approved').select_related('document').order_by('-date_requested')[:2]
     
     # Get overdue approved requests (older than 14 days)
     threshold_date = timezone.now() - timedelta(days=14)
@@ -212,33 +226,157 @@ def get_dashboard_stats(student):
         student=student, 
         status='Approved',
         date_requested__lt=threshold_date
-    ).order_by('-date_requested')[:2]
+    ).select_related('document').order_by('-date_requested')[:2]
     
     return {
-        'pending_count': pending_count,
-        'approved_count': approved_count,
-        'completed_count': completed_count,
+        'pending_count': counts['pending'],
+        'approved_count': counts['approved'],
+        'completed_count': counts['completed'],
         'recent_requests': recent_requests,
         'approved_requests': approved_requests,
         'overdue_requests': overdue_requests
     }
 
 
+# Default and maximum number of rows on the student request pages
+STUDENT_REQUESTS_PAGE_SIZE = 50
+STUDENT_REQUESTS_MAX_LIMIT = 500
+
+
+def get_request_limit(request):
+    """Read the optional ?limit= page size for the student request pages"""
+    try:
+        limit = int(request.GET.get('limit', STUDENT_REQUESTS_PAGE_SIZE))
+    except ValueError:
+        return STUDENT_REQUESTS_PAGE_SIZE
+    return max(1, min(limit, STUDENT_REQUESTS_MAX_LIMIT))
+
+
+def ranked_requests_by_status(student, limit):
+    """
+    Get a student's newest `limit` requests of each status in one query,
+    numbering the rows within their status with a window function.
+    """
+    return (
+        Request.objects.filter(student=student)
+        .select_related('document')
+        .annotate(status_rank=Window(RowNumber(), partition_by=F('status'), order_by=F('date_requested').desc()))
+        .filter(status_rank__lte=limit)
+        .order_by('-date_requested')
+    )
+
+
+def bucket_requests_by_status(requests):
+    """Split already-fetched requests into per-status lists, keeping their order"""
+    buckets = {status: [] for status in REQUEST_STATUSES}
+    for req in requests:
+        buckets.setdefault(req.status, []).append(req)
+    return buckets
+
+
+# Rows per page on the admin document requests table
+ADMIN_REQUESTS_PAGE_SIZE = 50
+
+
+def encode_request_cursor(req):
+    """Encode a request's (date_requested, id) position as an opaque cursor"""
+    raw = f"{req.date_requested.isoformat()}|{req.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_request_cursor(cursor):
+    """Decode a cursor into (date_requested, id), or None if it is invalid"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        date_part, id_part = raw.rsplit('|', 1)
+        date_requested = parse_datetime(date_part)
+        if date_requested is None:
+            return None
+        return date_requested, int(id_part)
+    except (ValueError, UnicodeError):
+        return None
+
+
+def get_admin_requests_page(params, page_size=ADMIN_REQUESTS_PAGE_SIZE):
+    """
+    Get one keyset-paginated page of requests for the admin table.
+    Filters come from RequestFilterForm; rows are ordered newest first by
+    (date_requested, id) and the page after a cursor never needs an OFFSET.
+    Returns (filter_form, rows, next_cursor).
+    """
+    filter_form = RequestFilterForm(params)
+    queryset = Request.objects.select_related('student', 'document')
+
+    if filter_form.is_valid():
+        filters = filter_form.cleaned_data
+        if filters['status']:
+            queryset = queryset.filter(status=filters['status'])
+        if filters['document_type']:
+            queryset = queryset.filter(document=filters['document_type'])
+        # Compare against datetime bounds so the date_requested index is usable
+        if filters['date_from']:
+            start = timezone.make_aware(datetime.combine(filters['date_from'], time.min))
+            queryset = queryset.filter(date_requested__gte=start)
+        if filters['date_to']:
+            end = timezone.make_aware(datetime.combine(filters['date_to'] + timedelta(days=1), time.min))
+            queryset = queryset.filter(date_requested__lt=end)
+
+    cursor = decode_request_cursor(params.get('cursor', ''))
+    if cursor:
+        date_requested, request_id = cursor
+        queryset = queryset.filter(
+            Q(date_requested__lt=date_requested) |
+            Q(date_requested=date_requested, id__lt=request_id)
+        )
+
+    # Fetch one extra row to learn whether another page exists
+    rows = list(queryset.order_by('-date_requested', '-id')[:page_size + 1])
+    next_cursor = encode_request_cursor(rows[page_size - 1]) if len(rows) > page_size else None
+    return filter_form, rows[:page_size], next_cursor
+
+
+# Most unread notifications returned by one feed response
+NOTIFICATIONS_FEED_LIMIT = 50
+
+
+def serialize_notification(notification):
+    """Serialize a notification for the JSON feed"""
+    return {
+        'id': notification.id,
+        'request_id': notification.request_id,
+        'message': notification.message,
+        'date_sent': notification.date_sent.isoformat(),
+    }
+
+
+async def aget_unread_notifications(student, since_id=None):
+    """
+    Get a student's unread notifications after since_id, oldest first, using
+    the partial unread index. Without since_id the newest ones are returned.
+    """
+    queryset = Notification.objects.filter(student=student, is_read=False)
+    if since_id is None:
+        newest = [notification async for notification in queryset.order_by('-id')[:NOTIFICATIONS_FEED_LIMIT]]
+        return newest[::-1]
+    queryset = queryset.filter(id__gt=since_id).order_by('id')[:NOTIFICATIONS_FEED_LIMIT]
+    return [notification async for notification in queryset]
+
+
 # ===== VIEW FUNCTIONS =====
 
-@never_cache
 @login_required
+@student_page('dashboard.html', 'base.html')
 def dashboard(request):
     """Main dashboard view for students"""
     # Redirect admin users
-    if hasattr(request.user, 'adminaccount'):
+    if request.identity.is_admin:
         return redirect('admin_dashboard')
 
     if not request.user.is_authenticated:
         return redirect(f"{settings.LOGIN_URL}?next={request.path}")
     
     # Get student data
-    student_data = get_student_data(request.user)
+    student_data = get_student_data(request)
     student = student_data['student']
     
     # Handle POST requests
@@ -268,7 +406,7 @@ def dashboard(request):
 @login_required
 def student_profile(request):
     """Student profile management view"""
-    student_data = get_student_data(request.user)
+    student_data = get_student_data(request)
     student = student_data['student']
     
     # Handle profile update requests
@@ -284,81 +422,136 @@ def student_profile(request):
     return render(request, 'student_profile.html', context)
 
 
-@never_cache
 @login_required
+@student_page('requested_documents.html', 'base.html')
 def requested_documents(request):
     """View for requested documents"""
-    student_data = get_student_data(request.user)
+    student_data = get_student_data(request)
     student = student_data['student']
+    limit = get_request_limit(request)
     
-    # Get all requests for display
-    all_requests = Request.objects.filter(student=student).order_by('-date_requested') if student else []
-    pending_requests = Request.objects.filter(student=student, status='Pending').order_by('-date_requested') if student else []
-    approved_requests = Request.objects.filter(student=student, status='Approved').order_by('-date_requested') if student else []
-    completed_requests = Request.objects.filter(student=student, status='Completed').order_by('-date_requested') if student else []
+    # Each status tab gets its own newest `limit` rows; badge counts come from the counters
+    if student:
+        all_requests = list(
+            Request.objects.filter(student=student).select_related('document').order_by('-date_requested')[:limit]
+        )
+        buckets = bucket_requests_by_status(ranked_requests_by_status(student, limit))
+        counts = RequestManager.get_student_counts(student)
+    else:
+        all_requests = []
+        buckets = bucket_requests_by_status([])
+        counts = dict.fromkeys(['total', 'pending', 'approved', 'completed'], 0)
+    total_count = counts['total']
     
     context = {
         'student': student,
         'student_name': student_data['student_name'],
         'student_id_number': student_data['student_id_number'],
         'all_requests': all_requests,
-        'pending_requests': pending_requests,
-        'approved_requests': approved_requests,
-        'completed_requests': completed_requests,
+        'pending_requests': buckets['Pending'],
+        'approved_requests': buckets['Approved'],
+        'completed_requests': buckets['Completed'],
+        'pending_count': counts['pending'],
+        'approved_count': counts['approved'],
+        'completed_count': counts['completed'],
+        'total_count': total_count,
+        'next_limit': limit + STUDENT_REQUESTS_PAGE_SIZE if total_count > len(all_requests) else None,
     }
     
     return render(request, 'requested_documents.html', context)
 
 
-@never_cache
 @login_required
+@student_page('history.html', 'base.html')
 def history(request):
     """Request history view"""
-    student_data = get_student_data(request.user)
+    student_data = get_student_data(request)
     student = student_data['student']
+    limit = get_request_limit(request)
     
-    # Get completed requests for history
-    completed_requests = Request.objects.filter(student=student, status='Completed').order_by('-date_requested') if student else []
-    all_requests = Request.objects.filter(student=student).order_by('-date_requested') if student else []
+    # Get completed requests for history in a single query
+    completed_requests = list(
+        Request.objects.filter(student=student, status='Completed').select_related('document').order_by('-date_requested')[:limit]
+    ) if student else []
+    total_count = RequestManager.get_student_counts(student)['completed'] if student else 0
     
     context = {
         'student': student,
         'student_name': student_data['student_name'],
         'student_id_number': student_data['student_id_number'],
         'completed_requests': completed_requests,
-        'all_requests': all_requests,
+        'total_count': total_count,
+        'next_limit': limit + STUDENT_REQUESTS_PAGE_SIZE if total_count > len(completed_requests) else None,
     }
     
     return render(request, 'history.html', context)
 
 
 def create_base_context(request, template_name):
-    """Create base context for simple pages"""
-    student_data = get_student_data(request.user)
+    """
+    Create base context for simple pages. Their bodies are served from the
+    fragment cache and show no student data, so no account is looked up.
+    """
     return {
-        'student': student_data['student'],
-        'student_name': student_data['student_name'],
-        'student_id_number': student_data['student_id_number'],
         'template_name': template_name,
     }
 
 
-@never_cache
+# Informational pages are revalidated by browsers with ETag/Last-Modified (304)
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=informational_page_etag, last_modified_func=informational_page_last_modified)
 def about_us(request):
     """About us page"""
     context = create_base_context(request, 'about_us.html')
     return render(request, 'about_us.html', context)
 
 
-@never_cache
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=informational_page_etag, last_modified_func=informational_page_last_modified)
 def faqs(request):
     """FAQs page"""
     context = create_base_context(request, 'faqs.html')
     return render(request, 'faqs.html', context)
 
 
+@never_cache
+@login_required
+async def notifications_feed(request):
+    """
+    JSON feed of the student's unread notifications after ?since=<id>
+    (without it, the newest unread ones). With ?wait=<seconds> it
+    long-polls: the response is held until a new notification arrives or the
+    wait (capped by settings) runs out.
+    """
+    identity = await request.identity.aload()
+    student = identity.student
+    if student is None:
+        return JsonResponse({'success': False, 'error': 'Student account not found'}, status=403)
+
+    try:
+        since_id = max(0, int(request.GET['since'])) if request.GET.get('since') else None
+        wait = max(0.0, min(float(request.GET.get('wait', 0)), settings.NOTIFICATIONS_LONG_POLL_TIMEOUT))
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Invalid since or wait parameter'}, status=400)
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + wait
+    while True:
+        notifications = await aget_unread_notifications(student, since_id)
+        remaining = deadline - loop.time()
+        if notifications or remaining <= 0:
+            break
+        await asyncio.sleep(min(settings.NOTIFICATIONS_POLL_INTERVAL, remaining))
+
+    return JsonResponse({
+        'success': True,
+        'notifications': [serialize_notification(notification) for notification in notifications],
+        'last_id': notifications[-1].id if notifications else (since_id or 0),
+    })
+
+
 # ===== ADMIN VIEWS =====
 
 @never_cache
@@ -366,25 +559,27 @@ def faqs(request):
 def admin_dashboard(request):
     """Admin dashboard view"""
     # Ensure only staff/admin users can access
-    try:
-        admin = AdminAccount.objects.get(user=request.user)
-    except AdminAccount.DoesNotExist:
+    admin = request.identity.admin
+    if admin is None:
         messages.error(request, "Access denied: Staff account required.")
         return redirect('dashboard')
 
-    # Dashboard metrics
-    pending_count = Request.objects.filter(status='Pending').count()
-    approved_count = Request.objects.filter(status='Approved').count()
-    rejected_count = Request.objects.filter(status='Rejected').count()
+    # Dashboard metrics, served from the cached global snapshot
+    counts = get_global_status_counts()
+
+    # Document and processing-time analytics
+    analytics = get_admin_analytics()
 
     # Recent requests table
     recent_requests = Request.objects.select_related('student', 'document').order_by('-date_requested')[:10]
 
     context = {
         'admin': admin,
-        'pending_count': pending_count,
-        'approved_count': approved_count,
-        'rejected_count': rejected_count,
+        'pending_count': counts['pending'],
+        'approved_count': counts['approved'],
+        'rejected_count': counts['rejected'],
+        'top_documents': analytics['top_documents'],
+        'average_processing_days': analytics['average_processing_days'],
         'recent_requests': recent_requests,
     }
 
@@ -395,29 +590,144 @@ def admin_dashboard(request):
 @login_required
 def admin_document_requests(request):
     """Admin document requests management"""
-    try:
-        AdminAccount.objects.get(user=request.user)
-    except AdminAccount.DoesNotExist:
+    if not request.identity.is_admin:
         messages.error(request, "Access denied: staff accounts only.")
         return redirect('dashboard')
 
-    all_requests = Request.objects.select_related('student', 'document').order_by('-date_requested')
+    filter_form, all_requests, next_cursor = get_admin_requests_page(request.GET)
+
+    # Keep the active filters when building "load more" links
+    filter_query = request.GET.copy()
+    filter_query.pop('cursor', None)
 
     context = {
-        'all_requests': all_requests
+        'all_requests': all_requests,
+        'filter_form': filter_form,
+        'bulk_form': BulkStatusForm(),
+        'next_cursor': next_cursor,
+        'filter_query': filter_query.urlencode(),
+        'is_filtered': any(filter_query.get(field) for field in ['status', 'document_type', 'date_from', 'date_to']),
     }
+    # Live-streamed new requests belong at the top of the first unfiltered page only
+    context['live_prepend'] = not context['is_filtered'] and not request.GET.get('cursor')
     return render(request, 'admin/admin_document_requests.html', context)
 
 
+@never_cache
+@login_required
+def admin_document_requests_data(request):
+    """JSON page of admin document requests for lazy loading"""
+    if not request.identity.is_admin:
+        return JsonResponse({'success': False, 'error': 'Staff accounts only.'}, status=403)
+
+    cursor = request.GET.get('cursor')
+    if cursor and decode_request_cursor(cursor) is None:
+        return JsonResponse({'success': False, 'error': 'Invalid cursor.'}, status=400)
+
+    filter_form, rows, next_cursor = get_admin_requests_page(request.GET)
+    if filter_form.errors:
+        return JsonResponse({'success': False, 'errors': filter_form.errors}, status=400)
+
+    return JsonResponse({
+        'success': True,
+        'requests': [serialize_admin_request(req) for req in rows],
+        'next_cursor': next_cursor,
+    })
+
+
+@login_required
+@require_POST
+def admin_bulk_update_status(request):
+    """Move the selected requests to one status in a single transaction"""
+    admin = request.identity.admin
+    if admin is None:
+        return JsonResponse({'success': False, 'error': 'Staff accounts only.'}, status=403)
+
+    form = BulkStatusForm(request.POST)
+    if not form.is_valid():
+        return JsonResponse({'success': False, 'errors': form.errors}, status=400)
+
+    request_ids = form.cleaned_data['request_ids']
+    new_status = form.cleaned_data['status']
+    updated = bulk_transition_requests(request_ids, new_status, changed_by=admin.full_name or request.user.username)
+    return JsonResponse({
+        'success': True,
+        'status': new_status,
+        'updated_ids': [req.pk for req in updated],
+        'skipped': len(request_ids) - len(updated),
+    })
+
+
+def admin_request_event_stream(last_event_id):
+    """Sync event stream generator for WSGI servers (holds a worker thread)"""
+    subscription = get_broker().subscribe(last_event_id)
+    try:
+        yield f"retry: {settings.REQUEST_EVENTS_RETRY_MS}\n\n"
+        deadline = monotonic() + settings.REQUEST_EVENTS_STREAM_TIMEOUT
+        while (remaining := deadline - monotonic()) > 0:
+            if subscription.overflowed:
+                yield format_sse(None, RESYNC_EVENT)
+                return
+            item = subscription.get(min(settings.REQUEST_EVENTS_HEARTBEAT, remaining))
+            yield format_sse(*item) if item else ": keep-alive\n\n"
+    finally:
+        subscription.close()
+
+
+async def admin_request_event_astream(last_event_id):
+    """Async event stream generator for ASGI servers"""
+    subscription = get_broker().subscribe(last_event_id, asynchronous=True)
+    try:
+        yield f"retry: {settings.REQUEST_EVENTS_RETRY_MS}\n\n"
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.REQUEST_EVENTS_STREAM_TIMEOUT
+        while (remaining := deadline - loop.time()) > 0:
+            if subscription.overflowed:
+                yield format_sse(None, RESYNC_EVENT)
+                return
+            item = await subscription.get(min(settings.REQUEST_EVENTS_HEARTBEAT, remaining))
+            yield format_sse(*item) if item else ": keep-alive\n\n"
+    finally:
+        subscription.close()
+
+
+@never_cache
+@login_required
+async def admin_document_requests_events(request):
+    """
+    Server-Sent Events stream of new requests and status changes for the
+    admin queue. Each connection lasts up to REQUEST_EVENTS_STREAM_TIMEOUT
+    seconds; the browser then reconnects with Last-Event-ID and receives
+    what it missed.
+    """
+    identity = await request.identity.aload()
+    if not identity.is_admin:
+        return JsonResponse({'success': False, 'error': 'Staff accounts only.'}, status=403)
+
+    try:
+        last_event_id = int(request.headers['Last-Event-ID']) if request.headers.get('Last-Event-ID') else None
+    except ValueError:
+        last_event_id = None
+
+    # Match the iterator to the server so neither side buffers the stream
+    if isinstance(request, ASGIRequest):
+        stream = admin_request_event_astream(last_event_id)
+    else:
+        stream = admin_request_event_stream(last_event_id)
+    response = StreamingHttpResponse(stream, content_type='text/event-stream')
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 @login_required
 def dashboard_redirect(request):
     """
     Redirect /dashboard/ if a staff is logged in.
     Students can stay on /dashboard/.
     """
-    if hasattr(request.user, 'adminaccount'):
+    if request.identity.is_admin:
         return redirect('admin_dashboard')
-    elif hasattr(request.user, 'studentaccount'):
+    elif request.identity.is_student:
         # Student stays in dashboard
         return dashboard(request)
     else:
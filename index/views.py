@@ -8,9 +8,9 @@ def home(request):
             return redirect(next_url)
 
         # Role-based redirection
-        if hasattr(request.user, 'adminaccount'):
+        if request.identity.is_admin:
             return redirect('admin_dashboard')  # Staff → Admin dashboard
-        elif hasattr(request.user, 'studentaccount'):
+        elif request.identity.is_student:
             return redirect('dashboard')        # Student → Student dashboard
         else:
             return redirect('dashboard')        # Default fallback
@@ -1,5 +1,7 @@
-from django.contrib import admin
-from .models import RequestStatusHistory, RequestComment
+from django.contrib import admin, messages
+from accounts.models import Request
+from .models import RequestStatusHistory, RequestComment, StudentRequestCounters, OutboundEmail, AttachmentUpload
+from .utils import bulk_transition_requests, send_status_notification
 
 # Register your models here.
 
@@ -23,3 +25,67 @@ class RequestCommentAdmin(admin.ModelAdmin):
         """Return a preview of the comment"""
         return obj.comment[:50] + "..." if len(obj.comment) > 50 else obj.comment
     comment_preview.short_description = 'Comment Preview'
+
+
+@admin.register(StudentRequestCounters)
+class StudentRequestCountersAdmin(admin.ModelAdmin):
+    list_display = ['student', 'total', 'pending', 'approved', 'completed', 'cancelled', 'rejected', 'updated_at']
+    search_fields = ['student__student_number', 'student__user__username']
+    readonly_fields = ['student', 'total', 'pending', 'approved', 'completed', 'cancelled', 'rejected', 'updated_at']
+
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ['to_email', 'subject', 'status', 'attempts', 'next_attempt_at', 'sent_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['to_email', 'subject']
+    readonly_fields = ['created_at', 'sent_at', 'last_error']
+    ordering = ['-created_at']
+
+
+@admin.register(AttachmentUpload)
+class AttachmentUploadAdmin(admin.ModelAdmin):
+    list_display = ['id', 'request', 'filename', 'offset', 'size', 'updated_at']
+    search_fields = ['id', 'request__id', 'filename']
+    raw_id_fields = ['request']
+    readonly_fields = ['offset', 'checksum', 'created_at', 'updated_at']
+    ordering = ['-updated_at']
+
+
+def bulk_status_action(new_status, description):
+    """Build an admin action moving the selected requests to new_status"""
+    def action(modeladmin, request, queryset):
+        request_ids = list(queryset.values_list('pk', flat=True))
+        updated = bulk_transition_requests(request_ids, new_status, changed_by=request.user.get_username())
+        modeladmin.message_user(
+            request,
+            f"{len(updated)} request(s) moved to {new_status}; {len(request_ids) - len(updated)} already {new_status}.",
+            messages.SUCCESS,
+        )
+    action.__name__ = f"mark_{new_status.lower()}"
+    action.short_description = description
+    return action
+
+
+@admin.register(Request)
+class RequestAdmin(admin.ModelAdmin):
+    list_display = ['id', 'student', 'document', 'copies', 'status', 'date_requested']
+    list_filter = ['status', 'document', 'date_requested']
+    search_fields = ['id', 'student__student_number', 'student__last_name', 'purpose']
+    list_select_related = ['student__user', 'document']
+    raw_id_fields = ['student', 'assigned_admin']
+    readonly_fields = ['date_requested']
+    ordering = ['-date_requested']
+    actions = [
+        bulk_status_action('Approved', 'Approve selected requests'),
+        bulk_status_action('Rejected', 'Reject selected requests'),
+        bulk_status_action('Completed', 'Mark selected requests completed'),
+    ]
+
+    def save_model(self, request, obj, form, change):
+        """Record who changed a request's status and notify the student of it"""
+        old_status = form.initial.get('status') if change else None
+        obj._status_changed_by = request.user.get_username()
+        super().save_model(request, obj, form, change)
+        if change and old_status != obj.status:
+            send_status_notification(obj, old_status, obj.status)
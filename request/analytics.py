@@ -0,0 +1,69 @@
+"""
+Request analytics computed with grouped database aggregates.
+
+Everything here runs as GROUP BY / AVG queries, so the cost does not depend
+on how many rows Python would otherwise have to iterate.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Avg, Count, DurationField, ExpressionWrapper, F
+from accounts.models import Request
+from .models import RequestStatusHistory
+
+
+def get_document_frequency(student=None, status=None, limit=None):
+    """
+    Get (document name, request count) pairs, most requested first.
+    Optionally restricted to one student and/or one status.
+    """
+    queryset = Request.objects.all()
+    if student is not None:
+        queryset = queryset.filter(student=student)
+    if status is not None:
+        queryset = queryset.filter(status=status)
+
+    rows = (
+        queryset.values('document__name')
+        .annotate(count=Count('id'))
+        .order_by('-count', 'document__name')
+    )
+    if limit is not None:
+        rows = rows[:limit]
+    return [(row['document__name'], row['count']) for row in rows]
+
+
+def get_most_requested_document(student=None):
+    """Get the name of the most requested document, or None"""
+    frequency = get_document_frequency(student, limit=1)
+    return frequency[0][0] if frequency else None
+
+
+def get_average_processing_time(student=None):
+    """
+    Get the average time from submission to completion as a timedelta, or
+    None when nothing has been completed. Completion times come from the
+    recorded 'Completed' transitions in RequestStatusHistory.
+    """
+    transitions = RequestStatusHistory.objects.filter(new_status='Completed')
+    if student is not None:
+        transitions = transitions.filter(request__student=student)
+
+    duration = ExpressionWrapper(F('changed_at') - F('request__date_requested'), output_field=DurationField())
+    return transitions.aggregate(average=Avg(duration))['average']
+
+
+def get_average_processing_days(student=None):
+    """Get the average processing time in days, or None"""
+    average = get_average_processing_time(student)
+    return average.total_seconds() / 86400 if average is not None else None
+
+
+def get_admin_analytics():
+    """Get the global document and processing-time analytics, cached briefly"""
+    def compute():
+        return {
+            'top_documents': get_document_frequency(limit=5),
+            'average_processing_days': get_average_processing_days(),
+        }
+    return cache.get_or_set('request_analytics:global', compute, timeout=settings.REQUEST_COUNTS_CACHE_TIMEOUT)
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class RequestConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'request'
+
+    def ready(self):
+        # Register signal handlers that maintain denormalized request data
+        from . import signals  # noqa: F401
@@ -0,0 +1,97 @@
+"""
+Cached global request status counts for the admin dashboard.
+
+The snapshot lives in Django's cache framework, one key per status, so a
+status change can adjust it with atomic incr/decr instead of recounting the
+whole Request table. A cold or partially evicted snapshot is rebuilt with a
+single aggregate query.
+
+The keys carry a generation number. Rebuilding starts a new generation
+before it recounts, and a transition that finds a key missing starts another
+one, so a recount that raced with a committed change is written under a
+generation nobody reads instead of being served until it expires.
+"""
+
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from .models import REQUEST_STATUSES, RequestManager
+
+CACHE_KEY_PREFIX = 'request_counts'
+GENERATION_KEY = f"{CACHE_KEY_PREFIX}:generation"
+COUNT_FIELDS = ['total'] + [status.lower() for status in REQUEST_STATUSES]
+
+
+def _cache_key(generation, field):
+    return f"{CACHE_KEY_PREFIX}:{generation}:{field}"
+
+
+def _current_generation():
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        # Start from the clock so a lost generation key never reuses old snapshot keys
+        cache.add(GENERATION_KEY, time.time_ns(), timeout=None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+def _next_generation():
+    try:
+        return cache.incr(GENERATION_KEY)
+    except ValueError:
+        return _current_generation()
+
+
+def get_global_status_counts():
+    """Get the global per-status counts, filling the cache when it is cold"""
+    generation = _current_generation()
+    keys = {_cache_key(generation, field): field for field in COUNT_FIELDS}
+    cached = cache.get_many(keys)
+    if len(cached) == len(keys):
+        return {keys[key]: value for key, value in cached.items()}
+
+    generation = _next_generation()
+    counts = RequestManager.get_status_counts()
+    cache.set_many(
+        {_cache_key(generation, field): value for field, value in counts.items()},
+        timeout=settings.REQUEST_COUNTS_CACHE_TIMEOUT
+    )
+    return counts
+
+
+def invalidate_global_status_counts():
+    """Retire the cached snapshot so the next read recounts"""
+    _next_generation()
+
+
+def adjust_global_status_counts(old_status, new_status):
+    """
+    Apply one request transition to the cached snapshot. old_status is None
+    for a created request and new_status is None for a deleted one.
+    """
+    adjust_global_status_counts_many([(old_status, new_status)])
+
+
+def adjust_global_status_counts_many(transitions):
+    """Apply many (old_status, new_status) transitions to the cached snapshot"""
+    deltas = Counter()
+    for old_status, new_status in transitions:
+        if old_status is None:
+            deltas['total'] += 1
+        if new_status is None:
+            deltas['total'] -= 1
+        if old_status in REQUEST_STATUSES:
+            deltas[old_status.lower()] -= 1
+        if new_status in REQUEST_STATUSES:
+            deltas[new_status.lower()] += 1
+
+    generation = _current_generation()
+    try:
+        for field, delta in deltas.items():
+            if delta:
+                cache.incr(_cache_key(generation, field), delta)
+    except ValueError:
+        # A key is missing (cold, evicted or being rebuilt); never keep a partial snapshot
+        invalidate_global_status_counts()
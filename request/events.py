@@ -0,0 +1,270 @@
+"""
+Pub/sub of request events for the admin queue's Server-Sent Events stream.
+
+Request saves publish 'created' and 'status' events once their transaction
+commits (request/signals.py). Subscribers are the open SSE connections of
+this process. The backend is chosen with settings.REQUEST_EVENTS_BACKEND:
+
+- InProcessBroker (default) fans events out inside one process, which is
+  enough for a single ASGI worker or local development.
+- PostgresBroker publishes through PostgreSQL NOTIFY and has one LISTEN
+  thread per process feed its local subscribers, so every worker sees
+  events raised by any other. It cannot tell whether anyone is listening,
+  so every request change is published (see PostgresBroker.has_listeners).
+
+Each process numbers the events it receives and keeps the latest few, so a
+reconnecting EventSource (Last-Event-ID) gets what it missed or, if too
+much was missed, a 'resync' event.
+"""
+
+import abc
+import asyncio
+import itertools
+import json
+import logging
+import queue
+import select
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.db import connection
+from django.utils.module_loading import import_string
+
+from accounts.models import Request
+
+logger = logging.getLogger(__name__)
+
+# Events kept for replay to reconnecting clients
+REPLAY_BUFFER_SIZE = 200
+# Events queued for one slow subscriber before it is told to resync
+SUBSCRIBER_QUEUE_SIZE = 500
+
+RESYNC_EVENT = {'type': 'resync'}
+
+
+def serialize_admin_request(req):
+    """Serialize a request row for the admin table's JSON feed and event stream"""
+    return {
+        'id': req.id,
+        'student_name': f"{req.student.first_name} {req.student.last_name}",
+        'document_name': req.document.name,
+        'purpose': req.purpose,
+        'copies': req.copies,
+        'status': req.status,
+        'date_requested': req.date_requested.strftime('%b %d, %Y'),
+    }
+
+
+class Subscription(abc.ABC):
+    """One subscriber's queue of (event_id, event) pairs"""
+
+    def __init__(self, broker):
+        self.broker = broker
+        self.overflowed = False
+
+    @abc.abstractmethod
+    def deliver(self, item):
+        """Queue an (event_id, event) pair; may be called from any thread"""
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class SyncSubscription(Subscription):
+    """Subscription read from a worker thread (WSGI streaming)"""
+
+    def __init__(self, broker):
+        super().__init__(broker)
+        self.queue = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def deliver(self, item):
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            self.overflowed = True
+
+    def get(self, timeout):
+        """Next (event_id, event), or None after timeout seconds"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class AsyncSubscription(Subscription):
+    """Subscription read from the event loop (ASGI streaming)"""
+
+    def __init__(self, broker):
+        super().__init__(broker)
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def _put(self, item):
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    def deliver(self, item):
+        # Publishers run on worker threads; hand the item to the loop
+        self.loop.call_soon_threadsafe(self._put, item)
+
+    async def get(self, timeout):
+        """Next (event_id, event), or None after timeout seconds"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class InProcessBroker:
+    """Fans events out to the subscribers of the current process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._ids = itertools.count(1)
+        self._last_id = 0
+        self._recent = deque(maxlen=REPLAY_BUFFER_SIZE)
+
+    def has_listeners(self):
+        """Whether anyone may receive a published event"""
+        return bool(self._subscribers)
+
+    def publish(self, event):
+        self.dispatch(event)
+
+    def dispatch(self, event):
+        """Number an event and deliver it to local subscribers"""
+        with self._lock:
+            self._last_id = next(self._ids)
+            item = (self._last_id, event)
+            self._recent.append(item)
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.deliver(item)
+
+    def subscribe(self, last_event_id=None, asynchronous=False):
+        """Register a subscriber, first replaying events after last_event_id"""
+        subscription = AsyncSubscription(self) if asynchronous else SyncSubscription(self)
+        with self._lock:
+            if last_event_id is not None:
+                missed = [item for item in self._recent if item[0] > last_event_id]
+                if last_event_id > self._last_id:
+                    # The id came from another process or before a restart
+                    subscription.overflowed = True
+                elif missed and missed[0][0] > last_event_id + 1:
+                    # Part of what was missed has left the buffer
+                    subscription.overflowed = True
+                else:
+                    for item in missed:
+                        subscription.deliver(item)
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+
+class PostgresBroker(InProcessBroker):
+    """
+    Publishes with PostgreSQL NOTIFY; a LISTEN thread started with the first
+    subscriber dispatches notifications to this process's subscribers.
+    """
+
+    CHANNEL = 'request_events'
+
+    def __init__(self):
+        super().__init__()
+        self._listener = None
+
+    def has_listeners(self):
+        """
+        Always True, since subscribers in other processes are invisible from
+        here. Every committed request change therefore costs one SELECT of
+        the request and one pg_notify, even while no admin stream is open.
+        Both run after the commit and touch a single row.
+        """
+        return True
+
+    def publish(self, event):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [self.CHANNEL, json.dumps(event)])
+
+    def subscribe(self, last_event_id=None, asynchronous=False):
+        self._start_listener()
+        return super().subscribe(last_event_id, asynchronous)
+
+    def _start_listener(self):
+        with self._lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(target=self._listen, name='request-events-listener', daemon=True)
+                self._listener.start()
+
+    def _listen(self):
+        import psycopg2
+
+        params = connection.get_connection_params()
+        while True:
+            try:
+                conn = psycopg2.connect(**params)
+                conn.autocommit = True
+                with conn.cursor() as cursor:
+                    cursor.execute(f'LISTEN {self.CHANNEL}')
+                while True:
+                    if select.select([conn], [], [], 5) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        notify = conn.notifies.pop(0)
+                        self.dispatch(json.loads(notify.payload))
+            except Exception:
+                logger.exception('Request event listener failed; reconnecting')
+                # Clients may have missed events while disconnected
+                self.dispatch(RESYNC_EVENT)
+                time.sleep(5)
+
+
+_broker = None
+
+
+def get_broker():
+    """Get the process-wide broker configured by REQUEST_EVENTS_BACKEND"""
+    global _broker
+    if _broker is None:
+        _broker = import_string(settings.REQUEST_EVENTS_BACKEND)()
+    return _broker
+
+
+def publish_request_event(request_id, event_type):
+    """Publish a 'created' or 'status' event for a committed request"""
+    broker = get_broker()
+    if not broker.has_listeners():
+        # Skip the lookup, but let clients reconnecting later know they
+        # missed something
+        broker.publish(RESYNC_EVENT)
+        return
+    try:
+        req = Request.objects.select_related('student', 'document').get(pk=request_id)
+    except Request.DoesNotExist:
+        return
+    broker.publish({'type': event_type, 'request': serialize_admin_request(req)})
+
+
+def publish_request_events(request_ids, event_type):
+    """Publish events for many committed requests, loaded with one query"""
+    broker = get_broker()
+    if not broker.has_listeners():
+        broker.publish(RESYNC_EVENT)
+        return
+    for req in Request.objects.filter(pk__in=request_ids).select_related('student', 'document').order_by('pk'):
+        broker.publish({'type': event_type, 'request': serialize_admin_request(req)})
+
+
+def format_sse(event_id, event):
+    """Encode one event in the text/event-stream format"""
+    id_line = f"id: {event_id}\n" if event_id is not None else ''
+    return f"{id_line}event: {event['type']}\ndata: {json.dumps(event)}\n\n"
@@ -68,6 +68,7 @@ class RequestFilterForm(forms.Form):
         ('Approved', 'Approved'),
         ('Completed', 'Completed'),
         ('Cancelled', 'Cancelled'),
+        ('Rejected', 'Rejected'),
     ]
     
     SORT_CHOICES = [
@@ -203,4 +204,42 @@ class BulkRequestForm(forms.Form):
         purpose = self.cleaned_data.get('purpose')
         if purpose and len(purpose.strip()) < 15:
             raise forms.ValidationError("Purpose for bulk requests must be at least 15 characters long.")
-        return purpose.strip() if purpose else purpose
\ No newline at end of file
+        return purpose.strip() if purpose else purpose
+
+class RequestIdsField(forms.Field):
+    """Multiple request ids submitted as repeated values"""
+    
+    widget = forms.MultipleHiddenInput
+    
+    def to_python(self, value):
+        try:
+            return sorted({int(request_id) for request_id in value or []})
+        except (TypeError, ValueError):
+            raise forms.ValidationError("Invalid request id.")
+
+
+class BulkStatusForm(forms.Form):
+    """Form for moving many requests to one status"""
+    
+    MAX_REQUESTS = 1000
+    STATUS_CHOICES = [
+        ('Approved', 'Approve'),
+        ('Rejected', 'Reject'),
+        ('Completed', 'Mark Completed'),
+        ('Pending', 'Return to Pending'),
+    ]
+    
+    status = forms.ChoiceField(
+        choices=STATUS_CHOICES,
+        widget=forms.Select(attrs={'class': 'form-select', 'id': 'bulkStatusSelect'})
+    )
+    
+    request_ids = RequestIdsField(required=False)
+    
+    def clean_request_ids(self):
+        request_ids = self.cleaned_data.get('request_ids')
+        if not request_ids:
+            raise forms.ValidationError("Please select at least one request.")
+        if len(request_ids) > self.MAX_REQUESTS:
+            raise forms.ValidationError(f"Maximum of {self.MAX_REQUESTS} requests per action.")
+        return request_ids
@@ -0,0 +1,35 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from accounts.models import Request
+from request.pdfs import DOCUMENTS, prerender_request_pdfs
+
+
+class Command(BaseCommand):
+    help = 'Render the PDF pickup slips (or completion receipts) that are not cached yet, e.g. after a batch of approvals'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kind', choices=sorted(DOCUMENTS), default='pickup_slip', help='Document to render (default: pickup_slip)')
+        parser.add_argument('--since-hours', type=int, default=None, help="Only requests whose status changed within this many hours (default: all in the document's status)")
+        parser.add_argument('--chunk-size', type=int, default=200, help='Requests loaded per batch (default: 200)')
+
+    def handle(self, *args, **options):
+        kind = options['kind']
+        status = DOCUMENTS[kind][0]
+        queryset = Request.objects.all()
+        if options['since_hours'] is not None:
+            since = timezone.now() - timedelta(hours=options['since_hours'])
+            queryset = queryset.filter(
+                status_history__new_status=status, status_history__changed_at__gte=since
+            ).distinct()
+
+        started = time.monotonic()
+        stats = prerender_request_pdfs(queryset, kind, chunk_size=options['chunk_size'])
+        elapsed = time.monotonic() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rendered {stats['rendered']} {kind.replace('_', ' ')}(s), {stats['cached']} already cached, "
+            f"in {elapsed:.2f}s."
+        ))
@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from request.uploads import purge_stale_uploads
+
+
+class Command(BaseCommand):
+    help = 'Discard chunked attachment uploads that were abandoned before completion'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours',
+            type=int,
+            default=settings.ATTACHMENT_UPLOAD_EXPIRY_HOURS,
+            help=f'Discard uploads not written to for this many hours (default: {settings.ATTACHMENT_UPLOAD_EXPIRY_HOURS})',
+        )
+
+    def handle(self, *args, **options):
+        purged = purge_stale_uploads(max_age_hours=options['hours'])
+        self.stdout.write(self.style.SUCCESS(f"Discarded {purged} stale upload(s)."))
@@ -0,0 +1,80 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from accounts.models import Request, StudentAccount
+from request.models import REQUEST_STATUSES, StudentRequestCounters
+
+
+class Command(BaseCommand):
+    help = 'Rebuild (or verify with --verify) the denormalized per-student request counters from the Request table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Only report students whose counters do not match; do not write anything',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of counter rows written per query (default: 1000)',
+        )
+
+    def handle(self, *args, **options):
+        per_status = {
+            status.lower(): Count('id', filter=Q(status=status))
+            for status in REQUEST_STATUSES
+        }
+        # One grouped query for the whole table instead of one per student
+        actual = {
+            row.pop('student_id'): row
+            for row in Request.objects.order_by().values('student_id').annotate(total=Count('id'), **per_status)
+        }
+        zero = dict.fromkeys(StudentRequestCounters.COUNT_FIELDS, 0)
+
+        if options['verify']:
+            self.verify(actual, zero)
+        else:
+            self.rebuild(actual, zero, options['batch_size'])
+
+    def verify(self, actual, zero):
+        stored = {
+            counters.student_id: counters.as_dict()
+            for counters in StudentRequestCounters.objects.iterator()
+        }
+        mismatched = 0
+        for student_id in StudentAccount.objects.values_list('id', flat=True).iterator():
+            expected = actual.get(student_id, zero)
+            current = stored.get(student_id)
+            # A missing row is fine when there is nothing to count yet
+            if current is None and expected == zero:
+                continue
+            if current != expected:
+                mismatched += 1
+                self.stdout.write(self.style.WARNING(
+                    f"Student {student_id}: stored {current}, expected {expected}"
+                ))
+
+        if mismatched:
+            self.stdout.write(self.style.ERROR(f"{mismatched} student(s) have out-of-date counters."))
+        else:
+            self.stdout.write(self.style.SUCCESS("All request counters are up to date."))
+
+    def rebuild(self, actual, zero, batch_size):
+        # Bump updated_at as well so the students' page ETags stop matching
+        now = timezone.now()
+        rows = [
+            StudentRequestCounters(student_id=student_id, updated_at=now, **actual.get(student_id, zero))
+            for student_id in StudentAccount.objects.values_list('id', flat=True).iterator()
+        ]
+        with transaction.atomic():
+            StudentRequestCounters.objects.bulk_create(
+                rows,
+                batch_size=batch_size,
+                update_conflicts=True,
+                unique_fields=['student'],
+                update_fields=StudentRequestCounters.COUNT_FIELDS + ['updated_at'],
+            )
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt request counters for {len(rows)} student(s)."))
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+from request.utils import send_overdue_reminders
+
+
+class Command(BaseCommand):
+    help = 'Send pickup reminders for overdue approved requests in batches (reruns skip recently reminded requests)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=14, help='Days after which an approved request is overdue (default: 14)')
+        parser.add_argument('--interval-days', type=int, default=7, help='Minimum days between reminders for the same request (default: 7)')
+        parser.add_argument('--chunk-size', type=int, default=500, help='Requests processed per batch (default: 500)')
+        parser.add_argument('--dry-run', action='store_true', help='Count the reminders that would be sent without sending them')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        stats = send_overdue_reminders(
+            days_threshold=options['days'],
+            interval_days=options['interval_days'],
+            chunk_size=options['chunk_size'],
+            dry_run=options['dry_run'],
+        )
+        elapsed = time.monotonic() - started
+        rate = stats['sent'] / elapsed if elapsed > 0 else 0
+
+        verb = 'Would send' if options['dry_run'] else 'Sent'
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {stats['sent']} reminder(s) in {stats['chunks']} chunk(s) "
+            f"in {elapsed:.2f}s ({rate:.0f} reminders/s)."
+        ))
@@ -0,0 +1,52 @@
+import time
+
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+from request.outbox import (
+    DEFAULT_BACKOFF_SECONDS,
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_MAX_ATTEMPTS,
+    deliver_queued_emails,
+)
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued outbox emails in batches over one reused connection, retrying failures with backoff'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help=f'Emails claimed per batch (default: {DEFAULT_BATCH_SIZE})')
+        parser.add_argument('--max-attempts', type=int, default=DEFAULT_MAX_ATTEMPTS, help=f'Attempts before an email is marked Failed (default: {DEFAULT_MAX_ATTEMPTS})')
+        parser.add_argument('--backoff', type=int, default=DEFAULT_BACKOFF_SECONDS, help=f'Base retry delay in seconds, doubled per attempt (default: {DEFAULT_BACKOFF_SECONDS})')
+        parser.add_argument('--loop', action='store_true', help='Keep polling for new emails instead of exiting once the queue is drained')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds to sleep between polls in --loop mode (default: 5)')
+
+    def handle(self, *args, **options):
+        totals = {'sent': 0, 'retried': 0, 'failed': 0}
+        # One connection per busy stretch, reopened after a failed send
+        connection = get_connection()
+        try:
+            while True:
+                stats = deliver_queued_emails(
+                    connection=connection,
+                    batch_size=options['batch_size'],
+                    max_attempts=options['max_attempts'],
+                    backoff_seconds=options['backoff'],
+                )
+                for key, value in stats.items():
+                    totals[key] += value
+                if any(stats.values()):
+                    self.stdout.write(f"Batch: sent {stats['sent']}, retrying {stats['retried']}, failed {stats['failed']}")
+                    continue
+                if not options['loop']:
+                    break
+                # Do not hold the connection open while idle; the server may drop it
+                connection.close()
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            connection.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Done. Sent: {totals['sent']}, Retrying: {totals['retried']}, Failed: {totals['failed']}"
+        ))
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.6 on 2026-10-17 15:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_alter_studentaccount_profile_picture'),
+        ('request', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentRequestCounters',
+            fields=[
+                ('student', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='request_counters', serialize=False, to='accounts.studentaccount')),
+                ('pending', models.PositiveIntegerField(default=0)),
+                ('approved', models.PositiveIntegerField(default=0)),
+                ('completed', models.PositiveIntegerField(default=0)),
+                ('cancelled', models.PositiveIntegerField(default=0)),
+                ('rejected', models.PositiveIntegerField(default=0)),
+                ('total', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'Student Request Counters',
+            },
+        ),
+    ]
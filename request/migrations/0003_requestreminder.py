@@ -0,0 +1,22 @@
+# Generated by Django 5.2.6 on 2026-10-17 16:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_request_notification_indexes'),
+        ('request', '0002_studentrequestcounters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestReminder',
+            fields=[
+                ('request', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='reminder', serialize=False, to='accounts.request')),
+                ('last_sent_at', models.DateTimeField()),
+            ],
+        ),
+    ]
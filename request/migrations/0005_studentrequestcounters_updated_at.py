@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-17 16:13
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('request', '0004_outboundemail'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentrequestcounters',
+            name='updated_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -1,7 +1,12 @@
+from asgiref.sync import sync_to_async
 from django.db import models
+from django.db.models import Case, Count, F, IntegerField, Q, Value, When
+from django.db.models.functions import Greatest
 from django.utils import timezone
 from accounts.models import Request, StudentAccount
+from collections import Counter, defaultdict
 from datetime import datetime, timedelta
+import uuid
 
 
 class RequestStatusHistory(models.Model):
@@ -36,6 +41,187 @@ class RequestComment(models.Model):
         return f"Comment on Request #{self.request.id} by {self.author}"
 
 
+class RequestReminder(models.Model):
+    """Last overdue-pickup reminder sent for a request, so reruns skip it"""
+    request = models.OneToOneField(
+        Request,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='reminder'
+    )
+    last_sent_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Reminder for Request #{self.request_id} sent {self.last_sent_at}"
+
+
+class OutboundEmail(models.Model):
+    """
+    Email waiting to be delivered by the send_queued_emails worker. Rows are
+    written in the same transaction as the change they announce, so request
+    handling never waits on SMTP.
+    """
+    STATUS_CHOICES = [
+        ('Pending', 'Pending'),
+        ('Sent', 'Sent'),
+        ('Failed', 'Failed'),
+    ]
+
+    to_email = models.EmailField(max_length=254)
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outboundemail_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"Email to {self.to_email}: {self.subject} ({self.status})"
+
+
+class AttachmentUpload(models.Model):
+    """
+    A chunked attachment upload in progress. Chunks are appended to a
+    partial file at offset; once offset reaches size and the SHA-256
+    matches, request/uploads.py turns it into an Attachment.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    request = models.ForeignKey(Request, on_delete=models.CASCADE, related_name='attachment_uploads')
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    checksum = models.CharField(max_length=64)  # SHA-256 hex of the whole file
+    offset = models.PositiveBigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Upload of {self.filename} for Request #{self.request_id} ({self.offset}/{self.size})"
+
+
+# Statuses a request can move through, used for per-status aggregation
+REQUEST_STATUSES = ['Pending', 'Approved', 'Completed', 'Cancelled', 'Rejected']
+
+
+class StudentRequestCounters(models.Model):
+    """
+    Denormalized per-student request counts, kept in step with Request
+    saves by the handlers in request/signals.py. Reading a student's counts
+    is a primary key lookup instead of a scan over their request history.
+    """
+    student = models.OneToOneField(
+        StudentAccount,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='request_counters'
+    )
+    pending = models.PositiveIntegerField(default=0)
+    approved = models.PositiveIntegerField(default=0)
+    completed = models.PositiveIntegerField(default=0)
+    cancelled = models.PositiveIntegerField(default=0)
+    rejected = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+    # Last change to the student's requests or profile; versions their page ETags
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    COUNT_FIELDS = ['total'] + [status.lower() for status in REQUEST_STATUSES]
+
+    class Meta:
+        verbose_name_plural = "Student Request Counters"
+
+    def __str__(self):
+        return f"Request counters for {self.student_id}"
+
+    def as_dict(self):
+        """Return the counts keyed like RequestManager.get_status_counts"""
+        return {field: getattr(self, field) for field in self.COUNT_FIELDS}
+
+    @classmethod
+    def rebuild(cls, student_id):
+        """Recompute a student's counters from the Request table"""
+        counts = RequestManager.get_status_counts(student_id)
+        counters, _ = cls.objects.update_or_create(
+            student_id=student_id,
+            defaults={**counts, 'updated_at': timezone.now()}
+        )
+        return counters
+
+    @classmethod
+    def touch(cls, student_id):
+        """Mark a student's data as changed without touching the counts"""
+        cls.objects.filter(student_id=student_id).update(updated_at=timezone.now())
+
+    @classmethod
+    def apply_transition(cls, student_id, old_status, new_status):
+        """
+        Move one request between status buckets. old_status is None for a
+        newly created request and new_status is None for a deleted one.
+        A missing counters row is rebuilt from scratch instead.
+        """
+        changes = {}
+        if old_status is None:
+            changes['total'] = F('total') + 1
+        if new_status is None:
+            changes['total'] = Greatest(F('total') - 1, 0)
+        if old_status in REQUEST_STATUSES:
+            # Clamp at zero so a stale instance cannot break the save
+            changes[old_status.lower()] = Greatest(F(old_status.lower()) - 1, 0)
+        if new_status in REQUEST_STATUSES:
+            changes[new_status.lower()] = F(new_status.lower()) + 1
+        if not changes:
+            return
+
+        changes['updated_at'] = timezone.now()
+        updated = cls.objects.filter(student_id=student_id).update(**changes)
+        # Deleted requests never create a row: the student may be going away too
+        if not updated and new_status is not None:
+            cls.rebuild(student_id)
+
+    @classmethod
+    def apply_transitions(cls, transitions, batch_size=200):
+        """
+        Apply many (student_id, old_status, new_status) status changes, as
+        made by bulk updates that send no signals, with one UPDATE per
+        batch_size students. Students without a counters row are rebuilt.
+        """
+        deltas = defaultdict(Counter)
+        for student_id, old_status, new_status in transitions:
+            if old_status is None:
+                deltas[student_id]['total'] += 1
+            if new_status is None:
+                deltas[student_id]['total'] -= 1
+            if old_status in REQUEST_STATUSES:
+                deltas[student_id][old_status.lower()] -= 1
+            if new_status in REQUEST_STATUSES:
+                deltas[student_id][new_status.lower()] += 1
+
+        student_ids = list(deltas)
+        now = timezone.now()
+        for start in range(0, len(student_ids), batch_size):
+            batch = student_ids[start:start + batch_size]
+            changes = {'updated_at': now}
+            for field in cls.COUNT_FIELDS:
+                whens = [
+                    When(student_id=student_id, then=Value(deltas[student_id][field]))
+                    for student_id in batch if deltas[student_id][field]
+                ]
+                if whens:
+                    delta = Case(*whens, default=Value(0), output_field=IntegerField())
+                    changes[field] = Greatest(F(field) + delta, 0)
+
+            existing = set(cls.objects.filter(student_id__in=batch).values_list('student_id', flat=True))
+            cls.objects.filter(student_id__in=existing).update(**changes)
+            for student_id in batch:
+                if student_id not in existing:
+                    cls.rebuild(student_id)
+
+
 # Utility functions for request management
 class RequestManager:
     """Utility class for managing requests"""
@@ -43,32 +229,57 @@ class RequestManager:
     @staticmethod
     def get_pending_requests_for_student(student):
         """Get all pending requests for a student"""
-        return Request.objects.filter(student=student, status='Pending').order_by('-date_requested')
+        return Request.objects.filter(student=student, status='Pending').select_related('document').order_by('-date_requested')
     
     @staticmethod
     def get_approved_requests_for_student(student):
         """Get all approved requests for a student"""
-        return Request.objects.filter(student=student, status='Approved').order_by('-date_requested')
+        return Request.objects.filter(student=student, status='Approved').select_related('document').order_by('-date_requested')
     
     @staticmethod
     def get_completed_requests_for_student(student):
         """Get all completed requests for a student"""
-        return Request.objects.filter(student=student, status='Completed').order_by('-date_requested')
+        return Request.objects.filter(student=student, status='Completed').select_related('document').order_by('-date_requested')
     
+    @staticmethod
+    def get_status_counts(student=None):
+        """
+        Get the total and per-status request counts in a single query.
+        Counts are global unless a student is given. Keys are the lowercased
+        status names plus 'total'.
+        """
+        queryset = Request.objects.all()
+        if student is not None:
+            queryset = queryset.filter(student=student)
+
+        per_status = {
+            status.lower(): Count('id', filter=Q(status=status))
+            for status in REQUEST_STATUSES
+        }
+        return queryset.aggregate(total=Count('id'), **per_status)
+
+    @staticmethod
+    def get_student_counts(student):
+        """Get a student's per-status counts from their counters row"""
+        try:
+            counters = StudentRequestCounters.objects.get(student=student)
+        except StudentRequestCounters.DoesNotExist:
+            counters = StudentRequestCounters.rebuild(student.pk)
+        return counters.as_dict()
+
+    @staticmethod
+    async def aget_student_counts(student):
+        """Async variant of get_student_counts for the ASGI views"""
+        try:
+            counters = await StudentRequestCounters.objects.aget(student=student)
+        except StudentRequestCounters.DoesNotExist:
+            counters = await sync_to_async(StudentRequestCounters.rebuild)(student.pk)
+        return counters.as_dict()
+
     @staticmethod
     def get_request_statistics(student):
         """Get statistics for a student's requests"""
-        total_requests = Request.objects.filter(student=student).count()
-        pending_count = Request.objects.filter(student=student, status='Pending').count()
-        approved_count = Request.objects.filter(student=student, status='Approved').count()
-        completed_count = Request.objects.filter(student=student, status='Completed').count()
-        
-        return {
-            'total': total_requests,
-            'pending': pending_count,
-            'approved': approved_count,
-            'completed': completed_count,
-        }
+        return RequestManager.get_student_counts(student)
     
     @staticmethod
     def calculate_processing_time(request):
@@ -85,4 +296,4 @@ class RequestManager:
         return Request.objects.filter(
             status='Approved',
             date_requested__lt=threshold_date
-        )
+        ).select_related('student', 'document')
@@ -0,0 +1,126 @@
+"""
+Database-backed outbox for outgoing email.
+
+Views call enqueue_email() inside their transaction; the send_queued_emails
+management command drains due rows in batches over one SMTP connection and
+retries failures with exponential backoff.
+
+Delivery is at least once: each email is marked Sent right after the server
+accepts it, so a worker that dies between the two sends that email again
+once its lease runs out.
+"""
+
+import logging
+import smtplib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_BACKOFF_SECONDS = 60
+# How long a claimed batch is hidden from other workers while it is sent
+CLAIM_LEASE_SECONDS = 300
+
+
+def enqueue_email(to_email, subject, body):
+    """Queue an email for delivery by the outbox worker"""
+    return OutboundEmail.objects.create(to_email=to_email, subject=subject, body=body)
+
+
+def enqueue_emails(messages):
+    """Queue many (to_email, subject, body) emails with one insert"""
+    return OutboundEmail.objects.bulk_create([
+        OutboundEmail(to_email=to_email, subject=subject, body=body)
+        for to_email, subject, body in messages
+    ])
+
+
+def claim_due_emails(batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Claim up to batch_size due emails. Claimed rows are leased by pushing
+    next_attempt_at forward, so parallel workers skip them and a crashed
+    worker's batch becomes due again once the lease runs out.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        emails = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True)
+            .filter(status='Pending', next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        OutboundEmail.objects.filter(id__in=[email.id for email in emails]).update(
+            next_attempt_at=now + timedelta(seconds=CLAIM_LEASE_SECONDS)
+        )
+    return emails
+
+
+def send_message(message, connection):
+    """
+    Send a message, reconnecting once if the server had dropped the
+    connection (for example an idle timeout between batches).
+    """
+    try:
+        message.send()
+    except smtplib.SMTPServerDisconnected:
+        connection.close()
+        connection.open()
+        message.send()
+
+
+def deliver_queued_emails(connection=None, batch_size=DEFAULT_BATCH_SIZE,
+                          max_attempts=DEFAULT_MAX_ATTEMPTS, backoff_seconds=DEFAULT_BACKOFF_SECONDS):
+    """
+    Send one batch of due emails over a single connection. Each email is
+    marked Sent as soon as it is accepted. Failed emails are retried after
+    backoff_seconds * 2 ** (attempts - 1) and marked Failed after
+    max_attempts; a dropped connection is reopened without counting an
+    attempt. Returns a dict of sent/retried/failed counts.
+    """
+    emails = claim_due_emails(batch_size)
+    stats = {'sent': 0, 'retried': 0, 'failed': 0}
+    if not emails:
+        return stats
+
+    connection = connection or get_connection()
+    try:
+        # Open once so every message in the batch reuses the connection
+        connection.open()
+    except Exception as e:
+        # Each send below retries the connection and records the error
+        logger.warning(f"Could not open email connection: {e}")
+
+    for email in emails:
+        message = EmailMessage(
+            email.subject,
+            email.body,
+            settings.DEFAULT_FROM_EMAIL,
+            [email.to_email],
+            connection=connection,
+        )
+        try:
+            send_message(message, connection)
+        except Exception as e:
+            # Drop a possibly broken connection; the next send reconnects
+            connection.close()
+            email.attempts += 1
+            email.last_error = str(e)
+            if email.attempts >= max_attempts:
+                email.status = 'Failed'
+                stats['failed'] += 1
+                logger.error(f"Giving up on email #{email.id} to {email.to_email}: {e}")
+            else:
+                email.next_attempt_at = timezone.now() + timedelta(seconds=backoff_seconds * 2 ** (email.attempts - 1))
+                stats['retried'] += 1
+            email.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at'])
+        else:
+            # Record each delivery at once so a crash later in the batch does not resend it
+            OutboundEmail.objects.filter(id=email.id).update(status='Sent', sent_at=timezone.now(), last_error='')
+            stats['sent'] += 1
+    return stats
@@ -0,0 +1,370 @@
+"""
+PDF pickup slips and completion receipts, cached on disk.
+
+The text of each document comes from rendering its page,
+Request/pickup_slip.html or Request/completion_receipt.html, and reading the
+title, detail rows, sections and footer out of the HTML, so the page is the
+one source of what is printed. The SHA-256 of that text (with the request's
+status and LAYOUT_VERSION) names the cached file:
+
+    MEDIA_ROOT/request_pdfs/<request id>/<kind>-<sha256>.pdf
+
+so a download only renders when something printed on the document has
+changed; otherwise the file on disk is streamed. Older versions are removed
+when a new one is written, and a request's files are discarded when the
+request is saved or deleted (see request/signals.py).
+
+The PDF is written by the small writer below using the standard Helvetica
+fonts every PDF reader has built in, so no extra library or outside service
+is needed.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import zlib
+from html.parser import HTMLParser
+from pathlib import Path
+
+from django.conf import settings
+from django.template.loader import render_to_string
+from django.utils import dateformat, timezone
+
+PDF_DIR = 'request_pdfs'
+# Bump when the layout changes so every cached file is rendered again
+LAYOUT_VERSION = 1
+
+PAGE_WIDTH = 612   # US Letter, in points
+PAGE_HEIGHT = 792
+MARGIN = 72
+
+# Helvetica advance widths (1/1000 em) for printable ASCII, from its AFM metrics
+HELVETICA_WIDTHS = dict(zip(
+    ' !"#$%&\'()*+,-./0123456789:;<=>?@ABCDEFGHIJKLMNOPQRSTUVWXYZ[\\]^_`abcdefghijklmnopqrstuvwxyz{|}~',
+    [278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+     556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+     1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+     667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+     333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+     556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584],
+))
+# Helvetica-Bold runs about 6% wider; close enough for wrapping
+BOLD_WIDTH_FACTOR = 1.06
+
+DATE_FORMAT = 'F d, Y'
+DATETIME_FORMAT = 'F d, Y \\a\\t g:i A'
+
+GREEN = (0.157, 0.655, 0.271)
+GREY = (0.4, 0.4, 0.4)
+
+# Page characters the built-in PDF fonts cannot encode
+PDF_TEXT_REPLACEMENTS = {'\u20b1': 'PHP ', '\u2713': ''}
+
+
+def text_width(text, size, bold=False):
+    """Width of text in points when set in Helvetica"""
+    units = sum(HELVETICA_WIDTHS.get(char, 556) for char in text)
+    return units * size / 1000 * (BOLD_WIDTH_FACTOR if bold else 1)
+
+
+def wrap_text(text, size, max_width, bold=False):
+    """Split text into lines that fit max_width, breaking at spaces"""
+    lines = []
+    for paragraph in str(text).splitlines() or ['']:
+        line = ''
+        for word in paragraph.split():
+            candidate = f"{line} {word}" if line else word
+            if line and text_width(candidate, size, bold) > max_width:
+                lines.append(line)
+                line = word
+            else:
+                line = candidate
+        lines.append(line)
+    return lines
+
+
+def _pdf_string(text):
+    """A PDF literal string in WinAnsiEncoding"""
+    data = str(text).encode('cp1252', errors='replace')
+    return b'(' + data.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)') + b')'
+
+
+class PdfPage:
+    """Drawing commands for a single-page PDF set in Helvetica"""
+
+    def __init__(self, title=''):
+        self.title = title
+        self._ops = []
+
+    def text(self, x, y, text, size=11, bold=False, color=None):
+        font = b'/F2' if bold else b'/F1'
+        fill = b'%.3f %.3f %.3f rg ' % (color or (0, 0, 0))
+        self._ops.append(
+            fill + b'BT ' + font + b' %.1f Tf %.2f %.2f Td ' % (size, x, y) + _pdf_string(text) + b' Tj ET'
+        )
+
+    def centered(self, y, text, size=11, bold=False, color=None):
+        self.text((PAGE_WIDTH - text_width(text, size, bold)) / 2, y, text, size, bold, color)
+
+    def line(self, x1, y1, x2, y2, width=0.75):
+        self._ops.append(b'%.2f w %.2f %.2f m %.2f %.2f l S' % (width, x1, y1, x2, y2))
+
+    def render(self):
+        """The finished PDF file as bytes"""
+        content = zlib.compress(b'\n'.join(self._ops))
+        objects = [
+            b'<< /Type /Catalog /Pages 2 0 R >>',
+            b'<< /Type /Pages /Kids [3 0 R] /Count 1 >>',
+            b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] '
+            b'/Resources << /Font << /F1 4 0 R /F2 5 0 R >> >> /Contents 6 0 R >>' % (PAGE_WIDTH, PAGE_HEIGHT),
+            b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>',
+            b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>',
+            b'<< /Length %d /Filter /FlateDecode >>\nstream\n' % len(content) + content + b'\nendstream',
+            b'<< /Title ' + _pdf_string(self.title) + b' /Producer (WildDocs) >>',
+        ]
+        out = bytearray(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(len(out))
+            out += b'%d 0 obj\n' % number + body + b'\nendobj\n'
+        xref = len(out)
+        out += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+        for offset in offsets:
+            out += b'%010d 00000 n \n' % offset
+        out += b'trailer\n<< /Size %d /Root 1 0 R /Info 7 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref)
+        return bytes(out)
+
+
+def _format_date(value, fmt=DATE_FORMAT):
+    return dateformat.format(timezone.localtime(value), fmt) if value else 'Not recorded'
+
+
+def _status_changed_at(req, status):
+    """When the request last moved to status, from its history (prefetch-friendly)"""
+    times = [entry.changed_at for entry in req.status_history.all() if entry.new_status == status]
+    return max(times) if times else None
+
+
+def pickup_slip_context(req):
+    """Template context of a request's pickup slip, without the render time"""
+    return {
+        'request': req,
+        'student': req.student,
+        'approved_date': _status_changed_at(req, 'Approved') or req.date_requested,
+    }
+
+
+def completion_receipt_context(req):
+    """Template context of a request's completion receipt, without the render time"""
+    completed_at = _status_changed_at(req, 'Completed')
+    return {
+        'request': req,
+        'student': req.student,
+        'completed_date': completed_at,
+        'processing_days': (completed_at - req.date_requested).days if completed_at else None,
+    }
+
+
+# kind: (status the request must have, page template, context builder, download file name prefix)
+DOCUMENTS = {
+    'pickup_slip': ('Approved', 'Request/pickup_slip.html', pickup_slip_context, 'pickup-slip'),
+    'completion_receipt': ('Completed', 'Request/completion_receipt.html', completion_receipt_context, 'completion-receipt'),
+}
+
+
+class PageTextParser(HTMLParser):
+    """Read the printed text of a slip or receipt page, by the role of each element"""
+
+    VOID_TAGS = {'br', 'hr', 'img', 'input', 'link', 'meta'}
+
+    def __init__(self):
+        super().__init__()
+        self.data = {'title': '', 'badge': None, 'rows': [], 'sections': [], 'footer': []}
+        self._stack = []
+        self._text = []
+        self._label = None
+
+    def _role(self, tag, classes):
+        if tag in ('head', 'script', 'style') or 'no-print' in classes:
+            return 'skip'
+        if tag == 'h1':
+            return 'title'
+        if tag == 'h3':
+            return 'heading'
+        for role in ('success-badge', 'detail-label', 'detail-value'):
+            if role in classes:
+                return role
+        if tag in ('li', 'p'):
+            if any('footer' in ancestor_classes for _, _, ancestor_classes in self._stack):
+                return 'footer'
+            if self.data['sections']:
+                return 'item'
+        return None
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.VOID_TAGS:
+            return
+        classes = (dict(attrs).get('class') or '').split()
+        role = None if self._skipping() else self._role(tag, classes)
+        if role and role != 'skip':
+            self._text = []
+        self._stack.append((tag, role, classes))
+
+    def handle_endtag(self, tag):
+        while self._stack:
+            open_tag, role, _ = self._stack.pop()
+            if role and role != 'skip':
+                self._finish(role, page_text(''.join(self._text)))
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if not self._skipping():
+            self._text.append(data)
+
+    def _skipping(self):
+        return any(role == 'skip' for _, role, _ in self._stack)
+
+    def _finish(self, role, text):
+        if role == 'title':
+            self.data['title'] = text
+        elif role == 'success-badge':
+            self.data['badge'] = text
+        elif role == 'detail-label':
+            self._label = text
+        elif role == 'detail-value':
+            self.data['rows'].append([self._label, text])
+        elif role == 'heading':
+            self.data['sections'].append([text, []])
+        elif role == 'item':
+            self.data['sections'][-1][1].append(text)
+        elif role == 'footer':
+            self.data['footer'].append(text)
+
+
+def page_text(text):
+    """Text of an element as the PDF prints it, on one line"""
+    for char, replacement in PDF_TEXT_REPLACEMENTS.items():
+        text = text.replace(char, replacement)
+    return ' '.join(text.split())
+
+
+def document_data(req, kind):
+    """Render the document's page and read what the PDF prints from it"""
+    _, template_name, build_context, _ = DOCUMENTS[kind]
+    parser = PageTextParser()
+    parser.feed(render_to_string(template_name, build_context(req)))
+    parser.close()
+    return parser.data
+
+
+def render_pdf(req, data, generated_at):
+    """Lay out a document's fields on one page"""
+    page = PdfPage(f"{data['title']} - Request #{req.id}")
+    y = PAGE_HEIGHT - MARGIN
+    page.centered(y, data['title'], size=17, bold=True)
+    y -= 24
+    if data['badge']:
+        page.centered(y, data['badge'], size=12, bold=True, color=GREEN)
+        y -= 20
+    page.centered(y, f"Request #{req.id}", size=12)
+    y -= 14
+    page.line(MARGIN, y, PAGE_WIDTH - MARGIN, y, width=1.5)
+    y -= 28
+
+    value_x = MARGIN + 130
+    for label, value in data['rows']:
+        page.text(MARGIN, y, label, bold=True)
+        for line in wrap_text(value, 11, PAGE_WIDTH - MARGIN - value_x):
+            page.text(value_x, y, line)
+            y -= 15
+        y -= 5
+        page.line(MARGIN, y + 12, PAGE_WIDTH - MARGIN, y + 12, width=0.25)
+
+    for heading, items in data['sections']:
+        y -= 16
+        page.text(MARGIN, y, heading, size=12, bold=True)
+        y -= 18
+        for item in items:
+            for index, line in enumerate(wrap_text(item, 10.5, PAGE_WIDTH - 2 * MARGIN - 14)):
+                if index == 0:
+                    page.text(MARGIN, y, '-', size=10.5)
+                page.text(MARGIN + 14, y, line, size=10.5)
+                y -= 14
+            y -= 2
+
+    y -= 20
+    page.line(MARGIN, y, PAGE_WIDTH - MARGIN, y)
+    for line in data['footer'] + [f"Generated on {_format_date(generated_at, DATETIME_FORMAT)}"]:
+        y -= 15
+        page.centered(y, line, size=9, color=GREY)
+    return page.render()
+
+
+def pdf_dir(request_id):
+    """Directory holding a request's cached documents"""
+    return Path(settings.MEDIA_ROOT) / PDF_DIR / str(request_id)
+
+
+def document_key(req, kind, data):
+    """SHA-256 of everything printed on a document"""
+    payload = json.dumps(
+        {'kind': kind, 'layout': LAYOUT_VERSION, 'status': req.status, 'data': data}, sort_keys=True
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def get_request_pdf(req, kind):
+    """
+    Path of the current PDF of kind for req, rendering it first when the
+    cache has no file for what it would print now. Returns (path, rendered).
+    req should come with student, document and status_history loaded.
+    """
+    data = document_data(req, kind)
+    directory = pdf_dir(req.id)
+    path = directory / f"{kind}-{document_key(req, kind, data)}.pdf"
+    if path.exists():
+        return path, False
+
+    directory.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(render_pdf(req, data, timezone.now()))
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    # Earlier versions of this document are stale now
+    for old in directory.glob(f"{kind}-*.pdf"):
+        if old != path:
+            old.unlink(missing_ok=True)
+    return path, True
+
+
+def discard_request_pdfs(request_ids):
+    """Delete the cached documents of the given requests"""
+    for request_id in request_ids:
+        shutil.rmtree(pdf_dir(request_id), ignore_errors=True)
+
+
+def prerender_request_pdfs(queryset, kind, chunk_size=200):
+    """
+    Make sure every request in queryset has a current PDF of kind. Requests
+    are read chunk_size at a time with their student, document and history
+    loaded. Returns a dict of rendered/cached counts.
+    """
+    status, _, _, _ = DOCUMENTS[kind]
+    stats = {'rendered': 0, 'cached': 0}
+    requests = (
+        queryset.filter(status=status)
+        .select_related('student', 'document')
+        .prefetch_related('status_history')
+        .order_by('pk')
+    )
+    for req in requests.iterator(chunk_size=chunk_size):
+        _, rendered = get_request_pdf(req, kind)
+        stats['rendered' if rendered else 'cached'] += 1
+    return stats
@@ -0,0 +1,98 @@
+"""
+Signal handlers that keep denormalized request data in step with Request saves.
+
+Only saves and deletes that go through the ORM per instance are seen here;
+QuerySet.update() and bulk_update() bypass signals, so code using them must
+adjust StudentRequestCounters (including updated_at) and the cached global
+counts itself.
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from accounts.models import Request, StudentAccount
+from .cache import adjust_global_status_counts, invalidate_global_status_counts
+from .events import publish_request_event
+from .models import RequestStatusHistory, StudentRequestCounters
+from .pdfs import discard_request_pdfs
+
+
+@receiver(post_init, sender=Request)
+def remember_loaded_status(sender, instance, **kwargs):
+    """Remember the student and status a request was loaded with"""
+    # Read __dict__ directly so deferred fields are not fetched here
+    instance._counted_state = (
+        instance.__dict__.get('student_id'),
+        instance.__dict__.get('status'),
+    )
+
+
+@receiver(post_save, sender=Request)
+def update_counters_on_save(sender, instance, created, raw=False, **kwargs):
+    """Apply creations and status changes to the counters and status history"""
+    if raw:
+        return
+
+    old_student_id, old_status = getattr(instance, '_counted_state', (None, None))
+    new_status = instance.status
+    if created:
+        StudentRequestCounters.apply_transition(instance.student_id, None, new_status)
+        transaction.on_commit(lambda: adjust_global_status_counts(None, new_status))
+        transaction.on_commit(lambda: publish_request_event(instance.pk, 'created'))
+    elif old_student_id is None or old_status is None:
+        # Loaded with deferred fields, so the previous state is unknown
+        StudentRequestCounters.rebuild(instance.student_id)
+        transaction.on_commit(invalidate_global_status_counts)
+    else:
+        if old_student_id != instance.student_id:
+            StudentRequestCounters.apply_transition(old_student_id, old_status, None)
+            StudentRequestCounters.apply_transition(instance.student_id, None, new_status)
+        elif old_status != new_status:
+            StudentRequestCounters.apply_transition(instance.student_id, old_status, new_status)
+        else:
+            # Other edits still change what the student's pages show
+            StudentRequestCounters.touch(instance.student_id)
+
+        if old_status != new_status:
+            # Record the transition so analytics can use real timestamps
+            RequestStatusHistory.objects.create(
+                request=instance,
+                old_status=old_status,
+                new_status=new_status,
+                changed_by=getattr(instance, '_status_changed_by', 'System'),
+            )
+            # Adjust the shared snapshot only once the change is committed
+            transaction.on_commit(lambda: adjust_global_status_counts(old_status, new_status))
+            transaction.on_commit(lambda: publish_request_event(instance.pk, 'status'))
+
+    instance._counted_state = (instance.student_id, instance.status)
+
+
+@receiver(post_delete, sender=Request)
+def update_counters_on_delete(sender, instance, **kwargs):
+    """Remove a deleted request from the student's counters"""
+    old_status = instance.status
+    StudentRequestCounters.apply_transition(instance.student_id, old_status, None)
+    transaction.on_commit(lambda: adjust_global_status_counts(old_status, None))
+
+
+@receiver(post_save, sender=StudentAccount)
+def touch_counters_on_profile_save(sender, instance, created, raw=False, **kwargs):
+    """Profile edits change the student's pages too"""
+    if not created and not raw:
+        StudentRequestCounters.touch(instance.pk)
+
+
+@receiver(post_save, sender=Request)
+def discard_pdfs_on_save(sender, instance, created, raw=False, **kwargs):
+    """Cached slips and receipts print the request, so drop them when it changes"""
+    if not created and not raw:
+        request_id = instance.pk
+        transaction.on_commit(lambda: discard_request_pdfs([request_id]))
+
+
+@receiver(post_delete, sender=Request)
+def discard_pdfs_on_delete(sender, instance, **kwargs):
+    """Remove a deleted request's cached slips and receipts"""
+    request_id = instance.pk
+    transaction.on_commit(lambda: discard_request_pdfs([request_id]))
@@ -1,3 +1,846 @@
-from django.test import TestCase
+import contextlib
+import hashlib
+import io
+import os
+import re
+import smtplib
+import tempfile
+import zlib
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DatabaseError, connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import AdminAccount, Attachment, DocumentType, ImageJob, Notification, Request, StudentAccount
+from request import cache as request_cache, events, pdfs
+from request.analytics import get_average_processing_time, get_document_frequency
+from request.cache import get_global_status_counts
+from request.models import AttachmentUpload, OutboundEmail, RequestManager, RequestStatusHistory, StudentRequestCounters
+from request.outbox import deliver_queued_emails, enqueue_email
+from request.uploads import UploadError, complete_upload, partial_path, purge_stale_uploads
+from request.utils import bulk_transition_requests, generate_request_summary, send_overdue_reminders, send_status_notification
+
+
+class StudentFixtureMixin:
+    """Create the students and document types most tests start from"""
+
+    @classmethod
+    def create_student(cls, student_number='23-0000-001', **fields):
+        """A student whose login (student.user) is their student number with password 'password123'"""
+        user = User.objects.create_user(
+            username=student_number, password='password123', first_name=fields.get('first_name', '')
+        )
+        return StudentAccount.objects.create(user=user, student_number=student_number, **fields)
+
+    @classmethod
+    def create_document(cls, name='Transcript of Records', description='TOR'):
+        return DocumentType.objects.create(name=name, description=description, fee=100)
+
+
+class RequestViewQueryCountTests(StudentFixtureMixin, TestCase):
+    """Request app pages load in a bounded number of queries"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = cls.create_student(first_name='Juan', last_name='Dela Cruz')
+        cls.user = cls.student.user
+        cls.documents = [
+            cls.create_document(name, name)
+            for name in ['Transcript of Records', 'Certificate of Enrollment', 'Diploma Copy']
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        # The first request stores the user's role in the session; keep that write out of the counts
+        self.client.get(reverse('home'))
+
+    def add_requests(self, count, status):
+        return [
+            Request.objects.create(
+                student=self.student,
+                document=self.documents[index % len(self.documents)],
+                purpose='Scholarship application',
+                status=status,
+            )
+            for index in range(count)
+        ]
+
+    def count_queries(self, func, *args):
+        with CaptureQueriesContext(connection) as context:
+            func(*args)
+        return len(context.captured_queries)
+
+    def assertConstantQueries(self, url, status):
+        self.add_requests(2, status)
+        expected = self.count_queries(self.client.get, url)
+        self.add_requests(10, status)
+        with self.assertNumQueries(expected):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_pending_list(self):
+        self.assertConstantQueries(reverse('Request:pending'), 'Pending')
+
+    def test_approved_list(self):
+        self.assertConstantQueries(reverse('Request:approved'), 'Approved')
+
+    def test_completed_list(self):
+        self.assertConstantQueries(reverse('Request:completed'), 'Completed')
+
+    def test_statistics(self):
+        self.assertConstantQueries(reverse('Request:statistics'), 'Completed')
+
+    def test_detail_loads_document_with_request(self):
+        req = self.add_requests(1, 'Pending')[0]
+        # Session, user, user joined to its accounts, then the request joined to its document
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('Request:detail', args=[req.id]))
+        self.assertEqual(response.status_code, 200)
+
+    def test_pickup_slip_loads_document_with_request(self):
+        req = self.add_requests(1, 'Approved')[0]
+        # As for the detail page, plus the status history the printed dates come from
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('Request:pickup_slip', args=[req.id]))
+        self.assertEqual(response.status_code, 200)
+
+    def test_completion_receipt_loads_document_with_request(self):
+        req = self.add_requests(1, 'Completed')[0]
+        # As for the detail page, plus the status history the printed dates come from
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('Request:completion_receipt', args=[req.id]))
+        self.assertEqual(response.status_code, 200)
+
+    def test_request_summary(self):
+        self.add_requests(2, 'Completed')
+        expected = self.count_queries(lambda: list(generate_request_summary(self.student)['recent_requests']))
+        self.add_requests(10, 'Completed')
+        with self.assertNumQueries(expected):
+            list(generate_request_summary(self.student)['recent_requests'])
+
+
+class StudentRequestCounterTests(StudentFixtureMixin, TestCase):
+    """Per-student counters follow every create, status change, move and delete"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.students = [cls.create_student(f'23-0000-00{index}') for index in range(2)]
+        cls.document = cls.create_document()
+
+    def create_request(self, student, status='Pending'):
+        return Request.objects.create(student=student, document=self.document, purpose='Employment', status=status)
+
+    def counts(self, student):
+        return StudentRequestCounters.objects.get(student=student).as_dict()
+
+    def expected(self, **counts):
+        return {**dict.fromkeys(StudentRequestCounters.COUNT_FIELDS, 0), **counts}
+
+    def test_create(self):
+        self.create_request(self.students[0])
+        self.create_request(self.students[0], status='Approved')
+        self.assertEqual(self.counts(self.students[0]), self.expected(total=2, pending=1, approved=1))
+        self.assertFalse(StudentRequestCounters.objects.filter(student=self.students[1]).exists())
+
+    def test_status_change(self):
+        req = self.create_request(self.students[0])
+        before = StudentRequestCounters.objects.get(student=self.students[0]).updated_at
+        req.status = 'Completed'
+        req.save()
+        self.assertEqual(self.counts(self.students[0]), self.expected(total=1, completed=1))
+        self.assertGreater(StudentRequestCounters.objects.get(student=self.students[0]).updated_at, before)
+
+    def test_move_to_another_student(self):
+        self.create_request(self.students[1])
+        req = self.create_request(self.students[0], status='Approved')
+        req.student = self.students[1]
+        req.status = 'Completed'
+        req.save()
+        self.assertEqual(self.counts(self.students[0]), self.expected())
+        self.assertEqual(self.counts(self.students[1]), self.expected(total=2, pending=1, completed=1))
+
+    def test_delete(self):
+        req = self.create_request(self.students[0], status='Rejected')
+        self.create_request(self.students[0])
+        req.delete()
+        self.assertEqual(self.counts(self.students[0]), self.expected(total=1, pending=1))
+
+    def test_save_with_deferred_status_rebuilds(self):
+        req = self.create_request(self.students[0])
+        Request.objects.filter(pk=req.pk).update(status='Approved')
+        deferred = Request.objects.only('id', 'purpose').get(pk=req.pk)
+        deferred.purpose = 'Scholarship'
+        deferred.save()
+        self.assertEqual(self.counts(self.students[0]), self.expected(total=1, approved=1))
+
+    def run_command(self, *args):
+        out = io.StringIO()
+        call_command('rebuild_request_counters', *args, stdout=out)
+        return out.getvalue()
+
+    def test_verify_reports_drift_without_writing(self):
+        self.create_request(self.students[0])
+        self.assertIn('All request counters are up to date', self.run_command('--verify'))
+
+        StudentRequestCounters.objects.filter(student=self.students[0]).update(pending=5, total=5)
+        output = self.run_command('--verify')
+        self.assertIn(f'Student {self.students[0].pk}', output)
+        self.assertIn('1 student(s) have out-of-date counters', output)
+        self.assertEqual(self.counts(self.students[0]), self.expected(total=5, pending=5))
+
+    def test_rebuild_fixes_drift_and_missing_rows(self):
+        self.create_request(self.students[0])
+        self.create_request(self.students[0], status='Completed')
+        StudentRequestCounters.objects.filter(student=self.students[0]).update(pending=5, total=5)
+        StudentRequestCounters.objects.filter(student=self.students[1]).delete()
+        stale = timezone.now() - timedelta(days=1)
+        StudentRequestCounters.objects.filter(student=self.students[0]).update(updated_at=stale)
+
+        self.assertIn('Rebuilt request counters for 2 student(s)', self.run_command('--batch-size=1'))
+        self.assertEqual(self.counts(self.students[0]), self.expected(total=2, pending=1, completed=1))
+        self.assertGreater(StudentRequestCounters.objects.get(student=self.students[0]).updated_at, stale)
+        self.assertEqual(self.counts(self.students[1]), self.expected())
+        self.assertIn('All request counters are up to date', self.run_command('--verify'))
+
+
+class GlobalStatusCountCacheTests(StudentFixtureMixin, TestCase):
+    """The cached global counts follow committed changes and rebuild when incomplete"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = cls.create_student()
+        cls.document = cls.create_document()
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def create_request(self, status='Pending'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Request.objects.create(student=self.student, document=self.document, purpose='Employment', status=status)
+
+    def test_cold_cache_recounts_once(self):
+        self.create_request()
+        cache.clear()
+        expected = RequestManager.get_status_counts()
+        with self.assertNumQueries(1):
+            self.assertEqual(get_global_status_counts(), expected)
+        with self.assertNumQueries(0):
+            get_global_status_counts()
+
+    def test_committed_changes_are_applied_without_recounting(self):
+        req = self.create_request()
+        get_global_status_counts()
+        self.create_request(status='Approved')
+        with self.captureOnCommitCallbacks(execute=True):
+            req.status = 'Completed'
+            req.save()
+
+        with self.assertNumQueries(0):
+            counts = get_global_status_counts()
+        self.assertEqual(counts, RequestManager.get_status_counts())
+        self.assertEqual((counts['total'], counts['pending'], counts['completed']), (2, 0, 1))
+
+    def test_uncommitted_changes_are_not_applied(self):
+        get_global_status_counts()
+        with self.captureOnCommitCallbacks(execute=False):
+            Request.objects.create(student=self.student, document=self.document, purpose='Employment')
+        with self.assertNumQueries(0):
+            self.assertEqual(get_global_status_counts()['total'], 0)
+
+    def test_partial_eviction_forces_a_recount(self):
+        req = self.create_request()
+        get_global_status_counts()
+        cache.delete(request_cache._cache_key(cache.get(request_cache.GENERATION_KEY), 'approved'))
+        # The transition finds a key missing and retires the whole snapshot
+        with self.captureOnCommitCallbacks(execute=True):
+            req.status = 'Approved'
+            req.save()
+
+        expected = RequestManager.get_status_counts()
+        with self.assertNumQueries(1):
+            self.assertEqual(get_global_status_counts(), expected)
+
+    def test_change_committed_during_recount_is_not_lost(self):
+        req = self.create_request()
+        cache.clear()
+        recount = RequestManager.get_status_counts
+
+        def recount_then_approve(student=None):
+            counts = recount(student)
+            if student is None:
+                with self.captureOnCommitCallbacks(execute=True):
+                    req.status = 'Approved'
+                    req.save()
+            return counts
+
+        with mock.patch.object(RequestManager, 'get_status_counts', side_effect=recount_then_approve):
+            self.assertEqual(get_global_status_counts()['pending'], 1)
+
+        counts = get_global_status_counts()
+        self.assertEqual(counts, RequestManager.get_status_counts())
+        self.assertEqual((counts['pending'], counts['approved']), (0, 1))
+
+
+class RequestAnalyticsTests(StudentFixtureMixin, TestCase):
+    """Analytics are computed from grouped aggregates and status history"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = cls.create_student()
+        cls.transcript = cls.create_document()
+        cls.diploma = cls.create_document('Diploma Copy', 'Diploma')
+
+    def create_request(self, document, status='Pending'):
+        return Request.objects.create(student=self.student, document=document, purpose='Employment', status=status)
+
+    def test_document_frequency_is_ordered_by_count(self):
+        self.create_request(self.diploma)
+        self.create_request(self.transcript)
+        self.create_request(self.transcript, status='Completed')
+
+        self.assertEqual(
+            get_document_frequency(self.student),
+            [('Transcript of Records', 2), ('Diploma Copy', 1)],
+        )
+        self.assertEqual(get_document_frequency(self.student, status='Completed'), [('Transcript of Records', 1)])
+
+    def test_status_change_is_recorded_in_history(self):
+        req = self.create_request(self.transcript)
+        req.status = 'Approved'
+        req.save()
+
+        history = RequestStatusHistory.objects.get(request=req)
+        self.assertEqual((history.old_status, history.new_status), ('Pending', 'Approved'))
+
+    def test_average_processing_time_uses_completion_transitions(self):
+        self.assertIsNone(get_average_processing_time(self.student))
+
+        for days in (2, 4):
+            req = self.create_request(self.transcript)
+            req.status = 'Completed'
+            req.save()
+            Request.objects.filter(pk=req.pk).update(date_requested=req.date_requested - timedelta(days=days))
+
+        average = get_average_processing_time(self.student)
+        self.assertAlmostEqual(average.total_seconds() / 86400, 3, places=2)
+
+
+class OverdueReminderTests(StudentFixtureMixin, TestCase):
+    """Overdue reminders are sent in bulk and only once per interval"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = cls.create_student()
+        document = cls.create_document()
+        for _ in range(5):
+            Request.objects.create(student=cls.student, document=document, purpose='Employment', status='Approved')
+        Request.objects.update(date_requested=timezone.now() - timedelta(days=20))
+
+    def test_reminders_are_batched_and_not_repeated(self):
+        # A few queries per chunk rather than one per request
+        with CaptureQueriesContext(connection) as context:
+            stats = send_overdue_reminders(chunk_size=2)
+        self.assertEqual(stats, {'sent': 5, 'chunks': 3})
+        self.assertEqual(Notification.objects.count(), 5)
+        self.assertLessEqual(len(context.captured_queries), 3 * 5 + 1)
+
+        self.assertEqual(send_overdue_reminders(chunk_size=2)['sent'], 0)
+        self.assertEqual(Notification.objects.count(), 5)
+
+    def test_dry_run_sends_nothing(self):
+        self.assertEqual(send_overdue_reminders(dry_run=True)['sent'], 5)
+        self.assertFalse(Notification.objects.exists())
+
+
+class EmailOutboxTests(StudentFixtureMixin, TestCase):
+    """Status notifications queue email instead of sending it inline"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = cls.create_student(email='juan@example.com')
+        document = cls.create_document()
+        cls.req = Request.objects.create(student=cls.student, document=document, purpose='Employment')
+
+    def test_notification_queues_email_without_sending(self):
+        self.assertTrue(send_status_notification(self.req, 'Pending', 'Approved'))
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(OutboundEmail.objects.filter(status='Pending').count(), 1)
+
+        stats = deliver_queued_emails()
+        self.assertEqual(stats['sent'], 1)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['juan@example.com'])
+        self.assertEqual(OutboundEmail.objects.get().status, 'Sent')
+
+    def test_cancelling_a_request_notifies_the_student(self):
+        self.client.force_login(self.student.user)
+        response = self.client.post(reverse('Request:cancel_pending', args=[self.req.id]))
+        self.assertRedirects(response, reverse('Request:pending'), fetch_redirect_response=False)
+        self.assertEqual(Notification.objects.get(request=self.req).message.count('Pending to Cancelled'), 1)
+        self.assertEqual(OutboundEmail.objects.get().to_email, 'juan@example.com')
+
+    def test_admin_status_change_notifies_the_student(self):
+        self.client.force_login(User.objects.create_superuser(username='admin', password='password123'))
+        response = self.client.post(reverse('admin:accounts_request_change', args=[self.req.id]), {
+            'student': self.student.pk,
+            'document': self.req.document_id,
+            'purpose': self.req.purpose,
+            'copies': 1,
+            'status': 'Approved',
+            'notes': '',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('Pending to Approved', Notification.objects.get(request=self.req).message)
+        self.assertEqual(OutboundEmail.objects.count(), 1)
+        self.assertEqual(RequestStatusHistory.objects.get(request=self.req).changed_by, 'admin')
+
+    def test_failed_email_is_retried_with_backoff_then_given_up(self):
+        enqueue_email('juan@example.com', 'Subject', 'Body')
+        connection = mail.get_connection()
+
+        with mock.patch.object(connection, 'send_messages', side_effect=OSError('SMTP down')):
+            stats = deliver_queued_emails(connection=connection, max_attempts=2, backoff_seconds=60)
+            self.assertEqual(stats['retried'], 1)
+            email = OutboundEmail.objects.get()
+            self.assertEqual(email.attempts, 1)
+            self.assertGreater(email.next_attempt_at, timezone.now() + timedelta(seconds=50))
+
+            # Not due yet, so nothing is claimed
+            self.assertEqual(deliver_queued_emails(connection=connection), {'sent': 0, 'retried': 0, 'failed': 0})
+
+            OutboundEmail.objects.update(next_attempt_at=timezone.now())
+            stats = deliver_queued_emails(connection=connection, max_attempts=2)
+            self.assertEqual(stats['failed'], 1)
+            self.assertEqual(OutboundEmail.objects.get().status, 'Failed')
+
+
+    def test_dropped_connection_is_reopened_without_counting_an_attempt(self):
+        enqueue_email('juan@example.com', 'Subject', 'Body')
+        connection = mail.get_connection()
+        with mock.patch.object(connection, 'send_messages', side_effect=[smtplib.SMTPServerDisconnected('idle'), 1]):
+            stats = deliver_queued_emails(connection=connection)
+        self.assertEqual(stats['sent'], 1)
+        email = OutboundEmail.objects.get()
+        self.assertEqual((email.status, email.attempts), ('Sent', 0))
+
+    def test_each_email_is_marked_sent_before_the_next_send(self):
+        first = enqueue_email('juan@example.com', 'Subject', 'Body')
+        second = enqueue_email('maria@example.com', 'Subject', 'Body')
+        connection = mail.get_connection()
+        # The worker dies while sending the second email
+        with mock.patch.object(connection, 'send_messages', side_effect=[1, KeyboardInterrupt]), \
+                self.assertRaises(KeyboardInterrupt):
+            deliver_queued_emails(connection=connection)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.status, second.status), ('Sent', 'Pending'))
+
+class RequestEventTests(StudentFixtureMixin, TestCase):
+    """Request saves reach event subscribers once committed, with replay on reconnect"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = cls.create_student(first_name='Juan', last_name='Dela Cruz')
+        cls.document = cls.create_document()
+
+    def setUp(self):
+        events._broker = None
+        self.addCleanup(setattr, events, '_broker', None)
+        self.broker = events.get_broker()
+
+    def test_fan_out_to_every_subscriber(self):
+        first, second = self.broker.subscribe(), self.broker.subscribe()
+        self.broker.publish({'type': 'created', 'request': {'id': 1}})
+        self.assertEqual(first.get(0), (1, {'type': 'created', 'request': {'id': 1}}))
+        self.assertEqual(second.get(0)[0], 1)
+        first.close()
+        second.close()
+        self.assertFalse(self.broker.has_listeners())
+
+    def test_subscriptions_must_implement_deliver(self):
+        with self.assertRaises(TypeError):
+            events.Subscription(self.broker)
+
+    def test_replay_after_last_event_id(self):
+        for request_id in range(3):
+            self.broker.publish({'type': 'created', 'request': {'id': request_id}})
+        subscription = self.broker.subscribe(last_event_id=1)
+        self.assertEqual([subscription.get(0)[0], subscription.get(0)[0]], [2, 3])
+        self.assertFalse(subscription.overflowed)
+
+    def test_unknown_or_evicted_ids_force_resync(self):
+        self.assertTrue(self.broker.subscribe(last_event_id=5).overflowed)
+        for request_id in range(events.REPLAY_BUFFER_SIZE + 1):
+            self.broker.publish({'type': 'created', 'request': {'id': request_id}})
+        self.assertTrue(self.broker.subscribe(last_event_id=0).overflowed)
+
+    def test_saves_publish_after_commit(self):
+        subscription = self.broker.subscribe()
+        with self.captureOnCommitCallbacks(execute=True):
+            req = Request.objects.create(student=self.student, document=self.document, purpose='Scholarship')
+            self.assertIsNone(subscription.get(0))
+        event_id, event = subscription.get(0)
+        self.assertEqual(event['type'], 'created')
+        self.assertEqual(event['request']['student_name'], 'Juan Dela Cruz')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            req.status = 'Approved'
+            req.save()
+        self.assertEqual(subscription.get(0)[1]['request']['status'], 'Approved')
+
+        # Edits that keep the status are not announced
+        with self.captureOnCommitCallbacks(execute=True):
+            req.purpose = 'Employment'
+            req.save()
+        self.assertIsNone(subscription.get(0))
+        subscription.close()
+
+
+class BulkStatusTransitionTests(StudentFixtureMixin, TestCase):
+    """Bulk transitions write everything in a constant number of queries"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.students = [
+            cls.create_student(f'23-0000-00{index}', email=f'student{index}@example.com' if index else '')
+            for index in range(2)
+        ]
+        cls.document = cls.create_document()
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def add_requests(self, count, status='Pending'):
+        return [
+            Request.objects.create(
+                student=self.students[index % 2], document=self.document, purpose='Scholarship', status=status
+            )
+            for index in range(count)
+        ]
+
+    def test_transition_side_effects(self):
+        pending = self.add_requests(4)
+        approved = self.add_requests(1, status='Approved')
+        get_global_status_counts()
+        before = StudentRequestCounters.objects.get(student=self.students[0]).updated_at
+
+        with self.captureOnCommitCallbacks(execute=True):
+            updated = bulk_transition_requests(
+                [req.pk for req in pending + approved], 'Approved', changed_by='Registrar Staff'
+            )
+
+        self.assertEqual(sorted(req.pk for req in updated), sorted(req.pk for req in pending))
+        self.assertEqual(Request.objects.filter(status='Approved').count(), 5)
+        history = RequestStatusHistory.objects.filter(new_status='Approved', old_status='Pending')
+        self.assertEqual(history.count(), 4)
+        self.assertEqual({entry.changed_by for entry in history}, {'Registrar Staff'})
+        self.assertEqual(Notification.objects.count(), 4)
+        # Only the student with an email address gets queued mail
+        self.assertEqual(OutboundEmail.objects.count(), 2)
+
+        for student in self.students:
+            counters = StudentRequestCounters.objects.get(student=student)
+            self.assertEqual(counters.as_dict(), RequestManager.get_status_counts(student))
+        self.assertGreater(StudentRequestCounters.objects.get(student=self.students[0]).updated_at, before)
+        self.assertEqual(get_global_status_counts(), RequestManager.get_status_counts())
+
+    def test_query_count_does_not_grow_with_selection(self):
+        def count_queries(requests):
+            with CaptureQueriesContext(connection) as context:
+                bulk_transition_requests([req.pk for req in requests], 'Approved')
+            return len(context.captured_queries)
+
+        self.assertEqual(count_queries(self.add_requests(2)), count_queries(self.add_requests(30)))
+
+    def test_unknown_status_is_refused(self):
+        with self.assertRaises(ValueError):
+            bulk_transition_requests([req.pk for req in self.add_requests(1)], 'Lost')
+
+    def test_admin_action(self):
+        requests = self.add_requests(3)
+        superuser = User.objects.create_superuser(username='admin', password='password123')
+        self.client.force_login(superuser)
+        response = self.client.post(reverse('admin:accounts_request_changelist'), {
+            'action': 'mark_rejected',
+            '_selected_action': [req.pk for req in requests],
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Request.objects.filter(status='Rejected').count(), 3)
+
+
+class AttachmentUploadTests(StudentFixtureMixin, TestCase):
+    """Attachments arrive in resumable chunks and are verified before they are attached"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = cls.create_student()
+        cls.user = cls.student.user
+        cls.request = Request.objects.create(student=cls.student, document=cls.create_document(), purpose='Scholarship')
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=tmp_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.client.force_login(self.user)
+        self.content = b'%PDF-1.4 ' + bytes(range(256)) * 40
+
+    def start(self, content=None, filename='affidavit.pdf'):
+        content = self.content if content is None else content
+        return self.client.post(reverse('Request:attachment_upload_start', args=[self.request.id]), {
+            'filename': filename,
+            'size': len(content),
+            'checksum': hashlib.sha256(content).hexdigest(),
+        })
+
+    def put_chunk(self, upload_id, offset, chunk):
+        return self.client.put(
+            reverse('Request:attachment_upload', args=[upload_id]), chunk,
+            content_type='application/octet-stream', headers={'Upload-Offset': str(offset)},
+        )
+
+    def complete(self, upload_id):
+        return self.client.post(reverse('Request:attachment_upload_complete', args=[upload_id]))
+
+    def test_chunked_upload_with_resume(self):
+        response = self.start()
+        self.assertEqual(response.status_code, 201)
+        upload_id = response.json()['upload_id']
+
+        self.assertEqual(self.put_chunk(upload_id, 0, self.content[:4000]).json()['offset'], 4000)
+        # A retried chunk at a stale offset is refused with the real offset
+        response = self.put_chunk(upload_id, 0, self.content[:4000])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response['Upload-Offset'], '4000')
+        self.assertEqual(self.client.get(reverse('Request:attachment_upload', args=[upload_id])).json()['offset'], 4000)
+
+        self.assertEqual(self.put_chunk(upload_id, 4000, self.content[4000:]).json()['offset'], len(self.content))
+        response = self.complete(upload_id)
+        self.assertEqual(response.status_code, 201)
+
+        attachment = Attachment.objects.get(request=self.request)
+        self.assertEqual(attachment.file_size, len(self.content))
+        with attachment.file.open('rb') as f:
+            self.assertEqual(f.read(), self.content)
+        self.assertFalse(AttachmentUpload.objects.exists())
+        # PDFs need no image processing
+        self.assertFalse(ImageJob.objects.exists())
+
+    def test_checksum_mismatch_resets_upload(self):
+        upload_id = self.start().json()['upload_id']
+        self.put_chunk(upload_id, 0, b'X' + self.content[1:])
+        response = self.complete(upload_id)
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(response.json()['offset'], 0)
+        self.assertFalse(Attachment.objects.exists())
+
+        self.put_chunk(upload_id, 0, self.content)
+        self.assertEqual(self.complete(upload_id).status_code, 201)
+
+    def test_upload_is_attached_once(self):
+        upload_id = self.start().json()['upload_id']
+        self.put_chunk(upload_id, 0, self.content)
+        # A second caller that loaded the upload before the first one completed it
+        stale = AttachmentUpload.objects.get(pk=upload_id)
+        self.assertEqual(self.complete(upload_id).status_code, 201)
+
+        with self.assertRaises(UploadError) as context:
+            complete_upload(stale)
+        self.assertEqual(context.exception.status, 404)
+        self.assertEqual(self.complete(upload_id).status_code, 404)
+        self.assertEqual(Attachment.objects.count(), 1)
+
+    def test_failed_commit_puts_the_file_back(self):
+        upload_id = self.start().json()['upload_id']
+        self.put_chunk(upload_id, 0, self.content)
+        upload = AttachmentUpload.objects.get(pk=upload_id)
+        atomic = transaction.atomic
+
+        @contextlib.contextmanager
+        def failing_atomic():
+            with atomic():
+                yield
+                raise DatabaseError('could not commit')
+
+        with mock.patch('request.uploads.transaction.atomic', failing_atomic), self.assertRaises(DatabaseError):
+            complete_upload(upload)
+        self.assertFalse(Attachment.objects.exists())
+        with open(partial_path(upload), 'rb') as f:
+            self.assertEqual(f.read(), self.content)
+
+        self.assertEqual(self.complete(upload_id).status_code, 201)
+
+    def test_incomplete_and_oversized_uploads_are_refused(self):
+        upload_id = self.start().json()['upload_id']
+        self.put_chunk(upload_id, 0, self.content[:10])
+        self.assertEqual(self.complete(upload_id).status_code, 409)
+        self.assertEqual(self.put_chunk(upload_id, 10, self.content[10:] + b'extra').status_code, 413)
+        self.assertEqual(self.start(filename='script.exe').status_code, 400)
+        with override_settings(ATTACHMENT_UPLOAD_MAX_SIZE=100):
+            self.assertEqual(self.start().status_code, 413)
+
+    def test_image_attachments_are_queued_for_processing(self):
+        upload_id = self.start(content=b'\xff\xd8 scanned id', filename='student-id.JPG').json()['upload_id']
+        self.put_chunk(upload_id, 0, b'\xff\xd8 scanned id')
+        self.assertEqual(self.complete(upload_id).status_code, 201)
+        job = ImageJob.objects.get()
+        self.assertEqual(job.kind, 'attachment')
+        self.assertTrue(job.source.endswith('/student-id.jpg'))
+
+    def test_chunks_are_refused_once_the_request_is_closed(self):
+        upload_id = self.start().json()['upload_id']
+        Request.objects.filter(pk=self.request.pk).update(status='Cancelled')
+        response = self.put_chunk(upload_id, 0, self.content)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(AttachmentUpload.objects.get(pk=upload_id).offset, 0)
+        self.assertEqual(os.path.getsize(partial_path(AttachmentUpload.objects.get(pk=upload_id))), 0)
+
+    def test_other_students_cannot_touch_an_upload(self):
+        upload_id = self.start().json()['upload_id']
+        self.client.force_login(self.create_student('23-0000-002').user)
+        self.assertEqual(self.put_chunk(upload_id, 0, self.content).status_code, 404)
+        self.assertEqual(self.start().status_code, 404)
+
+    def test_stale_uploads_are_purged(self):
+        upload_id = self.start().json()['upload_id']
+        upload = AttachmentUpload.objects.get(pk=upload_id)
+        AttachmentUpload.objects.filter(pk=upload_id).update(updated_at=timezone.now() - timedelta(days=2))
+        self.assertEqual(purge_stale_uploads(), 1)
+        self.assertFalse(partial_path(upload).exists())
+
+    def test_attachment_download_is_permission_checked(self):
+        upload_id = self.start().json()['upload_id']
+        self.put_chunk(upload_id, 0, self.content)
+        url = self.complete(upload_id).json()['attachment']['url']
+
+        response = self.client.get(url, headers={'Range': 'bytes=0-7'})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), self.content[:8])
+
+        self.client.force_login(self.create_student('23-0000-002').user)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+        staff = User.objects.create_user(username='registrar', password='password123')
+        AdminAccount.objects.create(user=staff, full_name='Registrar Staff', role='Registrar')
+        self.client.force_login(staff)
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+
+def pdf_text_lines(pdf):
+    """The strings drawn on a page written by request.pdfs.PdfPage, in order"""
+    length = int(re.search(rb'/Length (\d+) /Filter /FlateDecode', pdf).group(1))
+    start = pdf.index(b'stream\n') + len(b'stream\n')
+    content = zlib.decompress(pdf[start:start + length])
+    return [
+        re.sub(rb'\\(.)', rb'\1', text).decode('cp1252')
+        for text in re.findall(rb'\(((?:[^()\\]|\\.)*)\) Tj', content)
+    ]
+
+
+class RequestPdfTests(StudentFixtureMixin, TestCase):
+    """Pickup slips and receipts are rendered once per version and served from disk"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = cls.create_student(first_name='Juan', last_name='Dela Cruz')
+        cls.user = cls.student.user
+        cls.document = cls.create_document()
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=tmp_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.client.force_login(self.user)
+
+    def add_request(self, status):
+        return Request.objects.create(student=self.student, document=self.document, purpose='Scholarship', status=status)
+
+    def download(self, name, req):
+        return self.client.get(reverse(f'Request:{name}', args=[req.id]), {'format': 'pdf'})
+
+    def test_pickup_slip_is_cached_until_the_request_changes(self):
+        req = self.add_request('Approved')
+        with mock.patch('request.pdfs.render_pdf', wraps=pdfs.render_pdf) as render:
+            response = self.download('pickup_slip', req)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['Content-Type'], 'application/pdf')
+            self.assertIn(f'pickup-slip-{req.id}.pdf', response['Content-Disposition'])
+            self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF-'))
+
+            self.assertEqual(self.download('pickup_slip', req).status_code, 200)
+            self.assertEqual(render.call_count, 1)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                req.copies = 3
+                req.save()
+            self.assertFalse(pdfs.pdf_dir(req.id).exists())
+            self.download('pickup_slip', req)
+            self.assertEqual(render.call_count, 2)
+        self.assertEqual(len(list(pdfs.pdf_dir(req.id).glob('*.pdf'))), 1)
+
+    def test_receipt_needs_a_completed_request(self):
+        req = self.add_request('Approved')
+        response = self.download('completion_receipt', req)
+        self.assertRedirects(response, reverse('Request:completed'), fetch_redirect_response=False)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk_transition_requests([req.id], 'Completed', notify=False)
+        response = self.download('completion_receipt', req)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(f'completion-receipt-{req.id}.pdf', response['Content-Disposition'])
+
+    def pdf_text(self, name, req):
+        return ' '.join(pdf_text_lines(b''.join(self.download(name, req).streaming_content)))
+
+    def test_pdfs_print_the_page_text(self):
+        req = self.add_request('Approved')
+        slip = pdfs.document_data(req, 'pickup_slip')
+        self.assertEqual(slip['title'], 'CIT-U Document Pickup Slip')
+        # The page's Generated row is left out; the PDF prints its own render time in the footer
+        self.assertEqual([label for label, _ in slip['rows']][-1], 'Date Approved:')
+        self.assertIn(['Student Name:', 'Juan Dela Cruz'], slip['rows'])
+        self.assertEqual(slip['sections'][0][0], 'Pickup Instructions:')
+        pdf_text = self.pdf_text('pickup_slip', req)
+        self.assertIn("Location: Registrar's Office", pdf_text)
+        self.assertIn('Generated on ', pdf_text)
+        self.assertContains(self.client.get(reverse('Request:pickup_slip', args=[req.id])), 'Generated:')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk_transition_requests([req.id], 'Completed', notify=False)
+        receipt = pdfs.document_data(req, 'completion_receipt')
+        self.assertEqual(receipt['badge'], 'COMPLETED')
+        self.assertIn(['Document Fee:', 'PHP 100'], receipt['rows'])
+        self.assertEqual(
+            receipt['sections'][0][1][1:], ['Total Processing Time: 0 days', 'Status: COMPLETED']
+        )
+        self.assertIn('Total Processing Time: 0 days', self.pdf_text('completion_receipt', req))
+        page = self.client.get(reverse('Request:completion_receipt', args=[req.id]))
+        self.assertContains(page, '0 days')
+
+    def test_prerender_newly_approved_slips(self):
+        requests = [self.add_request('Pending') for _ in range(3)]
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk_transition_requests([req.id for req in requests], 'Approved', notify=False)
+
+        stdout = io.StringIO()
+        call_command('prerender_request_pdfs', '--since-hours', '1', stdout=stdout)
+        self.assertIn('Rendered 3 pickup slip(s), 0 already cached', stdout.getvalue())
+        call_command('prerender_request_pdfs', stdout=stdout)
+        self.assertIn('Rendered 0 pickup slip(s), 3 already cached', stdout.getvalue())
+
+        with mock.patch('request.pdfs.render_pdf') as render:
+            self.assertEqual(self.download('pickup_slip', requests[0]).status_code, 200)
+        render.assert_not_called()
@@ -0,0 +1,190 @@
+"""
+Chunked, resumable attachment uploads.
+
+A client starts an upload with the file's name, size and SHA-256, then sends
+the bytes in chunks, each tagged with the offset it starts at. Chunks are
+streamed from the request body to a partial file under
+MEDIA_ROOT/attachments/partial/ a buffer at a time, so memory use does not
+grow with the file. After a dropped connection the client asks for the
+current offset and carries on from there. Completing the upload verifies
+the checksum and moves the file into place as an Attachment of the request.
+"""
+
+import hashlib
+import os
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+from accounts.image_jobs import enqueue_attachment
+from accounts.models import Attachment
+from .models import AttachmentUpload
+
+ATTACHMENT_DIR = 'attachments'
+PARTIAL_DIR = 'partial'
+ALLOWED_EXTENSIONS = {'.pdf', '.jpg', '.jpeg', '.png'}
+# Extensions handed to the process_image_jobs worker after completion
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png'}
+# Bytes copied per read when streaming a chunk or hashing a file
+COPY_BUFFER_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    """A request the upload cannot accept; status is the HTTP status to answer with"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def partial_path(upload):
+    """Local path of an upload's partial file"""
+    return Path(settings.MEDIA_ROOT) / ATTACHMENT_DIR / PARTIAL_DIR / f"{upload.id}.part"
+
+
+def attachment_name(upload):
+    """Storage name of the finished file: attachments/<upload id>/<filename>"""
+    stem, extension = os.path.splitext(get_valid_filename(upload.filename))
+    # Attachment.file holds at most 100 characters
+    return f"{ATTACHMENT_DIR}/{upload.id.hex}/{stem[:40]}{extension.lower()}"
+
+
+def start_upload(request_obj, filename, size, checksum):
+    """Validate and record a new upload for a request"""
+    extension = os.path.splitext(filename)[1].lower()
+    if extension not in ALLOWED_EXTENSIONS:
+        raise UploadError('Invalid file format. Please upload a PDF, JPG or PNG file.')
+    if size <= 0:
+        raise UploadError('The file is empty.')
+    if size > settings.ATTACHMENT_UPLOAD_MAX_SIZE:
+        raise UploadError(
+            f"File too large. Maximum size is {settings.ATTACHMENT_UPLOAD_MAX_SIZE // (1024 * 1024)}MB.", status=413
+        )
+    checksum = checksum.lower()
+    if len(checksum) != 64 or any(c not in '0123456789abcdef' for c in checksum):
+        raise UploadError('checksum must be the SHA-256 of the file in hex.')
+
+    upload = AttachmentUpload.objects.create(request=request_obj, filename=filename, size=size, checksum=checksum)
+    path = partial_path(upload)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.touch()
+    return upload
+
+
+def append_chunk(upload, offset, stream, length):
+    """
+    Write length bytes read from stream at offset and return the new
+    offset. The offset must be where the upload currently ends; anything
+    else answers 409 so the client can resume from the real offset. The
+    upload row stays locked while the chunk is written, so two chunks sent
+    at the same offset never write the partial file at the same time. A
+    chunk cut short by a dropped connection still counts the bytes that
+    arrived.
+    """
+    with transaction.atomic():
+        locked = AttachmentUpload.objects.select_for_update().filter(pk=upload.pk).first()
+        if locked is None:
+            raise UploadError('Upload not found.', status=404)
+        upload.offset = locked.offset
+        if offset != locked.offset:
+            raise UploadError(f"Expected offset {locked.offset}.", status=409)
+        if length > locked.size - offset:
+            raise UploadError('The chunk runs past the declared file size.', status=413)
+
+        path = partial_path(upload)
+        with open(path, 'r+b') as f:
+            f.seek(offset)
+            # Drop bytes past the recorded offset left by an interrupted chunk
+            f.truncate()
+            remaining = length
+            while remaining:
+                block = stream.read(min(COPY_BUFFER_SIZE, remaining))
+                if not block:
+                    break
+                f.write(block)
+                remaining -= len(block)
+            new_offset = f.tell()
+
+        AttachmentUpload.objects.filter(pk=locked.pk).update(offset=new_offset, updated_at=timezone.now())
+    upload.offset = new_offset
+    return new_offset
+
+
+def file_sha256(path):
+    """SHA-256 hex digest of a file, read a buffer at a time"""
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(COPY_BUFFER_SIZE), b''):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+
+def complete_upload(upload):
+    """
+    Verify a fully received upload and attach it to its request. The upload
+    row is locked for the whole check, so concurrent calls attach the file
+    once and the others answer 404. The file is renamed into place in the
+    transaction that creates the Attachment and renamed back if that
+    transaction fails, so a request never lists a file that is not on disk.
+    A checksum mismatch discards the received bytes so the client can
+    upload again from offset 0.
+    """
+    path = partial_path(upload)
+    moved_to = None
+    try:
+        with transaction.atomic():
+            locked = AttachmentUpload.objects.select_for_update().filter(pk=upload.pk).first()
+            if locked is None:
+                raise UploadError('Upload not found.', status=404)
+            upload.offset = locked.offset
+            if locked.offset != locked.size:
+                raise UploadError(f"Upload incomplete: {locked.offset} of {locked.size} bytes received.", status=409)
+
+            try:
+                checksum = file_sha256(path)
+            except FileNotFoundError:
+                # Completed by another call that got the lock first
+                raise UploadError('Upload not found.', status=404)
+            if checksum != locked.checksum:
+                with open(path, 'r+b') as f:
+                    f.truncate(0)
+                AttachmentUpload.objects.filter(pk=locked.pk).update(offset=0, updated_at=timezone.now())
+                upload.offset = 0
+            else:
+                name = attachment_name(locked)
+                destination = Path(settings.MEDIA_ROOT) / name
+                destination.parent.mkdir(parents=True, exist_ok=True)
+                attachment = Attachment.objects.create(request_id=locked.request_id, file=name, file_size=locked.size)
+                if os.path.splitext(name)[1] in IMAGE_EXTENSIONS:
+                    enqueue_attachment(attachment)
+                locked.delete()
+                os.replace(path, destination)
+                moved_to = destination
+    except Exception:
+        if moved_to is not None:
+            os.replace(moved_to, path)
+        raise
+
+    if moved_to is None:
+        raise UploadError('Checksum mismatch; the upload was reset.', status=422)
+    return attachment
+
+
+def cancel_upload(upload):
+    """Discard an upload and its partial file"""
+    partial_path(upload).unlink(missing_ok=True)
+    upload.delete()
+
+
+def purge_stale_uploads(max_age_hours=None):
+    """Discard uploads not written to within max_age_hours; returns how many"""
+    if max_age_hours is None:
+        max_age_hours = settings.ATTACHMENT_UPLOAD_EXPIRY_HOURS
+    cutoff = timezone.now() - timedelta(hours=max_age_hours)
+    stale = list(AttachmentUpload.objects.filter(updated_at__lt=cutoff))
+    for upload in stale:
+        cancel_upload(upload)
+    return len(stale)
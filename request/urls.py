@@ -1,13 +1,18 @@
+from django.conf import settings
 from django.urls import path
 from . import views
+from .views import async_views
+
+# Status lists can be served by the ASGI-native views
+list_views = async_views if settings.ASYNC_STUDENT_VIEWS else views
 
 app_name = 'Request'
 
 urlpatterns = [
     # Main request views
-    path('pending/', views.requests_pending, name='pending'),
-    path('approved/', views.requests_approved, name='approved'),
-    path('completed/', views.requests_completed, name='completed'),
+    path('pending/', list_views.requests_pending, name='pending'),
+    path('approved/', list_views.requests_approved, name='approved'),
+    path('completed/', list_views.requests_completed, name='completed'),
     path('detail/<int:request_id>/', views.request_detail, name='detail'),
     
     # Additional functionality
@@ -16,4 +21,10 @@ urlpatterns = [
     path('completed/receipt/<int:request_id>/', views.download_completion_receipt, name='completion_receipt'),
     path('completed/statistics/', views.request_statistics, name='statistics'),
     path('detail/<int:request_id>/timeline/', views.request_timeline, name='timeline'),
+
+    # Chunked attachment uploads
+    path('detail/<int:request_id>/attachments/uploads/', views.start_attachment_upload, name='attachment_upload_start'),
+    path('attachments/uploads/<uuid:upload_id>/', views.attachment_upload, name='attachment_upload'),
+    path('attachments/uploads/<uuid:upload_id>/complete/', views.complete_attachment_upload, name='attachment_upload_complete'),
+    path('attachments/<int:attachment_id>/', views.download_attachment, name='attachment_download'),
 ]
\ No newline at end of file
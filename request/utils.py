@@ -3,44 +3,58 @@ Utility functions for request management and processing.
 """
 
 from django.utils import timezone
-from django.core.mail import send_mail
 from django.conf import settings
+from django.db import transaction
 from accounts.models import Request, StudentAccount, Notification
+from .analytics import get_average_processing_days, get_most_requested_document
+from .cache import adjust_global_status_counts_many
+from .events import publish_request_events
+from .models import REQUEST_STATUSES, RequestManager, RequestReminder, RequestStatusHistory, StudentRequestCounters
+from .outbox import enqueue_email, enqueue_emails
+from .pdfs import discard_request_pdfs
 from datetime import datetime, timedelta
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Rows per INSERT when writing history and notifications in bulk
+BULK_TRANSITION_BATCH_SIZE = 500
+
+
+def build_status_message(request_obj, old_status, new_status):
+    """Build the notification text for a request status change"""
+    message = f"Your request #{request_obj.id} for {request_obj.document.name} has been updated from {old_status} to {new_status}."
+    
+    if new_status == 'Approved':
+        message += " Please visit the Registrar's Office to claim your document."
+    elif new_status == 'Completed':
+        message += " Thank you for using WildDocs!"
+    return message
+
+
+def status_email_subject(request_obj):
+    """Subject line of the status change email"""
+    return f"WildDocs: Request #{request_obj.id} Status Update"
+
 
 def send_status_notification(request_obj, old_status, new_status):
     """Send notification when request status changes"""
     try:
         # Create database notification
-        message = f"Your request #{request_obj.id} for {request_obj.document.name} has been updated from {old_status} to {new_status}."
+        message = build_status_message(request_obj, old_status, new_status)
         
-        if new_status == 'Approved':
-            message += " Please visit the Registrar's Office to claim your document."
-        elif new_status == 'Completed':
-            message += " Thank you for using WildDocs!"
-        
-        Notification.objects.create(
-            student=request_obj.student,
-            request=request_obj,
-            message=message
-        )
-        
-        # Send email notification (if email settings are configured)
-        if hasattr(settings, 'EMAIL_HOST') and request_obj.student.email:
-            subject = f"WildDocs: Request #{request_obj.id} Status Update"
-            send_mail(
-                subject,
-                message,
-                settings.DEFAULT_FROM_EMAIL,
-                [request_obj.student.email],
-                fail_silently=True
+        # Queue the email with the notification; the outbox worker sends it
+        with transaction.atomic():
+            Notification.objects.create(
+                student=request_obj.student,
+                request=request_obj,
+                message=message
             )
             
-        logger.info(f"Notification sent for request #{request_obj.id} status change: {old_status} -> {new_status}")
+            if request_obj.student.email:
+                enqueue_email(request_obj.student.email, status_email_subject(request_obj), message)
+            
+        logger.info(f"Notification queued for request #{request_obj.id} status change: {old_status} -> {new_status}")
         return True
         
     except Exception as e:
@@ -48,6 +62,66 @@ def send_status_notification(request_obj, old_status, new_status):
         return False
 
 
+def bulk_transition_requests(request_ids, new_status, changed_by='System', notify=True):
+    """
+    Move many requests to new_status in one transaction; requests already in
+    new_status are skipped. The status change, history rows, notifications
+    and queued emails each take one bulk query. Bulk writes send no
+    signals, so the student counters, the cached global counts, the admin
+    event stream and cached PDFs are updated here. Returns the updated
+    requests.
+    """
+    if new_status not in REQUEST_STATUSES:
+        raise ValueError(f"Unknown request status: {new_status}")
+
+    with transaction.atomic():
+        requests = list(
+            Request.objects.select_for_update(of=('self',))
+            .filter(pk__in=request_ids)
+            .exclude(status=new_status)
+            .select_related('student', 'document')
+            .order_by('pk')
+        )
+        if not requests:
+            return []
+
+        transitions = [(req.student_id, req.status, new_status) for req in requests]
+        history = [
+            RequestStatusHistory(request=req, old_status=req.status, new_status=new_status, changed_by=changed_by)
+            for req in requests
+        ]
+        notifications = []
+        emails = []
+        if notify:
+            for req in requests:
+                message = build_status_message(req, req.status, new_status)
+                notifications.append(Notification(student_id=req.student_id, request=req, message=message))
+                if req.student.email:
+                    emails.append((req.student.email, status_email_subject(req), message))
+
+        # Every row gets the same status, so a single UPDATE beats bulk_update's CASE
+        Request.objects.filter(pk__in=[req.pk for req in requests]).update(status=new_status)
+        for req in requests:
+            req.status = new_status
+            req._counted_state = (req.student_id, new_status)
+
+        RequestStatusHistory.objects.bulk_create(history, batch_size=BULK_TRANSITION_BATCH_SIZE)
+        Notification.objects.bulk_create(notifications, batch_size=BULK_TRANSITION_BATCH_SIZE)
+        if emails:
+            enqueue_emails(emails)
+        StudentRequestCounters.apply_transitions(transitions)
+
+        updated_ids = [req.pk for req in requests]
+        transaction.on_commit(lambda: adjust_global_status_counts_many(
+            (old_status, status) for _, old_status, status in transitions
+        ))
+        transaction.on_commit(lambda: publish_request_events(updated_ids, 'status'))
+        transaction.on_commit(lambda: discard_request_pdfs(updated_ids))
+
+    logger.info(f"{changed_by} moved {len(requests)} request(s) to {new_status}")
+    return requests
+
+
 def get_request_priority(request_obj):
     """Calculate priority score for a request based on various factors"""
     priority_score = 0
@@ -99,63 +173,72 @@ def validate_request_data(request_data):
 
 def generate_request_summary(student):
     """Generate a summary of requests for a student"""
-    requests = Request.objects.filter(student=student)
-    
-    summary = {
-        'total_requests': requests.count(),
-        'pending_requests': requests.filter(status='Pending').count(),
-        'approved_requests': requests.filter(status='Approved').count(),
-        'completed_requests': requests.filter(status='Completed').count(),
-        'recent_requests': requests.order_by('-date_requested')[:5],
-        'most_requested_document': None,
-        'average_processing_time': None
-    }
-    
-    # Find most requested document
-    document_counts = {}
-    for req in requests:
-        doc_name = req.document.name
-        document_counts[doc_name] = document_counts.get(doc_name, 0) + 1
-    
-    if document_counts:
-        summary['most_requested_document'] = max(document_counts, key=document_counts.get)
+    counts = RequestManager.get_student_counts(student)
     
-    # Calculate average processing time (this would be more accurate with completion dates)
-    completed_requests = requests.filter(status='Completed')
-    if completed_requests:
-        total_days = sum((timezone.now() - req.date_requested).days for req in completed_requests)
-        summary['average_processing_time'] = total_days / completed_requests.count()
-    
-    return summary
+    return {
+        'total_requests': counts['total'],
+        'pending_requests': counts['pending'],
+        'approved_requests': counts['approved'],
+        'completed_requests': counts['completed'],
+        'recent_requests': Request.objects.filter(student=student).select_related('document').order_by('-date_requested')[:5],
+        'most_requested_document': get_most_requested_document(student),
+        'average_processing_time': get_average_processing_days(student),
+    }
 
 
-def check_overdue_requests():
-    """Check for overdue approved requests and send reminders"""
-    threshold_date = timezone.now() - timedelta(days=14)  # 14 days threshold
+def send_overdue_reminders(days_threshold=14, interval_days=7, chunk_size=500, dry_run=False):
+    """
+    Remind students about approved requests that are overdue for pickup.
+    Requests are streamed in primary-key order, chunk_size at a time, with
+    one bulk insert of notifications per chunk. Requests already reminded
+    within interval_days are skipped, so reruns do not notify twice.
+    Returns a dict with the number of reminders sent and chunks processed.
+    """
+    now = timezone.now()
     overdue_requests = Request.objects.filter(
         status='Approved',
-        date_requested__lt=threshold_date
-    )
-    
-    reminder_count = 0
-    for request_obj in overdue_requests:
-        try:
-            # Send reminder notification
-            message = f"Reminder: Your approved request #{request_obj.id} for {request_obj.document.name} is ready for pickup at the Registrar's Office. Please claim it within 30 days of approval."
-            
-            Notification.objects.create(
-                student=request_obj.student,
+        date_requested__lt=now - timedelta(days=days_threshold)
+    ).exclude(
+        reminder__last_sent_at__gte=now - timedelta(days=interval_days)
+    ).select_related('document').order_by('pk')
+
+    stats = {'sent': 0, 'chunks': 0}
+    last_pk = 0
+    while True:
+        chunk = list(overdue_requests.filter(pk__gt=last_pk)[:chunk_size])
+        if not chunk:
+            break
+        last_pk = chunk[-1].pk
+        stats['chunks'] += 1
+        stats['sent'] += len(chunk)
+        if dry_run:
+            continue
+
+        notifications = [
+            Notification(
+                student_id=request_obj.student_id,
                 request=request_obj,
-                message=message
+                message=f"Reminder: Your approved request #{request_obj.id} for {request_obj.document.name} is ready for pickup at the Registrar's Office. Please claim it within 30 days of approval."
             )
-            
-            reminder_count += 1
-            
-        except Exception as e:
-            logger.error(f"Failed to send reminder for request #{request_obj.id}: {str(e)}")
-    
-    logger.info(f"Sent {reminder_count} overdue request reminders")
-    return reminder_count
+            for request_obj in chunk
+        ]
+        reminders = [RequestReminder(request=request_obj, last_sent_at=now) for request_obj in chunk]
+        with transaction.atomic():
+            Notification.objects.bulk_create(notifications)
+            RequestReminder.objects.bulk_create(
+                reminders,
+                update_conflicts=True,
+                unique_fields=['request'],
+                update_fields=['last_sent_at'],
+            )
+
+    logger.info(f"Sent {stats['sent']} overdue request reminders in {stats['chunks']} chunk(s)")
+    return stats
+
+
+def check_overdue_requests():
+    """Check for overdue approved requests and send reminders"""
+    return send_overdue_reminders()['sent']
 
 
 def format_request_timeline(request_obj):
@@ -8,6 +8,7 @@ from .views.pending import requests_pending, cancel_pending_request
 from .views.approved import requests_approved, generate_pickup_slip
 from .views.completed import requests_completed, download_completion_receipt, request_statistics
 from .views.detail import request_detail, request_timeline
+from .views.attachments import start_attachment_upload, attachment_upload, complete_attachment_upload, download_attachment
 
 # Keep the original view functions for backward compatibility
 # These are now imported from the respective modules above
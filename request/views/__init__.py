@@ -5,4 +5,5 @@ Initialize the views package for the request app.
 from .pending import *
 from .approved import *
 from .completed import *
-from .detail import *
\ No newline at end of file
+from .detail import *
+from .attachments import *
\ No newline at end of file
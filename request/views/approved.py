@@ -6,42 +6,53 @@ from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
 from django.http import HttpResponse
 from accounts.models import StudentAccount, Request
-import datetime
+from dashboard.conditional import student_page
+from request.models import RequestManager
+from django.utils import timezone
+from request.pdfs import pickup_slip_context
+from request.views.documents import serve_request_pdf
 
 
 @login_required
+@student_page('Request/approved_requests.html', 'Request/requests_list.html', 'base.html')
 def requests_approved(request):
     """View for displaying approved requests"""
     try:
-        student = StudentAccount.objects.get(user=request.user)
+        student = request.identity.get_student()
         approved_requests = Request.objects.filter(
             student=student, 
             status='Approved'
-        ).order_by('-date_requested')
+        ).select_related('document').order_by('-date_requested')
+        total_count = RequestManager.get_student_counts(student)['approved']
     except StudentAccount.DoesNotExist:
         approved_requests = []
+        total_count = 0
     
     context = {
         'requests': approved_requests,
         'status': 'Approved',
         'page_title': 'Approved Requests',
-        'total_count': len(approved_requests),
+        'total_count': total_count,
     }
     return render(request, 'Request/approved_requests.html', context)
 
 
 @login_required
 def generate_pickup_slip(request, request_id):
-    """View for generating a pickup slip for an approved request"""
+    """View for generating a pickup slip for an approved request; ?format=pdf downloads it as a PDF"""
     try:
-        student = StudentAccount.objects.get(user=request.user)
-        req = Request.objects.get(id=request_id, student=student, status='Approved')
+        student = request.identity.get_student()
+        if request.GET.get('format') == 'pdf':
+            return serve_request_pdf(request, student, request_id, 'pickup_slip')
+        req = (
+            Request.objects.select_related('student', 'document').prefetch_related('status_history')
+            .get(id=request_id, student=student, status='Approved')
+        )
         
-        # Generate pickup slip content
+        # The PDF download is read from this same context, without the render time
         context = {
-            'request': req,
-            'student': student,
-            'generated_date': datetime.datetime.now(),
+            **pickup_slip_context(req),
+            'generated_date': timezone.now(),
         }
         
         return render(request, 'Request/pickup_slip.html', context)
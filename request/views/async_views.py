@@ -0,0 +1,58 @@
+"""
+Async (ASGI-native) versions of the request list views.
+
+Selected in request/urls.py when settings.ASYNC_STUDENT_VIEWS is on; they
+render the same templates as pending.py, approved.py and completed.py.
+"""
+
+from django.contrib.auth.decorators import login_required
+from django.shortcuts import render
+from accounts.models import StudentAccount, Request
+from dashboard.async_views import alist, aresolve_identity
+from dashboard.conditional import student_page
+from request.models import RequestManager
+
+
+async def render_request_list(request, status, template_name):
+    """Render one status list for the signed-in student"""
+    identity = await aresolve_identity(request)
+    try:
+        student = identity.get_student()
+        requests = await alist(
+            Request.objects.filter(student=student, status=status)
+            .select_related('document').order_by('-date_requested')
+        )
+        counts = await RequestManager.aget_student_counts(student)
+        total_count = counts[status.lower()]
+    except StudentAccount.DoesNotExist:
+        requests = []
+        total_count = 0
+
+    context = {
+        'requests': requests,
+        'status': status,
+        'page_title': f'{status} Requests',
+        'total_count': total_count,
+    }
+    return render(request, template_name, context)
+
+
+@login_required
+@student_page('Request/pending_requests.html', 'Request/requests_list.html', 'base.html')
+async def requests_pending(request):
+    """View for displaying pending requests"""
+    return await render_request_list(request, 'Pending', 'Request/pending_requests.html')
+
+
+@login_required
+@student_page('Request/approved_requests.html', 'Request/requests_list.html', 'base.html')
+async def requests_approved(request):
+    """View for displaying approved requests"""
+    return await render_request_list(request, 'Approved', 'Request/approved_requests.html')
+
+
+@login_required
+@student_page('Request/completed_requests.html', 'Request/requests_list.html', 'base.html')
+async def requests_completed(request):
+    """View for displaying completed requests"""
+    return await render_request_list(request, 'Completed', 'Request/completed_requests.html')
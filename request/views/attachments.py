@@ -0,0 +1,143 @@
+"""
+Views for chunked, resumable attachment uploads and attachment downloads.
+"""
+
+import os
+
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.http import Http404, JsonResponse
+from django.urls import reverse
+from django.views.decorators.http import require_http_methods, require_POST, require_safe
+from accounts.downloads import serve_media_file
+from accounts.models import Attachment, Request
+from request.models import AttachmentUpload
+from request.uploads import UploadError, append_chunk, cancel_upload, complete_upload, start_upload
+
+# Requests that still accept supporting documents
+UPLOADABLE_STATUSES = ['Pending', 'Approved']
+
+
+def _upload_state(upload):
+    return {
+        'success': True,
+        'upload_id': str(upload.id),
+        'offset': upload.offset,
+        'size': upload.size,
+        'chunk_size': settings.ATTACHMENT_UPLOAD_CHUNK_SIZE,
+    }
+
+
+def _error(message, status):
+    return JsonResponse({'success': False, 'error': message}, status=status)
+
+
+@login_required
+@require_POST
+def start_attachment_upload(request, request_id):
+    """Start a chunked upload for one of the student's requests"""
+    student = request.identity.student
+    if student is None:
+        return _error('Student account not found', 403)
+    try:
+        req = Request.objects.get(id=request_id, student=student, status__in=UPLOADABLE_STATUSES)
+    except Request.DoesNotExist:
+        return _error('Request not found or no longer accepts attachments', 404)
+
+    try:
+        filename = request.POST['filename']
+        size = int(request.POST['size'])
+        checksum = request.POST['checksum']
+    except (KeyError, ValueError):
+        return _error('filename, size and checksum are required', 400)
+
+    try:
+        upload = start_upload(req, filename, size, checksum)
+    except UploadError as e:
+        return _error(str(e), e.status)
+    return JsonResponse(_upload_state(upload), status=201)
+
+
+@login_required
+@require_http_methods(['GET', 'PUT', 'DELETE'])
+def attachment_upload(request, upload_id):
+    """
+    GET reports the offset to resume from. PUT appends the request body as
+    the chunk starting at the Upload-Offset header. DELETE cancels.
+    """
+    try:
+        upload = AttachmentUpload.objects.select_related('request').get(
+            pk=upload_id, request__student=request.identity.student
+        )
+    except AttachmentUpload.DoesNotExist:
+        return _error('Upload not found', 404)
+
+    if request.method == 'DELETE':
+        cancel_upload(upload)
+        return JsonResponse({'success': True})
+
+    if request.method == 'PUT':
+        try:
+            offset = int(request.headers['Upload-Offset'])
+        except (KeyError, ValueError):
+            return _error('Upload-Offset header is required', 400)
+        # The request may have been cancelled or completed since the upload started
+        if upload.request.status not in UPLOADABLE_STATUSES:
+            return _error('Request no longer accepts attachments', 409)
+        try:
+            length = int(request.META.get('CONTENT_LENGTH') or '')
+        except ValueError:
+            return _error('Content-Length is required', 411)
+        try:
+            # Read straight from the body stream; request.body would buffer it all
+            append_chunk(upload, offset, request, length)
+        except UploadError as e:
+            response = _error(str(e), e.status)
+            response['Upload-Offset'] = str(upload.offset)
+            return response
+
+    response = JsonResponse(_upload_state(upload))
+    response['Upload-Offset'] = str(upload.offset)
+    return response
+
+
+@login_required
+@require_POST
+def complete_attachment_upload(request, upload_id):
+    """Verify a fully sent upload and attach it to its request"""
+    try:
+        upload = AttachmentUpload.objects.get(pk=upload_id, request__student=request.identity.student)
+    except AttachmentUpload.DoesNotExist:
+        return _error('Upload not found', 404)
+
+    try:
+        attachment = complete_upload(upload)
+    except UploadError as e:
+        return JsonResponse({'success': False, 'error': str(e), 'offset': upload.offset}, status=e.status)
+    return JsonResponse({
+        'success': True,
+        'attachment': {
+            'id': attachment.id,
+            'name': os.path.basename(attachment.file.name),
+            'file_size': attachment.file_size,
+            'url': reverse('Request:attachment_download', args=[attachment.id]),
+        },
+    }, status=201)
+
+
+@login_required
+@require_safe
+def download_attachment(request, attachment_id):
+    """
+    Stream an attachment to the student who owns its request or to an
+    admin, with Range and conditional request support. ?download=1 asks
+    the browser to save it instead of displaying it.
+    """
+    try:
+        attachment = Attachment.objects.select_related('request').get(pk=attachment_id)
+    except Attachment.DoesNotExist:
+        raise Http404('Attachment not found')
+    identity = request.identity
+    if identity.admin is None and (identity.student is None or attachment.request.student_id != identity.student.pk):
+        raise Http404('Attachment not found')
+    return serve_media_file(request, attachment.file.name, as_attachment=bool(request.GET.get('download')))
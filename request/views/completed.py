@@ -6,42 +6,54 @@ from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
 from django.http import HttpResponse
 from accounts.models import StudentAccount, Request
-import datetime
+from django.utils import timezone
+from request.pdfs import completion_receipt_context
+from request.views.documents import serve_request_pdf
+from request.analytics import get_average_processing_days, get_document_frequency
+from dashboard.conditional import student_page
+from request.models import RequestManager
 
 
 @login_required
+@student_page('Request/completed_requests.html', 'Request/requests_list.html', 'base.html')
 def requests_completed(request):
     """View for displaying completed requests"""
     try:
-        student = StudentAccount.objects.get(user=request.user)
+        student = request.identity.get_student()
         completed_requests = Request.objects.filter(
             student=student, 
             status='Completed'
-        ).order_by('-date_requested')
+        ).select_related('document').order_by('-date_requested')
+        total_count = RequestManager.get_student_counts(student)['completed']
     except StudentAccount.DoesNotExist:
         completed_requests = []
+        total_count = 0
     
     context = {
         'requests': completed_requests,
         'status': 'Completed',
         'page_title': 'Completed Requests',
-        'total_count': len(completed_requests),
+        'total_count': total_count,
     }
     return render(request, 'Request/completed_requests.html', context)
 
 
 @login_required
 def download_completion_receipt(request, request_id):
-    """View for downloading a completion receipt for a completed request"""
+    """View for downloading a completion receipt for a completed request; ?format=pdf downloads it as a PDF"""
     try:
-        student = StudentAccount.objects.get(user=request.user)
-        req = Request.objects.get(id=request_id, student=student, status='Completed')
+        student = request.identity.get_student()
+        if request.GET.get('format') == 'pdf':
+            return serve_request_pdf(request, student, request_id, 'completion_receipt')
+        req = (
+            Request.objects.select_related('student', 'document').prefetch_related('status_history')
+            .get(id=request_id, student=student, status='Completed')
+        )
         
-        # Generate receipt content
+        # The PDF download is read from this same context, without the render time
         context = {
-            'request': req,
-            'student': student,
-            'completion_date': datetime.datetime.now(),
+            **completion_receipt_context(req),
+            'generated_date': timezone.now(),
         }
         
         return render(request, 'Request/completion_receipt.html', context)
@@ -53,28 +65,19 @@ def download_completion_receipt(request, request_id):
 def request_statistics(request):
     """View for displaying request statistics for completed requests"""
     try:
-        student = StudentAccount.objects.get(user=request.user)
-        completed_requests = Request.objects.filter(
-            student=student, 
-            status='Completed'
-        )
-        
-        # Calculate statistics
-        total_completed = completed_requests.count()
-        document_types = {}
-        for req in completed_requests:
-            doc_type = req.document.name
-            if doc_type in document_types:
-                document_types[doc_type] += 1
-            else:
-                document_types[doc_type] = 1
+        student = request.identity.get_student()
         
+        # Calculate statistics with grouped database aggregates
         context = {
-            'total_completed': total_completed,
-            'document_types': document_types,
-            'recent_requests': completed_requests[:5],
+            'total_completed': RequestManager.get_student_counts(student)['completed'],
+            'document_types': dict(get_document_frequency(student, status='Completed')),
+            'average_processing_days': get_average_processing_days(student),
+            'recent_requests': Request.objects.filter(
+                student=student,
+                status='Completed'
+            ).select_related('document').order_by('-date_requested')[:5],
         }
         
         return render(request, 'Request/request_statistics.html', context)
     except StudentAccount.DoesNotExist:
-        return redirect('Request:completed')
\ No newline at end of file
+        return redirect('Request:completed')
@@ -11,8 +11,8 @@ from accounts.models import StudentAccount, Request
 def request_detail(request, request_id):
     """View for displaying detailed information about a specific request"""
     try:
-        student = StudentAccount.objects.get(user=request.user)
-        req = Request.objects.get(id=request_id, student=student)
+        student = request.identity.get_student()
+        req = Request.objects.select_related('document').get(id=request_id, student=student)
         
         # Add additional context based on request status
         context = {
@@ -37,8 +37,8 @@ def request_detail(request, request_id):
 def request_timeline(request, request_id):
     """View for displaying the timeline/history of a specific request"""
     try:
-        student = StudentAccount.objects.get(user=request.user)
-        req = Request.objects.get(id=request_id, student=student)
+        student = request.identity.get_student()
+        req = Request.objects.select_related('document').get(id=request_id, student=student)
         
         # Create timeline events (this would be enhanced with actual timeline data)
         timeline_events = [
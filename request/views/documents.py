@@ -0,0 +1,28 @@
+"""
+PDF downloads of pickup slips and completion receipts.
+"""
+
+from pathlib import Path
+
+from django.conf import settings
+from accounts.downloads import serve_media_file
+from accounts.models import Request
+from request.pdfs import DOCUMENTS, get_request_pdf
+
+
+def serve_request_pdf(request, student, request_id, kind):
+    """
+    Stream the cached PDF of kind for one of the student's requests,
+    rendering it first if the request changed since it was cached. Raises
+    Request.DoesNotExist when the request is not the student's or is not in
+    the status the document is for.
+    """
+    status, _, _, filename_prefix = DOCUMENTS[kind]
+    req = (
+        Request.objects.select_related('student', 'document')
+        .prefetch_related('status_history')
+        .get(id=request_id, student=student, status=status)
+    )
+    path, _ = get_request_pdf(req, kind)
+    name = path.relative_to(Path(settings.MEDIA_ROOT)).as_posix()
+    return serve_media_file(request, name, as_attachment=True, filename=f"{filename_prefix}-{req.id}.pdf")
@@ -4,26 +4,33 @@ Views for handling pending requests.
 
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
 from accounts.models import StudentAccount, Request
+from dashboard.conditional import student_page
+from request.models import RequestManager
+from request.utils import send_status_notification
 
 
 @login_required
+@student_page('Request/pending_requests.html', 'Request/requests_list.html', 'base.html')
 def requests_pending(request):
     """View for displaying pending requests"""
     try:
-        student = StudentAccount.objects.get(user=request.user)
+        student = request.identity.get_student()
         pending_requests = Request.objects.filter(
             student=student, 
             status='Pending'
-        ).order_by('-date_requested')
+        ).select_related('document').order_by('-date_requested')
+        total_count = RequestManager.get_student_counts(student)['pending']
     except StudentAccount.DoesNotExist:
         pending_requests = []
+        total_count = 0
     
     context = {
         'requests': pending_requests,
         'status': 'Pending',
         'page_title': 'Pending Requests',
-        'total_count': len(pending_requests),
+        'total_count': total_count,
     }
     return render(request, 'Request/pending_requests.html', context)
 
@@ -32,14 +39,17 @@ def requests_pending(request):
 def cancel_pending_request(request, request_id):
     """View for cancelling a pending request"""
     try:
-        student = StudentAccount.objects.get(user=request.user)
-        req = Request.objects.get(id=request_id, student=student, status='Pending')
+        student = request.identity.get_student()
+        req = Request.objects.select_related('student', 'document').get(id=request_id, student=student, status='Pending')
         
         if request.method == 'POST':
-            # Update status to cancelled
-            req.status = 'Cancelled'
-            req.notes = f"Cancelled by student on {request.user.date_joined.strftime('%Y-%m-%d')}"
-            req.save()
+            # Update status to cancelled and notify the student in the same transaction
+            with transaction.atomic():
+                req.status = 'Cancelled'
+                req.notes = f"Cancelled by student on {request.user.date_joined.strftime('%Y-%m-%d')}"
+                req._status_changed_by = request.user.username
+                req.save()
+                send_status_notification(req, 'Pending', 'Cancelled')
             
             # Redirect back to pending requests with success message
             return redirect('Request:pending')
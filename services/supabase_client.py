@@ -1,98 +1,239 @@
 import os
+import threading
+import time
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from django.conf import settings
 
 SUPABASE_URL = getattr(settings, 'SUPABASE_URL', os.getenv('SUPABASE_URL'))
 SUPABASE_SERVICE_KEY = getattr(settings, 'SUPABASE_SERVICE_KEY', os.getenv('SUPABASE_SERVICE_KEY'))
 
+# Responses worth retrying: rate limiting and transient server/gateway errors
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Methods that are safe to send again after a read timeout or a retryable
+# status. POST creates a user, so it is only retried when the connection
+# could not be made and the request never reached the server.
+RETRY_METHODS = frozenset({'GET', 'DELETE'})
+
+# Page size and page limit when looking users up through the list endpoint
+USERS_PER_PAGE = 100
+MAX_LOOKUP_PAGES = 200
+
+
+class KnownEmailCache:
+    """
+    Thread-safe, in-process TTL cache of users known to exist in Supabase
+    Auth, keyed by lowercased email. Only positive answers are cached, so a
+    stale entry can at worst report an email as taken for ttl seconds.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, email):
+        """Get the cached user for an email, or None"""
+        key = email.lower()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            user, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            return user
+
+    def add(self, user):
+        """Remember a user returned by the API"""
+        email = (user.get('email') or '').lower()
+        if email:
+            with self._lock:
+                self._entries[email] = (user, time.monotonic() + self.ttl)
+
+    def discard_id(self, uid):
+        """Forget a deleted user"""
+        with self._lock:
+            for email, (user, _) in list(self._entries.items()):
+                if user.get('id') == uid:
+                    del self._entries[email]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SupabaseAdminClient:
+    """
+    Client for the Supabase Auth Admin API.
+
+    Owns one requests.Session with a pooled HTTPAdapter, so calls reuse
+    keep-alive connections instead of paying a TCP+TLS handshake each time.
+    Connection errors, 429 and 5xx responses are retried with exponential
+    backoff (honouring Retry-After); user creation is only retried on
+    connection errors so a user is never created twice. Users seen in responses are remembered
+    in a KnownEmailCache so repeated lookups stay local.
+    """
+
+    def __init__(self, base_url=None, service_key=None, timeout=None, pool_size=None,
+                 max_retries=None, backoff_factor=None):
+        self.base_url = (base_url or SUPABASE_URL or '').rstrip('/')
+        self.timeout = timeout if timeout is not None else getattr(settings, 'SUPABASE_HTTP_TIMEOUT', 10)
+        pool_size = pool_size if pool_size is not None else getattr(settings, 'SUPABASE_HTTP_POOL_SIZE', 10)
+        max_retries = max_retries if max_retries is not None else getattr(settings, 'SUPABASE_HTTP_RETRIES', 3)
+        backoff_factor = backoff_factor if backoff_factor is not None else getattr(settings, 'SUPABASE_HTTP_BACKOFF', 0.5)
+        self.known_emails = KnownEmailCache(getattr(settings, 'SUPABASE_EMAIL_CACHE_TTL', 300))
+
+        service_key = service_key or SUPABASE_SERVICE_KEY
+        self.session = requests.Session()
+        # Shared headers are built once and sent with every call
+        self.session.headers.update({
+            "apikey": service_key or '',
+            "Authorization": f"Bearer {service_key}",
+        })
+
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=RETRY_METHODS,
+            respect_retry_after_header=True,
+            raise_on_status=False,  # Hand the last response back for normal error handling
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def _url(self, path=''):
+        return f"{self.base_url}/auth/v1/admin/users{path}"
+
+    def close(self):
+        """Close pooled connections"""
+        self.session.close()
+
+    def check_user_exists(self, email, timeout=None):
+        """
+        Check if a user exists in Supabase Auth.
+        Asks the API to filter by email and only pages further if the server
+        ignores the filter, stopping at the first exact match.
+        """
+        cached_user = self.known_emails.get(email)
+        if cached_user is not None:
+            return True, cached_user
+
+        try:
+            for page in range(1, MAX_LOOKUP_PAGES + 1):
+                resp = self.session.get(
+                    self._url(),
+                    params={'filter': email, 'page': page, 'per_page': USERS_PER_PAGE},
+                    timeout=timeout or self.timeout
+                )
+                resp.raise_for_status()
+                users = resp.json().get('users', [])
+
+                match = None
+                for user in users:
+                    # Every user seen refreshes the local cache
+                    self.known_emails.add(user)
+                    if (user.get('email') or '').lower() == email.lower():
+                        match = user
+                if match is not None:
+                    return True, match
+
+                # A short page is the last one
+                if len(users) < USERS_PER_PAGE:
+                    break
+            return False, None
+
+        except requests.exceptions.RequestException as e:
+            error_msg = f"Error checking user: {str(e)}"
+            return False, error_msg
+
+    def create_user_admin(self, email, password, user_metadata=None, timeout=None):
+        """Create a user in Supabase Auth via the Admin API."""
+        # Fixed payload - added email_confirm and proper structure
+        payload = {
+            "email": email,
+            "password": password,
+            "email_confirm": True,  # This is crucial - auto-confirms the email
+            "user_metadata": user_metadata or {}
+        }
+
+        try:
+            resp = self.session.post(self._url(), json=payload, timeout=timeout or self.timeout)
+
+            # Handle specific status codes
+            if resp.status_code == 422:
+                error_data = resp.json()
+                if error_data.get('error_code') in ('email_exists', 'user_already_exists'):
+                    return None, "User already exists"
+                error_msg = error_data.get('msg', 'Unprocessable Entity - check email format or password requirements')
+                return None, error_msg
+
+            if resp.status_code == 409:
+                # User already exists
+                return None, "User already exists"
+
+            if resp.status_code == 400:
+                error_data = resp.json()
+                error_msg = error_data.get('message', 'Bad request - invalid data')
+                return None, error_msg
+
+            # For any other non-200 status, raise an error
+            resp.raise_for_status()
+
+            user = resp.json()
+            self.known_emails.add(user)
+            return user, None
+
+        except requests.exceptions.RequestException as e:
+            error_msg = f"Network error: {str(e)}"
+            if hasattr(e, 'response') and e.response is not None:
+                try:
+                    error_data = e.response.json()
+                    error_msg = error_data.get('msg') or error_data.get('message') or str(e)
+                except ValueError:
+                    error_msg = f"HTTP {e.response.status_code}: {e.response.text}"
+            return None, error_msg
+
+    def delete_user_admin(self, uid, timeout=None):
+        """Delete a user in Supabase Auth via the Admin API."""
+        try:
+            resp = self.session.delete(self._url(f"/{uid}"), timeout=timeout or self.timeout)
+            if resp.status_code in (200, 204):
+                self.known_emails.discard_id(uid)
+                return True, None
+            resp.raise_for_status()
+            return False, f"Unexpected status code: {resp.status_code}"
+
+        except requests.exceptions.RequestException as e:
+            error_msg = f"Delete failed: {str(e)}"
+            return False, error_msg
+
+
+_default_client = None
+
+
+def get_client():
+    """Get the process-wide client, creating it on first use"""
+    global _default_client
+    if _default_client is None:
+        _default_client = SupabaseAdminClient()
+    return _default_client
+
+
 def check_user_exists(email):
     """Check if a user exists in Supabase Auth"""
-    url = f"{SUPABASE_URL}/auth/v1/admin/users"
-    headers = {
-        "apikey": SUPABASE_SERVICE_KEY,
-        "Authorization": f"Bearer {SUPABASE_SERVICE_KEY}",
-    }
-    
-    try:
-        resp = requests.get(url, headers=headers, timeout=10)
-        resp.raise_for_status()
-        users_data = resp.json()
-        
-        # Check if email exists in any user
-        for user in users_data.get('users', []):
-            if user.get('email', '').lower() == email.lower():
-                return True, user
-        return False, None
-        
-    except requests.exceptions.RequestException as e:
-        error_msg = f"Error checking user: {str(e)}"
-        return False, error_msg
+    return get_client().check_user_exists(email)
+
 
 def create_user_admin(email, password, user_metadata=None):
     """Create a user in Supabase Auth via the Admin API."""
-    url = f"{SUPABASE_URL}/auth/v1/admin/users"
-    headers = {
-        "apikey": SUPABASE_SERVICE_KEY,
-        "Authorization": f"Bearer {SUPABASE_SERVICE_KEY}",
-        "Content-Type": "application/json",
-    }
-    
-    # Fixed payload - added email_confirm and proper structure
-    payload = {
-        "email": email, 
-        "password": password,
-        "email_confirm": True,  # This is crucial - auto-confirms the email
-        "user_metadata": user_metadata or {}
-    }
-    
-    try:
-        resp = requests.post(url, json=payload, headers=headers, timeout=10)
-        
-        # Handle specific status codes
-        if resp.status_code == 422:
-            error_data = resp.json()
-            error_msg = error_data.get('msg', 'Unprocessable Entity - check email format or password requirements')
-            return None, error_msg
-            
-        if resp.status_code == 409:
-            # User already exists
-            return None, "User already exists"
-            
-        if resp.status_code == 400:
-            error_data = resp.json()
-            error_msg = error_data.get('message', 'Bad request - invalid data')
-            return None, error_msg
-            
-        # For any other non-200 status, raise an error
-        resp.raise_for_status()
-        
-        return resp.json(), None
-        
-    except requests.exceptions.RequestException as e:
-        error_msg = f"Network error: {str(e)}"
-        if hasattr(e, 'response') and e.response is not None:
-            try:
-                error_data = e.response.json()
-                error_msg = error_data.get('msg') or error_data.get('message') or str(e)
-            except:
-                error_msg = f"HTTP {e.response.status_code}: {e.response.text}"
-        return None, error_msg
+    return get_client().create_user_admin(email, password, user_metadata)
+
 
 def delete_user_admin(uid):
     """Delete a user in Supabase Auth via the Admin API."""
-    url = f"{SUPABASE_URL}/auth/v1/admin/users/{uid}"
-    headers = {
-        "apikey": SUPABASE_SERVICE_KEY,
-        "Authorization": f"Bearer {SUPABASE_SERVICE_KEY}",
-    }
-    
-    try:
-        resp = requests.delete(url, headers=headers, timeout=10)
-        if resp.status_code == 204:
-            return True, None
-        resp.raise_for_status()
-        return False, f"Unexpected status code: {resp.status_code}"
-        
-    except requests.exceptions.RequestException as e:
-        error_msg = f"Delete failed: {str(e)}"
-        return False, error_msg
\ No newline at end of file
+    return get_client().delete_user_admin(uid)